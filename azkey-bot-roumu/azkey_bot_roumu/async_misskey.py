@@ -0,0 +1,244 @@
+"""Asyncio Misskey API client for azkey-bot-roumu"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .misskey import Misskey
+
+
+class AsyncMisskey:
+    """Asyncio sibling of the Misskey client
+
+    Endpoint methods are coroutines that run the pooled Misskey client's
+    blocking requests in worker threads, so independent calls awaited
+    together (e.g. with asyncio.gather) overlap on the wire. A semaphore
+    bounds the number of requests in flight to the connection pool size, so
+    concurrent calls always find a warm pooled connection. Call close() when
+    done to stop the worker threads.
+    """
+
+    def __init__(self, misskey: Misskey, max_concurrency: int = None):
+        """Initialize AsyncMisskey client
+
+        Args:
+            misskey: Pooled Misskey client used for the requests
+            max_concurrency: Maximum number of requests in flight
+                (default: the client's connection pool size)
+
+        Raises:
+            ValueError: If max_concurrency is less than 1
+        """
+        max_concurrency = max_concurrency or misskey.pool_size
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        self.misskey = misskey
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="misskey"
+        )
+
+    def close(self):
+        """Stop the worker threads (the Misskey client stays open)"""
+        self._executor.shutdown()
+
+    async def _call(self, method, *args, **kwargs):
+        """Run a blocking client method in a worker thread
+
+        Args:
+            method: Bound method of the Misskey client
+
+        Returns:
+            Return value of the method
+        """
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, functools.partial(method, *args, **kwargs)
+            )
+
+    async def post(self, endpoint_path: str, data: dict = None) -> dict:
+        """Make POST request to Misskey API
+
+        Args:
+            endpoint_path: API endpoint path
+            data: Request payload (will automatically add 'i' token)
+
+        Returns:
+            API response as dictionary
+
+        Raises:
+            requests.RequestException: If API request fails
+        """
+        return await self._call(self.misskey.post, endpoint_path, data)
+
+    async def get_my_info(self, refresh: bool = False) -> dict:
+        """Get current user's information
+
+        Args:
+            refresh: Ignore the cached information and ask the server again
+                (default: False)
+
+        Returns:
+            API response containing current user's information
+        """
+        return await self._call(self.misskey.get_my_info, refresh)
+
+    async def get_followers(self, user_id: str, limit: int = 100) -> dict:
+        """Get user's followers list
+
+        Args:
+            user_id: Target user ID to get followers
+            limit: Number of followers to fetch (default: 100)
+
+        Returns:
+            API response containing followers list
+        """
+        return await self._call(self.misskey.get_followers, user_id, limit)
+
+    async def get_following(self, user_id: str, limit: int = 100) -> dict:
+        """Get user's following list
+
+        Args:
+            user_id: Target user ID to get following list
+            limit: Number of following users to fetch (default: 100)
+
+        Returns:
+            API response containing following list
+        """
+        return await self._call(self.misskey.get_following, user_id, limit)
+
+    async def follow_user(self, user_id: str) -> dict:
+        """Follow a user
+
+        Args:
+            user_id: Target user ID to follow
+
+        Returns:
+            API response
+        """
+        return await self._call(self.misskey.follow_user, user_id)
+
+    async def get_user_info(self, user_id: str) -> dict:
+        """Get user information by user ID
+
+        Args:
+            user_id: Target user ID
+
+        Returns:
+            User information from API
+        """
+        return await self._call(self.misskey.get_user_info, user_id)
+
+    async def get_users_info(self, user_ids: list[str], batch_size: int = 100) -> list:
+        """Get information of several users with the userIds form of users/show
+
+        Args:
+            user_ids: Target user IDs
+            batch_size: Number of user IDs sent per request (default: 100)
+
+        Returns:
+            List of user information; unknown user IDs are left out
+        """
+        return await self._call(self.misskey.get_users_info, user_ids, batch_size)
+
+    async def get_timeline(
+        self, limit: int = 100, until_id: str = None, since_id: str = None
+    ) -> dict:
+        """Get timeline posts
+
+        Args:
+            limit: Number of posts to fetch (default: 100)
+            until_id: Get posts before this ID for pagination
+            since_id: Get posts after this ID for pagination
+
+        Returns:
+            API response containing timeline posts
+        """
+        return await self._call(self.misskey.get_timeline, limit, until_id, since_id)
+
+    async def add_reaction(self, note_id: str, reaction: str) -> dict:
+        """Add reaction to a note
+
+        Args:
+            note_id: Target note ID to add reaction
+            reaction: Reaction emoji (e.g., "👍", "❤️", "😀")
+
+        Returns:
+            API response
+
+        Raises:
+            ValueError: If required parameters are not provided
+        """
+        return await self._call(self.misskey.add_reaction, note_id, reaction)
+
+    async def get_mentions(self, limit: int = 20, following: bool = True) -> dict:
+        """Get mentions from other users
+
+        Args:
+            limit: Number of mentions to fetch (default: 20)
+            following: If True, only get mentions from users you follow (default: True)
+
+        Returns:
+            API response containing mentions list
+        """
+        return await self._call(self.misskey.get_mentions, limit, following)
+
+    async def create_note(
+        self, text: str, reply_id: str = None, visibility: str = "public"
+    ) -> dict:
+        """Create a new note (post) or reply to an existing note
+
+        Args:
+            text: Note content
+            reply_id: ID of the note to reply to (optional)
+            visibility: Note visibility ("public", "home", "followers", "specified")
+
+        Returns:
+            API response containing created note information
+        """
+        return await self._call(self.misskey.create_note, text, reply_id, visibility)
+
+
+class EventLoopThread:
+    """Event loop running in a background daemon thread
+
+    Lets synchronous code share one long-lived event loop: run() submits a
+    coroutine to the loop and blocks until it finishes.
+    """
+
+    def __init__(self, name: str = "azkey-bot-roumu-loop"):
+        """Start the event loop thread
+
+        Args:
+            name: Thread name
+        """
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name=name, daemon=True
+        )
+        self._thread.start()
+
+    def run(self, coro):
+        """Run a coroutine on the loop and wait for its result
+
+        Args:
+            coro: Coroutine to run
+
+        Returns:
+            Result of the coroutine
+
+        Raises:
+            Exception: Any exception raised by the coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self):
+        """Stop the loop and wait for the thread to finish"""
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
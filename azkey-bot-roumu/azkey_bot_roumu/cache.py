@@ -0,0 +1,105 @@
+"""Bounded in-memory caches for azkey-bot-roumu"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# lookup() が返す「キャッシュにない」を表す値（None は「存在しない」の記録に使う）
+MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a time to live
+
+    When maxsize entries are stored, adding another evicts the least recently
+    used one. Negative entries record that a key does not exist (e.g. a
+    deleted user); they are returned as None and expire after negative_ttl,
+    which is usually shorter than ttl.
+    """
+
+    def __init__(
+        self, maxsize: int = 1000, ttl: float = 600.0, negative_ttl: float = 60.0
+    ):
+        """Initialize TTLCache
+
+        Args:
+            maxsize: Maximum number of entries (default: 1000)
+            ttl: Seconds a value stays valid (default: 600.0)
+            negative_ttl: Seconds a negative entry stays valid (default: 60.0)
+
+        Raises:
+            ValueError: If maxsize is less than 1
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        """Get a cached value
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, None for a negative entry, or MISSING if the
+            key is not cached or has expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return MISSING
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """Cache a value (None stores a negative entry)
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        ttl = self.negative_ttl if value is None else self.ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Remove a key from the cache
+
+        Args:
+            key: Cache key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Get cache statistics
+
+        Returns:
+            Dictionary containing size, hits and misses
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
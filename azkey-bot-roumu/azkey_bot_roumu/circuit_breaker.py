@@ -0,0 +1,136 @@
+"""Per-endpoint circuit breakers for Misskey API requests"""
+
+import threading
+import time
+
+import requests
+
+
+class CircuitOpenError(requests.RequestException):
+    """Request refused because the endpoint's circuit breaker is open"""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        """Initialize CircuitOpenError
+
+        Args:
+            endpoint: API endpoint path
+            retry_in: Seconds until the breaker lets a trial request through
+        """
+        super().__init__(
+            f"Circuit open for {endpoint}: failing fast for {retry_in:.1f}s"
+        )
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Circuit breaker for one endpoint
+
+    closed: requests pass; failure_threshold consecutive failures open it.
+    open: requests fail immediately with CircuitOpenError for reset_timeout.
+    half_open: one trial request passes; success closes the breaker, failure
+    opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self, endpoint: str, failure_threshold: int = 5, reset_timeout: float = 30.0
+    ):
+        """Initialize CircuitBreaker
+
+        Args:
+            endpoint: API endpoint path (used in error messages)
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds the breaker stays open before a trial
+        """
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Check whether a request may be sent
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half open with the
+                trial request already in flight
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+
+            retry_in = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == self.OPEN and retry_in <= 0:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+
+            raise CircuitOpenError(self.endpoint, max(retry_in, 0.0))
+
+    def record_success(self):
+        """Record a request that reached a healthy server"""
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Record a failed request (connection error, timeout or 5xx)"""
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class CircuitBreakers:
+    """Registry creating one CircuitBreaker per endpoint on demand"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """Initialize CircuitBreakers
+
+        Args:
+            failure_threshold: Consecutive failures that open a breaker
+            reset_timeout: Seconds a breaker stays open before a trial
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        """Get the breaker of an endpoint
+
+        Args:
+            endpoint: API endpoint path
+
+        Returns:
+            CircuitBreaker for the endpoint
+        """
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker(
+                    endpoint, self.failure_threshold, self.reset_timeout
+                )
+            return breaker
+
+    def states(self) -> dict[str, str]:
+        """Get the state of every breaker
+
+        Returns:
+            Dictionary mapping endpoint to "closed", "open" or "half_open"
+        """
+        with self._lock:
+            return {endpoint: b.state for endpoint, b in self._breakers.items()}
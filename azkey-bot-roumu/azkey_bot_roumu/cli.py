@@ -1,6 +1,9 @@
 import click
 
 from .commands import (
+    export_csv_command,
+    leaderboard_command,
+    migrate_command,
     reset_command,
     serve_command,
     status_command,
@@ -17,6 +20,9 @@ def cli():
 cli.add_command(status_command)
 cli.add_command(reset_command)
 cli.add_command(serve_command)
+cli.add_command(migrate_command)
+cli.add_command(leaderboard_command)
+cli.add_command(export_csv_command)
 
 
 if __name__ == "__main__":
@@ -1,12 +1,19 @@
+import functools
 import os
+import queue
 import signal
 import time
 
 import click
 
 from .logger import setup_logger
+from .scheduler import Stage, StageScheduler
+from .storage import STORAGE_BACKENDS
 from .usecases import Usecases
 
+# ストリーミングのバックフィルに失敗したとき、取り直すまで待つ秒数
+BACKFILL_RETRY_DELAY = 30
+
 
 @click.command("status")
 def status_command():
@@ -17,7 +24,7 @@ def status_command():
 
 @click.command("reset")
 def reset_command():
-    """Reset all users' count based on current state with structured logging"""
+    """Start a new day for all users (lazy reset) with structured logging"""
     logger = setup_logger(__name__)
 
     try:
@@ -31,9 +38,9 @@ def reset_command():
 
         # Log results
         logger.info(
-            f"action=reset_complete total_users={result['total_users']} "
-            f"consecutive_count_reset={result['consecutive_count_reset']} "
-            f"last_checkin_reset={result['last_checkin_reset']} "
+            f"action=reset_complete epoch={result['epoch']} "
+            f"previous_epoch={result['previous_epoch']} "
+            f"migrated_users={result['migrated_users']} "
             f'message="{result["message"]}"'
         )
 
@@ -42,202 +49,680 @@ def reset_command():
         raise
 
 
-@click.command("serve")
+@click.command("leaderboard")
+@click.option("--limit", default=10, help="Number of users to include (default: 10)")
+@click.option("--post", is_flag=True, help="Post leaderboard to Misskey")
+def leaderboard_command(limit, post):
+    """Show consecutive check-in leaderboard and optionally post it"""
+    logger = setup_logger(__name__)
+
+    try:
+        csv_dir = os.getenv("ROUMU_DATA_DIR")
+        usecases = Usecases(csv_dir=csv_dir)
+        usecases.load_environment_variables()
+
+        if post:
+            result = usecases.post_roumu_leaderboard(limit)
+            logger.info(
+                f"action=leaderboard_posted limit={limit} "
+                f"note_id={result.get('createdNote', {}).get('id', 'unknown')}"
+            )
+        else:
+            click.echo(usecases.build_roumu_leaderboard_text(limit))
+
+    except Exception as e:
+        logger.error(f'action=leaderboard_error error="{e}"')
+        raise
+
+
+def _check_csv_backend(backend):
+    """Reject the unsharded csv backend as a migrate/export-csv counterpart
+
+    Unsharded csv data is roumu.csv itself, so there is nothing to convert.
+    With ROUMU_SHARDS of 2 or more the data lives in shardNN/roumu.csv,
+    which is how a csv storage is resharded.
+
+    Raises:
+        click.BadParameter: If backend is csv and the storage is unsharded
+    """
+    if backend == "csv" and int(os.getenv("ROUMU_SHARDS", "1")) <= 1:
+        raise click.BadParameter(
+            "csv is only supported with ROUMU_SHARDS of 2 or more",
+            param_hint="--backend",
+        )
+
+
+@click.command("migrate")
 @click.option(
-    "--interval",
-    default=300,
-    help="Interval in seconds between runs (default: 300 = 5 minutes)",
+    "--backend",
+    type=click.Choice(STORAGE_BACKENDS),
+    default="sqlite",
+    help="Target storage backend (default: sqlite)",
 )
-def serve_command(interval):
-    """Serve mode: Run follow and check commands continuously with specified interval"""
+@click.option(
+    "--csv-file",
+    default=None,
+    help="Source CSV file (default: roumu.csv in ROUMU_DATA_DIR)",
+)
+def migrate_command(backend, csv_file):
+    """Import an existing roumu.csv into another storage backend"""
     logger = setup_logger(__name__)
+    _check_csv_backend(backend)
 
-    # Flag to control the main loop
-    shutdown_requested = False
+    try:
+        csv_dir = os.getenv("ROUMU_DATA_DIR")
+        csv_file = csv_file or os.path.join(csv_dir or "", "roumu.csv")
+        usecases = Usecases(csv_dir=csv_dir, storage=backend)
 
-    def signal_handler(signum, _frame):
-        nonlocal shutdown_requested
-        signal_name = signal.Signals(signum).name
         logger.info(
-            f'action=signal_received signal={signal_name} message="Shutdown requested"'
+            f'action=migrate_start backend={backend} source="{csv_file}" '
+            f'message="Starting migration"'
         )
-        shutdown_requested = True
 
-    # Register signal handlers for graceful shutdown
-    signal.signal(signal.SIGTERM, signal_handler)
-    signal.signal(signal.SIGINT, signal_handler)
+        result = usecases.import_roumu_csv(csv_file)
+
+        logger.info(
+            f"action=migrate_complete backend={backend} "
+            f"imported_users={result['imported_users']}"
+        )
+
+    except Exception as e:
+        logger.error(f'action=migrate_error backend={backend} error="{e}"')
+        raise
+
+
+@click.command("export-csv")
+@click.option(
+    "--backend",
+    type=click.Choice(STORAGE_BACKENDS),
+    default="sqlite",
+    help="Source storage backend (default: sqlite)",
+)
+@click.option("--csv-file", required=True, help="Destination CSV file")
+def export_csv_command(backend, csv_file):
+    """Export another storage backend back to the roumu.csv format"""
+    logger = setup_logger(__name__)
+    _check_csv_backend(backend)
 
     try:
         csv_dir = os.getenv("ROUMU_DATA_DIR")
-        usecases = Usecases(csv_dir=csv_dir)
-        usecases.load_environment_variables()
+        usecases = Usecases(csv_dir=csv_dir, storage=backend)
+
+        result = usecases.export_roumu_csv(csv_file)
 
         logger.info(
-            f'action=serve_start interval={interval} message="Starting serve mode"'
+            f'action=export_complete backend={backend} destination="{csv_file}" '
+            f"exported_users={result['exported_users']}"
         )
 
-        cycle_count = 0
+    except Exception as e:
+        logger.error(f'action=export_error backend={backend} error="{e}"')
+        raise
+
 
-        while not shutdown_requested:
-            cycle_count += 1
+def _run_follow_back(usecases, logger, cycle_count):
+    """Follow back new followers and log the result
+
+    Returns:
+        Activity of an incremental run for the adaptive interval (see Stage),
+        or None after a full reconciliation or an error
+    """
+    try:
+        logger.info(
+            f'action=follow_execute cycle={cycle_count} message="Executing follow operations"'
+        )
+        result = usecases.follow_back(limit=100)
+        logger.info(
+            f"action=follow_complete cycle={cycle_count} "
+            f"mode={result.get('mode')} "
+            f"users_to_follow_back={result.get('users_to_follow_back', 0)} "
+            f"success_count={result.get('success_count', 0)}"
+        )
+    except Exception as e:
+        logger.error(f'action=follow_error cycle={cycle_count} error="{e}"')
+        return None
+
+    # 全件照合の件数はフォロワー総数なので、間隔の調整には使わない
+    if result.get("mode") != "incremental":
+        return None
+    new_followers = result.get("total_followers", 0)
+    return {
+        "fetched": new_followers,
+        "matched": result.get("users_to_follow_back", 0),
+        "full_page": new_followers >= 100,
+    }
+
+
+def _fetch_timeline(usecases, logger, cycle_count):
+    """Fetch the timeline notes newer than the high-water mark
+
+    Returns:
+        List of posts, or None if the request failed
+    """
+    try:
+        logger.info(
+            f'action=check_execute cycle={cycle_count} message="Executing check operations"'
+        )
+        return usecases.get_new_timeline_notes(limit=100)
+    except Exception as e:
+        logger.error(f'action=check_error cycle={cycle_count} error="{e}"')
+        return None
+
+
+def _check_in_posts(usecases, logger, cycle_count, posts, processed=None):
+    """Check in the authors of posts containing a target keyword
+
+    Once the check-ins are recorded, the timeline high-water mark moves past
+    the posts so they are not fetched again.
+
+    Args:
+        posts: Posts from the timeline or the streaming API
+        processed: Posts the high-water mark may move past (default: posts);
+            used to keep the mark behind a timeline backlog
+
+    Returns:
+        Number of new posts containing a target keyword, or None on error
+    """
+    try:
+        # ページの重なり・バックフィル・再起動で再び届いた投稿は飛ばす
+        new_posts = usecases.seen_checkin_notes.filter_new(posts)
+
+        # 全キーワードを1回の走査で照合し、どのキーワードで打刻したかを数える
+        matching_posts = []
+        matched_keywords = {}
+        for post in new_posts:
+            keyword = usecases.keyword_matcher.find(post.get("text") or "")
+            if keyword is not None:
+                matching_posts.append(post)
+                matched_keywords[keyword] = matched_keywords.get(keyword, 0) + 1
+
+        successful_checkins = 0
+        failed_checkins = 0
+        already_checked_in = 0
+
+        # 1サイクル分の打刻をまとめて1回の書き込み・1回のfsyncで記録する
+        user_ids = [
+            post.get("user", {}).get("id")
+            for post in matching_posts
+            if post.get("user", {}).get("id")
+        ]
+        try:
+            with usecases.roumu_group_commit():
+                results = usecases.checkin_roumu_batch(user_ids)
+            usecases.seen_checkin_notes.add([post.get("id") for post in matching_posts])
+            usecases.mark_timeline_processed(posts if processed is None else processed)
+        except Exception as checkin_error:
+            results = {}
+            failed_checkins = len(user_ids)
+            logger.error(
+                f'action=checkin_failed cycle={cycle_count} user_count={len(user_ids)} error="{checkin_error}"'
+            )
+
+        checked_in_users = set()
+        reaction_post_ids = []
+        for post in matching_posts:
+            user_id = post.get("user", {}).get("id")
+            result = results.get(user_id)
+            if not result:
+                continue
+
+            # 同じユーザーの2件目以降の投稿は打刻済み扱い
+            if result.get("already_checked_in", False) or user_id in checked_in_users:
+                already_checked_in += 1
+                continue
+
+            checked_in_users.add(user_id)
+            successful_checkins += 1
+            if post.get("id"):
+                reaction_post_ids.append(post["id"])
+
+        # リアクションは互いに独立なので並行して送る
+        if reaction_post_ids:
+            reaction_errors = usecases.add_reactions_to_notes(reaction_post_ids, "👍")
+            for post_id, reaction_error in reaction_errors.items():
+                if reaction_error is not None:
+                    logger.warning(
+                        f'action=reaction_failed post_id={post_id} error="{reaction_error}"'
+                    )
+
+        logger.info(
+            f"action=check_complete cycle={cycle_count} "
+            f"matching_posts={len(matching_posts)} "
+            f"successful_checkins={successful_checkins} "
+            f"already_count={already_checked_in} "
+            f"failure_count={failed_checkins} "
+            f'matched_keywords="{",".join(f"{k}:{n}" for k, n in matched_keywords.items())}"'
+        )
+        return len(matching_posts)
+    except Exception as e:
+        logger.error(f'action=check_error cycle={cycle_count} error="{e}"')
+        return None
+
+
+def _run_mention_check(usecases, logger, cycle_count):
+    """Reply to new mentions with the user's roumu information
+
+    Returns:
+        Activity for the adaptive interval (see Stage), or None on error
+    """
+    try:
+        logger.info(
+            f'action=mention_check cycle={cycle_count} message="Checking for new mentions"'
+        )
+
+        # フォロー中ユーザーからのリアクションしていないメンション取得
+        fetched = usecases.get_mentions_without_reaction(limit=20, following=True)
+        # リアクションの反映前に再取得したメンションなど、返信済みのものは飛ばす
+        mentions = usecases.seen_mention_notes.filter_new(fetched)
+        activity = {
+            "fetched": len(mentions),
+            "matched": len(mentions),
+            "full_page": len(fetched) >= 20,
+        }
+
+        if not mentions:
             logger.info(
-                f'action=serve_cycle_start cycle={cycle_count} message="Starting new cycle"'
+                f'action=no_new_mentions cycle={cycle_count} message="No new mentions found"'
             )
+            return activity
 
-            # Execute follow and check operations directly
-            try:
-                logger.info(
-                    f'action=follow_execute cycle={cycle_count} message="Executing follow operations"'
+        logger.info(
+            f'action=mentions_found cycle={cycle_count} count={len(mentions)} message="Processing mentions"'
+        )
+
+        # ユーザー情報のリプライと処理済みマークのリアクションを
+        # メンションごとに並行して送る
+        responses = usecases.respond_to_mentions(mentions, "👍")
+        usecases.seen_mention_notes.add(
+            [
+                response["mention"].get("id")
+                for response in responses
+                if response["reply_error"] is None
+            ]
+        )
+
+        for i, response in enumerate(responses, 1):
+            mention = response["mention"]
+            user = mention.get("user", {})
+            user_id = user.get("id", "")
+            username = user.get("username", "unknown")
+            mention_id = mention.get("id", "")
+
+            logger.info(
+                f"action=mention_process cycle={cycle_count} mention_number={i} "
+                f'user_id={user_id} username="{username}" mention_id={mention_id}'
+            )
+
+            reply_error = response["reply_error"]
+            if reply_error is not None:
+                logger.error(
+                    f"action=mention_reply_failed cycle={cycle_count} "
+                    f'user_id={user_id} username="{username}" mention_id={mention_id} error="{reply_error}"'
+                )
+                continue
+
+            reply_result = response["reply"]
+            logger.info(
+                f"action=mention_reply_success cycle={cycle_count} "
+                f'user_id={user_id} username="{username}" mention_id={mention_id} '
+                f"reply_id={reply_result.get('createdNote', {}).get('id', 'unknown')}"
+            )
+
+            reaction_error = response["reaction_error"]
+            if reaction_error is not None:
+                logger.warning(
+                    f"action=mention_reaction_failed cycle={cycle_count} "
+                    f'mention_id={mention_id} error="{reaction_error}"'
                 )
-                result = usecases.follow_back(limit=100)
+            else:
                 logger.info(
-                    f"action=follow_complete cycle={cycle_count} "
-                    f"users_to_follow_back={result.get('users_to_follow_back', 0)} "
-                    f"success_count={result.get('success_count', 0)}"
+                    f"action=mention_reaction_added cycle={cycle_count} mention_id={mention_id} reaction=👍"
                 )
-            except Exception as e:
-                logger.error(f'action=follow_error cycle={cycle_count} error="{e}"')
 
+        logger.info(
+            f"action=mention_processing_complete cycle={cycle_count} "
+            f'processed_count={len(mentions)} message="All mentions processed"'
+        )
+        return activity
+
+    except Exception as e:
+        logger.error(f'action=mention_check_error cycle={cycle_count} error="{e}"')
+        return None
+
+
+def _run_timeline_check(usecases, logger, cycle_count):
+    """Check in the authors of new timeline posts
+
+    Returns:
+        Activity for the adaptive interval (see Stage), or None on error
+    """
+    timeline = _fetch_timeline(usecases, logger, cycle_count)
+    if timeline is None:
+        return None
+    if not timeline:
+        logger.info(
+            f'action=timeline_empty cycle={cycle_count} message="No new notes on the timeline"'
+        )
+        return {"fetched": 0, "matched": 0, "full_page": False}
+
+    matched = _check_in_posts(usecases, logger, cycle_count, timeline)
+    if matched is None:
+        return None
+    # ページ数の上限で打ち切られたときだけ、未取得の投稿が溜まっている
+    return {
+        "fetched": len(timeline),
+        "matched": matched,
+        "full_page": usecases.timeline_backlog,
+    }
+
+
+def _log_connection_stats(usecases, logger, cycle_count):
+    """Log connection reuse statistics (cumulative since startup)"""
+    stats = usecases.get_connection_stats()
+    logger.info(
+        f"action=serve_stats cycle={cycle_count} "
+        f"http_requests={stats['requests']} "
+        f"connections_opened={stats['connections_opened']} "
+        f"connections_reused={stats['connections_reused']}"
+    )
+
+
+def _serve_poll(usecases, logger, stage_options, is_shutdown_requested) -> int:
+    """Run the polling stages concurrently until shutdown is requested
+
+    Args:
+        stage_options: Dictionary mapping stage name ("follow", "check",
+            "mention", "stats") to keyword arguments of Stage (interval,
+            timeout, min_interval, max_interval)
+
+    Returns:
+        Number of stage runs
+    """
+    stage_funcs = {
+        "follow": _run_follow_back,
+        "check": _run_timeline_check,
+        # メンションが来ていないか確認し、来ていたら処理する
+        "mention": _run_mention_check,
+        "stats": _log_connection_stats,
+    }
+    stages = [
+        Stage(
+            name,
+            functools.partial(func, usecases, logger),
+            **stage_options[name],
+        )
+        for name, func in stage_funcs.items()
+    ]
+    runs = StageScheduler(stages, logger).run(is_shutdown_requested)
+    return sum(runs.values())
+
+
+def _serve_stream(usecases, logger, follow_interval, is_shutdown_requested) -> int:
+    """Handle streaming API events until shutdown is requested
+
+    Timeline notes are checked in as they arrive and a mention event runs the
+    mention check. Every (re)connection backfills the timeline and mentions
+    with REST, since events sent while disconnected are not replayed. A
+    backfill cut off by its page limit continues on the following batches,
+    and until it catches up live notes do not move the timeline high-water
+    mark. Follow back runs when someone follows the bot and every
+    follow_interval seconds.
+
+    Returns:
+        Number of event batches handled
+    """
+    stream = usecases.create_stream()
+    stream.start()
+
+    cycle_count = 0
+    next_follow_back = 0.0
+    backlog = False
+    next_backfill = 0.0
+
+    try:
+        while not is_shutdown_requested():
+            if time.monotonic() >= next_follow_back:
+                cycle_count += 1
+                _run_follow_back(usecases, logger, cycle_count)
+                next_follow_back = time.monotonic() + follow_interval
+
+            # 1秒ごとに停止要求を確認しながらイベントを待つ
             try:
-                logger.info(
-                    f'action=check_execute cycle={cycle_count} message="Executing check operations"'
-                )
-                timeline = usecases.get_timeline(limit=100)
-                if timeline:
-                    TARGET_KEYWORDS = ["ログインボーナス", "ログボ", "打刻", "出勤"]
-                    matching_posts = []
-                    for post in timeline:
-                        text = post.get("text", "")
-                        if text and any(keyword in text for keyword in TARGET_KEYWORDS):
-                            matching_posts.append(post)
-
-                    successful_checkins = 0
-                    failed_checkins = 0
-                    already_checked_in = 0
-                    for post in matching_posts:
-                        user_id = post.get("user", {}).get("id")
-                        if user_id:
-                            try:
-                                result = usecases.checkin_roumu(user_id)
-                                if result.get("already_checked_in", False):
-                                    already_checked_in += 1
-                                else:
-                                    successful_checkins += 1
-                                    post_id = post.get("id")
-                                    if post_id:
-                                        try:
-                                            usecases.add_reaction_to_note(post_id, "👍")
-                                        except Exception as reaction_error:
-                                            logger.warning(
-                                                f'action=reaction_failed post_id={post_id} error="{reaction_error}"'
-                                            )
-                            except Exception as checkin_error:
-                                failed_checkins += 1
-                                logger.error(
-                                    f'action=checkin_failed user_id={user_id} post_id={post.get("id")} error="{checkin_error}"'
-                                )
+                events = [stream.events.get(timeout=1)]
+            except queue.Empty:
+                # 取り残した投稿があれば、イベントがなくても続きを取得する
+                if not backlog or time.monotonic() < next_backfill:
+                    continue
+                events = []
+            # 溜まっているイベントはまとめて処理する
+            while True:
+                try:
+                    events.append(stream.events.get_nowait())
+                except queue.Empty:
+                    break
 
+            cycle_count += 1
+            posts = {}
+            backfill = False
+            mentioned = False
+            followed = False
+            for kind, body in events:
+                if kind == "connected":
                     logger.info(
-                        f"action=check_complete cycle={cycle_count} "
-                        f"matching_posts={len(matching_posts)} "
-                        f"successful_checkins={successful_checkins} "
-                        f"already_count={already_checked_in} "
-                        f"failure_count={failed_checkins}"
+                        f"action=stream_connected cycle={cycle_count} "
+                        f"reconnect={body['reconnect']}"
                     )
-                else:
+                    backfill = True
+                elif kind == "disconnected":
+                    logger.warning(
+                        f'action=stream_disconnected cycle={cycle_count} error="{body["error"]}"'
+                    )
+                elif kind == "note" and isinstance(body, dict):
+                    posts[body.get("id")] = body
+                elif kind == "mention":
+                    mentioned = True
+                elif kind == "followed":
+                    followed = True
+
+            backfilled = []
+            if backfill or (backlog and time.monotonic() >= next_backfill):
+                # 切断中（起動前を含む）の投稿とメンションを REST で取り直す
+                timeline = _fetch_timeline(usecases, logger, cycle_count)
+                backfilled = timeline or []
+                for post in backfilled:
+                    posts.setdefault(post.get("id"), post)
+                # 取得に失敗したか打ち切られたら、次のバッチで続きを取る
+                backlog = timeline is None or usecases.timeline_backlog
+                next_backfill = time.monotonic() + (
+                    BACKFILL_RETRY_DELAY if timeline is None else 0
+                )
+                if backlog:
                     logger.info(
-                        f'action=timeline_empty cycle={cycle_count} message="Timeline is empty"'
+                        f"action=timeline_backlog cycle={cycle_count} "
+                        f"backfilled={len(backfilled)} "
+                        f'message="Continuing backfill on the next batch"'
                     )
-            except Exception as e:
-                logger.error(f'action=check_error cycle={cycle_count} error="{e}"')
-
-            # メンションが来ていないか確認し、来ていたら処理する
-            try:
-                logger.info(
-                    f'action=mention_check cycle={cycle_count} message="Checking for new mentions"'
+            if backfill:
+                mentioned = True
+
+            if posts:
+                # 取り残しがある間は、ライブの投稿でマークを追い越さない
+                _check_in_posts(
+                    usecases,
+                    logger,
+                    cycle_count,
+                    list(posts.values()),
+                    processed=backfilled if backlog else None,
                 )
 
-                # フォロー中ユーザーからのリアクションしていないメンション取得
-                mentions = usecases.get_mentions_without_reaction(
-                    limit=20, following=True
-                )
+            if mentioned:
+                _run_mention_check(usecases, logger, cycle_count)
 
-                if mentions:
-                    logger.info(
-                        f'action=mentions_found cycle={cycle_count} count={len(mentions)} message="Processing mentions"'
-                    )
+            if followed:
+                _run_follow_back(usecases, logger, cycle_count)
+                next_follow_back = time.monotonic() + follow_interval
+    finally:
+        stream.stop()
 
-                    for i, mention in enumerate(mentions, 1):
-                        user = mention.get("user", {})
-                        user_id = user.get("id", "")
-                        username = user.get("username", "unknown")
-                        mention_id = mention.get("id", "")
-                        text = mention.get("text", "")
-
-                        logger.info(
-                            f"action=mention_process cycle={cycle_count} mention_number={i} "
-                            f'user_id={user_id} username="{username}" mention_id={mention_id}'
-                        )
-
-                        try:
-                            # ユーザー情報をリプライで返す
-                            reply_result = usecases.reply_user_info(mention)
-
-                            logger.info(
-                                f"action=mention_reply_success cycle={cycle_count} "
-                                f'user_id={user_id} username="{username}" mention_id={mention_id} '
-                                f"reply_id={reply_result.get('createdNote', {}).get('id', 'unknown')}"
-                            )
-
-                            # メンションにリアクションを追加（処理済みマーク）
-                            try:
-                                usecases.add_reaction_to_note(mention_id, "👍")
-                                logger.info(
-                                    f"action=mention_reaction_added cycle={cycle_count} mention_id={mention_id} reaction=👍"
-                                )
-                            except Exception as reaction_error:
-                                logger.warning(
-                                    f"action=mention_reaction_failed cycle={cycle_count} "
-                                    f'mention_id={mention_id} error="{reaction_error}"'
-                                )
-
-                        except Exception as reply_error:
-                            logger.error(
-                                f"action=mention_reply_failed cycle={cycle_count} "
-                                f'user_id={user_id} username="{username}" mention_id={mention_id} error="{reply_error}"'
-                            )
+    return cycle_count
 
-                    logger.info(
-                        f"action=mention_processing_complete cycle={cycle_count} "
-                        f'processed_count={len(mentions)} message="All mentions processed"'
-                    )
-                else:
-                    logger.info(
-                        f'action=no_new_mentions cycle={cycle_count} message="No new mentions found"'
-                    )
 
-            except Exception as e:
-                logger.error(
-                    f'action=mention_check_error cycle={cycle_count} error="{e}"'
-                )
+@click.command("serve")
+@click.option(
+    "--interval",
+    default=300,
+    help="Interval in seconds between runs (default: 300 = 5 minutes)",
+)
+@click.option(
+    "--follow-interval",
+    type=float,
+    default=None,
+    help="Seconds between follow-back runs (default: --interval)",
+)
+@click.option(
+    "--check-interval",
+    type=float,
+    default=None,
+    help="Seconds between timeline checks (default: --interval)",
+)
+@click.option(
+    "--mention-interval",
+    type=float,
+    default=None,
+    help="Seconds between mention checks (default: --interval)",
+)
+@click.option(
+    "--follow-timeout",
+    type=float,
+    default=600,
+    help="Seconds before a follow-back run is reported as overdue (default: 600)",
+)
+@click.option(
+    "--check-timeout",
+    type=float,
+    default=300,
+    help="Seconds before a timeline check is reported as overdue (default: 300)",
+)
+@click.option(
+    "--mention-timeout",
+    type=float,
+    default=300,
+    help="Seconds before a mention check is reported as overdue (default: 300)",
+)
+@click.option(
+    "--adaptive",
+    is_flag=True,
+    help="Adapt each polling interval to activity between --min-interval and "
+    "--max-interval",
+)
+@click.option(
+    "--min-interval",
+    type=float,
+    default=30,
+    help="Shortest adaptive interval in seconds (default: 30)",
+)
+@click.option(
+    "--max-interval",
+    type=float,
+    default=1800,
+    help="Longest adaptive interval in seconds (default: 1800 = 30 minutes)",
+)
+@click.option(
+    "--stream",
+    is_flag=True,
+    help="Receive notes and mentions from the streaming API instead of polling "
+    "(follow back still runs every --follow-interval seconds)",
+)
+def serve_command(
+    interval,
+    follow_interval,
+    check_interval,
+    mention_interval,
+    follow_timeout,
+    check_timeout,
+    mention_timeout,
+    adaptive,
+    min_interval,
+    max_interval,
+    stream,
+):
+    """Serve mode: Run the follow, check and mention stages concurrently, each on its own interval"""
+    logger = setup_logger(__name__)
 
-            logger.info(
-                f'action=serve_cycle_complete cycle={cycle_count} message="Cycle completed"'
-            )
+    # Flag to control the main loop
+    shutdown_requested = False
+    cycle_count = 0
 
-            # Check for shutdown before sleeping
-            if shutdown_requested:
-                break
+    def signal_handler(signum, _frame):
+        nonlocal shutdown_requested
+        signal_name = signal.Signals(signum).name
+        logger.info(
+            f'action=signal_received signal={signal_name} message="Shutdown requested"'
+        )
+        shutdown_requested = True
 
-            # Wait for the specified interval with periodic checks for shutdown
-            logger.info(
-                f'action=serve_sleep cycle={cycle_count} interval={interval} message="Sleeping until next cycle"'
-            )
-            sleep_remaining = interval
-            while sleep_remaining > 0 and not shutdown_requested:
-                sleep_time = min(1, sleep_remaining)  # Check every second
-                time.sleep(sleep_time)
-                sleep_remaining -= sleep_time
+    def is_shutdown_requested():
+        return shutdown_requested
+
+    # Register signal handlers for graceful shutdown
+    signal.signal(signal.SIGTERM, signal_handler)
+    signal.signal(signal.SIGINT, signal_handler)
+
+    try:
+        csv_dir = os.getenv("ROUMU_DATA_DIR")
+        usecases = Usecases(csv_dir=csv_dir)
+        usecases.load_environment_variables()
+
+        # 統計ログは活動量と無関係なので常に --interval ごとに出す
+        bounds = {"min_interval": min_interval, "max_interval": max_interval}
+        stage_options = {
+            "follow": {
+                "interval": follow_interval or interval,
+                "timeout": follow_timeout,
+            },
+            "check": {"interval": check_interval or interval, "timeout": check_timeout},
+            "mention": {
+                "interval": mention_interval or interval,
+                "timeout": mention_timeout,
+            },
+        }
+        if adaptive:
+            for options in stage_options.values():
+                options.update(bounds)
+        stage_options["stats"] = {"interval": interval}
+
+        mode = "stream" if stream else "poll"
+        logger.info(
+            f"action=serve_start mode={mode} "
+            f"follow_interval={stage_options['follow']['interval']} "
+            f"check_interval={stage_options['check']['interval']} "
+            f"mention_interval={stage_options['mention']['interval']} "
+            f"adaptive={adaptive} "
+            f'message="Starting serve mode"'
+        )
+
+        # 自分のアカウント情報は起動時に一度だけ取得してキャッシュする
+        try:
+            my_user_id = usecases.get_my_user_id()
+            logger.info(f"action=identity_resolved user_id={my_user_id}")
+        except Exception as e:
+            # 取得できなくても最初に必要になったときに再取得される
+            logger.error(f'action=identity_error error="{e}"')
+
+        try:
+            if stream:
+                cycle_count = _serve_stream(
+                    usecases,
+                    logger,
+                    stage_options["follow"]["interval"],
+                    is_shutdown_requested,
+                )
+            else:
+                cycle_count = _serve_poll(
+                    usecases, logger, stage_options, is_shutdown_requested
+                )
+        finally:
+            usecases.close()
 
         logger.info(
             f'action=serve_stop cycle={cycle_count} message="Serve mode stopped gracefully"'
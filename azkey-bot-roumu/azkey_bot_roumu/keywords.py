@@ -0,0 +1,142 @@
+"""Check-in keyword matching for azkey-bot-roumu"""
+
+import os
+import unicodedata
+from collections import deque
+
+# 打刻として扱うデフォルトのキーワード
+DEFAULT_KEYWORDS = ["ログインボーナス", "ログボ", "打刻", "出勤"]
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for keyword matching
+
+    NFKC folds full-width alphanumerics and half-width katakana into their
+    usual forms (e.g. "ﾛｸﾞﾎﾞ" becomes "ログボ"), and casefold() ignores case.
+
+    Args:
+        text: Text to normalize
+
+    Returns:
+        Normalized text
+    """
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def load_keywords(keywords: str = None, keywords_file: str = None) -> list[str]:
+    """Load the check-in keywords
+
+    Args:
+        keywords: Comma-separated keywords (default: ROUMU_KEYWORDS)
+        keywords_file: File with one keyword per line; empty lines and lines
+            starting with "#" are ignored (default: ROUMU_KEYWORDS_FILE)
+
+    Returns:
+        Keywords from the file and the list, or DEFAULT_KEYWORDS if neither
+        is set
+
+    Raises:
+        OSError: If the keyword file cannot be read
+    """
+    keywords = keywords if keywords is not None else os.getenv("ROUMU_KEYWORDS")
+    keywords_file = (
+        keywords_file if keywords_file is not None else os.getenv("ROUMU_KEYWORDS_FILE")
+    )
+    if not keywords and not keywords_file:
+        return list(DEFAULT_KEYWORDS)
+
+    loaded = []
+    if keywords_file:
+        with open(keywords_file, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    loaded.append(line)
+    if keywords:
+        loaded.extend(keyword.strip() for keyword in keywords.split(","))
+    return [keyword for keyword in dict.fromkeys(loaded) if keyword]
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton matching many keywords in one pass
+
+    The automaton is built once from the normalized keywords; matching then
+    reads each character of the text once, however many keywords there are.
+    """
+
+    def __init__(self, keywords: list[str]):
+        """Build the automaton
+
+        Args:
+            keywords: Keywords to match
+
+        Raises:
+            ValueError: If no non-empty keyword is given
+        """
+        self.keywords = [keyword for keyword in keywords if normalize_text(keyword)]
+        if not self.keywords:
+            raise ValueError("At least one keyword is required")
+
+        # 状態ごとの遷移・失敗遷移・一致するキーワード（出現順の番号）
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[list[int]] = [[]]
+
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in normalize_text(keyword):
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(index)
+
+        # 幅優先で失敗遷移を作り、接尾辞で終わるキーワードも出力に含める
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def _matches(self, text: str):
+        """Yield keyword indexes in the order their matches end in the text"""
+        state = 0
+        for char in normalize_text(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            yield from self._output[state]
+
+    def find(self, text: str) -> str | None:
+        """Find the first keyword in a text
+
+        Args:
+            text: Text to search
+
+        Returns:
+            The keyword (as configured) whose match ends first, or None
+        """
+        for index in self._matches(text or ""):
+            return self.keywords[index]
+        return None
+
+    def find_all(self, text: str) -> list[str]:
+        """Find every keyword contained in a text
+
+        Args:
+            text: Text to search
+
+        Returns:
+            Matched keywords (as configured) in order of first match
+        """
+        found = dict.fromkeys(self.keywords[i] for i in self._matches(text or ""))
+        return list(found)
@@ -1,15 +1,112 @@
 """Misskey API client for azkey-bot-roumu"""
 
+import random
+import time
+from collections.abc import Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from .circuit_breaker import CircuitBreakers
+from .ratelimit import RateLimiter, parse_retry_after
+
+# Server errors worth retrying; other error responses are final
+RETRYABLE_STATUS_CODES = {500, 502, 503, 504}
+
+# Endpoints whose requests must not be sent twice (a retry would duplicate
+# the note). They are retried only if the connection was never established.
+NON_IDEMPOTENT_ENDPOINTS = {"/api/notes/create"}
+
+# Status codes meaning the token was rejected; they drop the cached identity
+AUTH_ERROR_STATUS_CODES = {401, 403}
+
+
+def _is_connect_error(error: requests.RequestException) -> bool:
+    """Check whether a request failed before it reached the server"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and error.args:
+        reason = error.args[0]
+        if isinstance(reason, MaxRetryError):
+            reason = reason.reason
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+class MisskeyAPIError(requests.RequestException):
+    """Error response from the Misskey API"""
+
+    def __init__(self, message: str, status_code: int, retry_after: float = None):
+        """Initialize MisskeyAPIError
+
+        Args:
+            message: Error message
+            status_code: HTTP status code of the response
+            retry_after: Seconds from Retry-After, if the server sent one
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
 
-class Misskey:
-    """Misskey API client class"""
 
-    def __init__(self, misskey_url: str, i: str):
+class Misskey:
+    """Misskey API client class
+
+    Requests go through one pooled requests.Session, so consecutive API calls
+    reuse warm keep-alive connections instead of paying a new TCP and TLS
+    handshake each time. Create one client and keep it for the lifetime of
+    the process; call close() when done.
+
+    Requests are paced per endpoint by a RateLimiter. A 429 response teaches
+    the limiter the endpoint's limit and the request is queued and sent
+    again after Retry-After instead of failing.
+
+    Connection errors, timeouts and 5xx responses are retried with jittered
+    exponential backoff (NON_IDEMPOTENT_ENDPOINTS only on connect errors).
+    Each endpoint has a circuit breaker; while it is open, requests fail
+    immediately with CircuitOpenError instead of waiting for timeouts.
+
+    The bot's own account (/api/i) is fetched once and cached; an auth error
+    (401/403) drops the cache so the next lookup asks the server again.
+    """
+
+    def __init__(
+        self,
+        misskey_url: str,
+        i: str,
+        pool_size: int = 10,
+        gzip: bool = True,
+        rate_limit_retries: int = 5,
+        rate_limiter: RateLimiter = None,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        circuit_breakers: CircuitBreakers = None,
+    ):
         """Initialize Misskey client
 
         Args:
             misskey_url: Misskey server endpoint (e.g., "https://azkey.azuki.blue")
             i: Access token for authentication
+            pool_size: Maximum number of kept-alive connections (default: 10)
+            gzip: Ask the server for gzip/deflate compressed responses
+                (default: True)
+            rate_limit_retries: Times a rate limited request is queued and
+                sent again before giving up (default: 5)
+            rate_limiter: Rate limiter to use (default: a new RateLimiter)
+            connect_timeout: Connect timeout in seconds (default: 5.0)
+            read_timeout: Read timeout in seconds (default: 30.0)
+            max_retries: Retries after a connection error, timeout or 5xx
+                (default: 3)
+            backoff_base: Backoff ceiling of the first retry in seconds; it
+                doubles per retry and the actual wait is random below it
+                (default: 0.5)
+            backoff_max: Maximum backoff ceiling in seconds (default: 8.0)
+            circuit_breakers: Per-endpoint circuit breakers to use
+                (default: new CircuitBreakers)
 
         Raises:
             ValueError: If required parameters are not provided
@@ -18,10 +115,67 @@ class Misskey:
             raise ValueError("misskey_url is required")
         if not i:
             raise ValueError("Access token 'i' is required")
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
 
         self.misskey_endpoint = misskey_url.rstrip("/")  # Remove trailing slash
         self.i = i
-        self.headers = {"Content-Type": "application/json"}
+        self.pool_size = pool_size
+        self.rate_limit_retries = rate_limit_retries
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.circuit_breakers = circuit_breakers or CircuitBreakers()
+        self._my_info = None
+        self.headers = {
+            "Content-Type": "application/json",
+            "Connection": "keep-alive",
+            "Accept-Encoding": "gzip, deflate" if gzip else "identity",
+        }
+
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # Only one host is used, so one pool of pool_size connections suffices
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+
+    def close(self):
+        """Close the session and its pooled connections"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def connection_stats(self) -> dict:
+        """Get connection reuse statistics of the session
+
+        Returns:
+            Dictionary with requests (sent), connections_opened (new TCP
+            connections), connections_reused (requests sent over an
+            existing connection) and pool_size
+        """
+        pools = self._adapter.poolmanager.pools
+        total_requests = 0
+        connections_opened = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue  # Evicted meanwhile
+            total_requests += pool.num_requests
+            connections_opened += pool.num_connections
+
+        return {
+            "requests": total_requests,
+            "connections_opened": connections_opened,
+            "connections_reused": max(total_requests - connections_opened, 0),
+            "pool_size": self.pool_size,
+        }
 
     def get_api_url(self, endpoint_path: str) -> str:
         """Get full API URL
@@ -47,33 +201,93 @@ class Misskey:
             API response as dictionary
 
         Raises:
+            MisskeyAPIError: If the API returns an error response (including
+                429 after rate_limit_retries attempts)
+            CircuitOpenError: If the endpoint's circuit breaker is open
             requests.RequestException: If API request fails
         """
-        import requests
-
         url = self.get_api_url(endpoint_path)
+        breaker = self.circuit_breakers.get(endpoint_path)
+        idempotent = endpoint_path not in NON_IDEMPOTENT_ENDPOINTS
 
         # Prepare payload with authentication token
         payload = data.copy() if data else {}
         payload["i"] = self.i
 
-        response = requests.post(url, headers=self.headers, json=payload)
-
-        if not response.ok:
-            # エラーレスポンスの詳細を含める
+        retries = 0
+        rate_limit_retries = 0
+        while True:
+            breaker.before_request()
+            self.rate_limiter.acquire(endpoint_path)
             try:
-                error_detail = response.json()
-                raise requests.RequestException(
-                    f"HTTP {response.status_code}: {error_detail}"
-                )
-            except ValueError:
-                # JSONパースできない場合
-                raise requests.RequestException(
-                    f"HTTP {response.status_code}: {response.text}"
-                ) from None
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                breaker.record_failure()
+                if retries < self.max_retries and (idempotent or _is_connect_error(e)):
+                    self._backoff(retries)
+                    retries += 1
+                    continue
+                raise
+
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                breaker.record_failure()
+                if idempotent and retries < self.max_retries:
+                    self._backoff(
+                        retries, parse_retry_after(response.headers.get("Retry-After"))
+                    )
+                    retries += 1
+                    continue
+                break
+
+            # 2xx / 4xx はサーバーが応答できている
+            breaker.record_success()
+            if (
+                response.status_code == 429
+                and rate_limit_retries < self.rate_limit_retries
+            ):
+                # 制限を学習し、Retry-After まで待ってから送り直す
+                self.rate_limiter.on_rate_limited(endpoint_path, response.headers)
+                rate_limit_retries += 1
+                continue
+            break
 
+        if not response.ok:
+            if response.status_code in AUTH_ERROR_STATUS_CODES:
+                self._my_info = None
+            raise self._error_from_response(response)
+
+        self.rate_limiter.on_response(endpoint_path, response.headers)
+        # リアクションなど結果を返さないエンドポイントは 204 No Content
+        if response.status_code == 204 or not response.content:
+            return {}
         return response.json()
 
+    def _backoff(self, retry: int, retry_after: float = None):
+        """Sleep before a retry with full-jitter exponential backoff
+
+        Args:
+            retry: Number of retries already made
+            retry_after: Minimum wait requested by the server, if any
+        """
+        ceiling = min(self.backoff_max, self.backoff_base * 2**retry)
+        time.sleep(max(random.uniform(0, ceiling), retry_after or 0))
+
+    @staticmethod
+    def _error_from_response(response: requests.Response) -> MisskeyAPIError:
+        """Build a MisskeyAPIError from an error response"""
+        # エラーレスポンスの詳細を含める
+        try:
+            error_detail = response.json()
+        except ValueError:
+            # JSONパースできない場合
+            error_detail = response.text
+
+        return MisskeyAPIError(
+            f"HTTP {response.status_code}: {error_detail}",
+            status_code=response.status_code,
+            retry_after=parse_retry_after(response.headers.get("Retry-After")),
+        )
+
     def get_followers(self, user_id: str, limit: int = 100) -> dict:
         """Get user's followers list
 
@@ -102,13 +316,99 @@ class Misskey:
 
         return self.post("/api/users/following", payload)
 
-    def get_my_info(self) -> dict:
+    def iter_followers(
+        self, user_id: str, page_size: int = 100, since_id: str = None
+    ) -> Iterator[dict]:
+        """Iterate over a user's followers
+
+        Pages are fetched lazily as the iteration proceeds: newest first with
+        untilId, or only relations newer than since_id (in the server's
+        order) with sinceId.
+
+        Args:
+            user_id: Target user ID to get followers
+            page_size: Number of followers per request (default: 100)
+            since_id: Only follower relations with a newer ID (optional)
+
+        Yields:
+            Follower relations ({"id": ..., "follower": {...}, ...})
+        """
+        yield from self._iter_relations(
+            "/api/users/followers", user_id, page_size, since_id
+        )
+
+    def iter_following(self, user_id: str, page_size: int = 100) -> Iterator[dict]:
+        """Iterate over all users a user follows, newest first
+
+        Pages are fetched lazily with untilId as the iteration proceeds.
+
+        Args:
+            user_id: Target user ID to get following list
+            page_size: Number of following users per request (default: 100)
+
+        Yields:
+            Following relations ({"id": ..., "followee": {...}, ...})
+        """
+        yield from self._iter_relations("/api/users/following", user_id, page_size)
+
+    def _iter_relations(
+        self, endpoint_path: str, user_id: str, page_size: int, since_id: str = None
+    ) -> Iterator[dict]:
+        """Page through a relation list with untilId (or sinceId)
+
+        Args:
+            endpoint_path: /api/users/followers or /api/users/following
+            user_id: Target user ID
+            page_size: Number of relations per request
+            since_id: Walk forward from this relation ID instead of
+                backward from the newest (optional)
+
+        Yields:
+            Relation objects
+        """
+        until_id = None
+        while True:
+            payload = {"userId": user_id, "limit": page_size}
+            if since_id:
+                payload["sinceId"] = since_id
+            elif until_id:
+                payload["untilId"] = until_id
+
+            page = self.post(endpoint_path, payload)
+            if not isinstance(page, list) or not page:
+                return
+
+            yield from page
+
+            if len(page) < page_size:
+                return
+
+            # Misskey IDs sort in time order, so the page's extreme ID is the
+            # cursor regardless of the order the server returned
+            ids = [item["id"] for item in page if item.get("id")]
+            if not ids:
+                return
+            if since_id:
+                since_id = max(ids)
+            else:
+                until_id = min(ids)
+
+    def get_my_info(self, refresh: bool = False) -> dict:
         """Get current user's information
 
+        The response is cached for the lifetime of the client.
+
+        Args:
+            refresh: Ignore the cached information and ask the server again
+                (default: False)
+
         Returns:
             API response containing current user's information
         """
-        return self.post("/api/i")
+        my_info = self._my_info
+        if my_info is None or refresh:
+            my_info = self._my_info = self.post("/api/i")
+        return my_info
 
     def follow_user(self, user_id: str) -> dict:
         """Follow a user
@@ -136,12 +436,34 @@ class Misskey:
 
         return self.post("/api/users/show", payload)
 
-    def get_timeline(self, limit: int = 100, until_id: str = None) -> dict:
+    def get_users_info(self, user_ids: list[str], batch_size: int = 100) -> list:
+        """Get information of several users with the userIds form of users/show
+
+        Args:
+            user_ids: Target user IDs
+            batch_size: Number of user IDs sent per request (default: 100)
+
+        Returns:
+            List of user information; unknown user IDs are left out
+        """
+        users = []
+        for start in range(0, len(user_ids), batch_size):
+            payload = {"userIds": user_ids[start : start + batch_size]}
+            response = self.post("/api/users/show", payload)
+            if isinstance(response, list):
+                users.extend(response)
+        return users
+
+    def get_timeline(
+        self, limit: int = 100, until_id: str = None, since_id: str = None
+    ) -> dict:
         """Get timeline posts
 
         Args:
             limit: Number of posts to fetch (default: 100)
             until_id: Get posts before this ID for pagination
+            since_id: Get posts after this ID; without until_id Misskey
+                returns the oldest matching posts first
 
         Returns:
             API response containing timeline posts
@@ -150,6 +472,8 @@ class Misskey:
 
         if until_id:
             payload["untilId"] = until_id
+        if since_id:
+            payload["sinceId"] = since_id
 
         return self.post("/api/notes/timeline", payload)
 
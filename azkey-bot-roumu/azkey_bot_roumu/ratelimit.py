@@ -0,0 +1,256 @@
+"""Per-endpoint rate limiting for Misskey API requests"""
+
+import threading
+import time
+from collections import deque
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header value
+
+    Args:
+        value: Header value, either delay seconds or an HTTP date
+
+    Returns:
+        Seconds to wait, or None if the value is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max((retry_at - datetime.now(UTC)).total_seconds(), 0.0)
+
+
+def _header_float(headers, name: str) -> float | None:
+    """Get a numeric header value, or None if missing or invalid"""
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket that paces callers instead of rejecting them
+
+    reserve() always takes a token and returns how long the caller has to
+    wait for it, so concurrent callers queue up in order. A bucket without
+    a rate is unlimited until a limit is learned.
+    """
+
+    def __init__(self, rate: float = None, capacity: float = 1.0):
+        """Initialize TokenBucket
+
+        Args:
+            rate: Tokens added per second (default: None = unlimited)
+            capacity: Maximum number of stored tokens (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float):
+        """Add the tokens earned since the last update"""
+        if self.rate is not None:
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+        self._updated = now
+
+    def reserve(self, now: float) -> float:
+        """Take a token
+
+        Args:
+            now: Current time.monotonic()
+
+        Returns:
+            Seconds to wait before the request may be sent
+        """
+        self._refill(now)
+        wait = max(self._blocked_until - now, 0.0)
+        if self.rate is None:
+            return wait
+
+        self._tokens -= 1
+        if self._tokens < 0:
+            wait = max(wait, -self._tokens / self.rate)
+        return wait
+
+    def is_blocked(self, now: float) -> bool:
+        """Check whether requests are held back by block()"""
+        return now < self._blocked_until
+
+    def block(self, now: float, seconds: float):
+        """Hold back all requests for the given time and drain the bucket"""
+        self._refill(now)
+        self._blocked_until = max(self._blocked_until, now + seconds)
+        self._tokens = min(self._tokens, 0.0)
+
+    def set_limit(self, rate: float, capacity: float, now: float):
+        """Set the rate and burst size"""
+        self._refill(now)
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = min(self._tokens, capacity)
+
+    def limit_tokens(self, tokens: float, now: float):
+        """Lower the stored tokens to at most the given number"""
+        self._refill(now)
+        self._tokens = min(self._tokens, tokens)
+
+
+class RateLimiter:
+    """Per-endpoint token bucket scheduler that learns limits from 429s
+
+    Endpoints start unlimited. When the server answers 429, the endpoint's
+    bucket is blocked for Retry-After and gets a rate: from Misskey's
+    X-RateLimit-Limit / X-RateLimit-Clear headers when present, otherwise
+    half of the request rate observed before the 429. Every successful
+    response raises a learned rate a little again (additive increase), and
+    X-RateLimit-Remaining, when sent, resynchronizes the bucket's tokens.
+    """
+
+    def __init__(
+        self,
+        default_backoff: float = 1.0,
+        min_rate: float = 0.05,
+        increase: float = 0.01,
+        window: float = 60.0,
+        sleep=time.sleep,
+    ):
+        """Initialize RateLimiter
+
+        Args:
+            default_backoff: Wait after a 429 without Retry-After (seconds)
+            min_rate: Lowest learned rate (requests per second)
+            increase: Rate added after each successful request
+            window: Period used to measure the observed request rate (seconds)
+            sleep: Function used to wait (default: time.sleep)
+        """
+        self.default_backoff = default_backoff
+        self.min_rate = min_rate
+        self.increase = increase
+        self.window = window
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._buckets: dict[str, TokenBucket] = {}
+        self._recent: dict[str, deque] = {}
+        self._header_limits: set[str] = set()
+
+    def _bucket(self, endpoint: str) -> TokenBucket:
+        """Get the bucket of an endpoint (the caller must hold the lock)"""
+        bucket = self._buckets.get(endpoint)
+        if bucket is None:
+            bucket = self._buckets[endpoint] = TokenBucket()
+            self._recent[endpoint] = deque()
+        return bucket
+
+    def acquire(self, endpoint: str) -> float:
+        """Wait until a request to the endpoint may be sent
+
+        Args:
+            endpoint: API endpoint path
+
+        Returns:
+            Seconds waited
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = self._bucket(endpoint).reserve(now)
+
+            recent = self._recent[endpoint]
+            recent.append(now + wait)
+            while recent and recent[0] < now - self.window:
+                recent.popleft()
+
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def on_response(self, endpoint: str, headers):
+        """Learn from a successful response
+
+        Args:
+            endpoint: API endpoint path
+            headers: Response headers
+        """
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(endpoint)
+            self._apply_headers(endpoint, bucket, headers, now)
+            if bucket.rate is not None and endpoint not in self._header_limits:
+                bucket.set_limit(bucket.rate + self.increase, bucket.capacity, now)
+
+    def on_rate_limited(self, endpoint: str, headers) -> float:
+        """Learn from a 429 response
+
+        Args:
+            endpoint: API endpoint path
+            headers: Response headers
+
+        Returns:
+            Seconds the endpoint is blocked for
+        """
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(endpoint)
+
+            if not self._apply_headers(
+                endpoint, bucket, headers, now
+            ) and not bucket.is_blocked(now):
+                # Multiplicative decrease from the learned or observed rate,
+                # once per 429 episode rather than per in-flight request
+                recent = self._recent[endpoint]
+                if bucket.rate is not None:
+                    rate = bucket.rate
+                else:
+                    rate = len(recent) / max(now - recent[0], 1.0) if recent else 1.0
+                bucket.set_limit(max(rate / 2, self.min_rate), 1.0, now)
+
+            retry_after = parse_retry_after(headers.get("Retry-After"))
+            if retry_after is None:
+                retry_after = _header_float(headers, "X-RateLimit-Reset")
+            if retry_after is None:
+                retry_after = self.default_backoff
+            bucket.block(now, retry_after)
+            return retry_after
+
+    def _apply_headers(self, endpoint: str, bucket: TokenBucket, headers, now) -> bool:
+        """Apply Misskey's X-RateLimit-* headers to a bucket
+
+        Returns:
+            True if the headers described the limit
+        """
+        limit = _header_float(headers, "X-RateLimit-Limit")
+        clear = _header_float(headers, "X-RateLimit-Clear")
+        if not limit or not clear:
+            return False
+
+        # The server's bucket refills completely in X-RateLimit-Clear seconds
+        self._header_limits.add(endpoint)
+        bucket.set_limit(max(limit / clear, self.min_rate), limit, now)
+        remaining = _header_float(headers, "X-RateLimit-Remaining")
+        if remaining is not None:
+            bucket.limit_tokens(remaining, now)
+        return True
+
+    def stats(self) -> dict[str, float | None]:
+        """Get the learned rate of each endpoint
+
+        Returns:
+            Dictionary mapping endpoint to requests per second (None for
+            endpoints without a learned limit)
+        """
+        with self._lock:
+            return {endpoint: bucket.rate for endpoint, bucket in self._buckets.items()}
@@ -0,0 +1,549 @@
+"""Roumu data management for fixed-width binary records"""
+
+import heapq
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from .roumu_data import (
+    apply_checkin,
+    consecutive_count_of,
+    effective_user,
+    fcntl,
+    fsync_directory,
+)
+
+USER_ID_SIZE = 32
+# Header: magic, generation, record count, epoch, previous epoch
+HEADER = struct.Struct("<4sIIqq")
+# Record: user_id (NUL padded), consecutive_count, total_count, last_checkin
+RECORD = struct.Struct(f"<{USER_ID_SIZE}sIIq")
+MAGIC = b"RMU1"
+NO_EPOCH = -1
+
+# Timestamps are stored as microseconds since 1970-01-01 in local time,
+# matching the naive ISO timestamps used by the other backends
+_EPOCH_ORIGIN = datetime(1970, 1, 1)
+
+
+def _to_micros(timestamp: str) -> int:
+    """Convert an ISO timestamp ("" for none) to stored microseconds"""
+    if not timestamp:
+        return 0
+    return (datetime.fromisoformat(timestamp) - _EPOCH_ORIGIN) // timedelta(
+        microseconds=1
+    )
+
+
+def _from_micros(micros: int) -> str:
+    """Convert stored microseconds to an ISO timestamp ("" for none)"""
+    if micros <= 0:
+        return ""
+    return (_EPOCH_ORIGIN + timedelta(microseconds=micros)).isoformat()
+
+
+class BinaryRoumuData:
+    """Fixed-width binary record storage for roumu check-in tracking
+
+    Every user is one 48-byte record in a memory-mapped file, and an
+    in-memory hash index maps user_id to record number. A check-in of a known
+    user rewrites its record in place under a byte-range lock covering only
+    that record. New users are appended under a lock on the header, which
+    also holds the day epoch, so reset_count only touches the header.
+
+    Writes are flushed to disk with msync before an operation returns. Inside
+    a group_commit window the flush is deferred to the end of the window.
+
+    import_users replaces the whole file and must not run while other
+    processes are using it.
+    """
+
+    def __init__(self, binary_file_path: str = "roumu.bin"):
+        """Initialize BinaryRoumuData with binary file path
+
+        Args:
+            binary_file_path: Path to the binary file (default: "roumu.bin")
+
+        Raises:
+            ValueError: If the file is not a roumu binary file
+        """
+        self.binary_file_path = binary_file_path
+        self.fieldnames = [
+            "user_id",
+            "consecutive_count",
+            "total_count",
+            "last_checkin",
+        ]
+
+        # POSIX byte-range locks are per process, so threads need their own lock
+        self._lock = threading.RLock()
+        self._index: dict[str, int] = {}
+        self._indexed_count = 0
+        self._generation = None
+        self._group_commit_depth = 0
+        self._dirty = False
+        # Number of byte-range locks held, and maps replaced while holding them
+        self._locks_held = 0
+        self._retired_maps: list[mmap.mmap] = []
+
+        if not os.path.exists(self.binary_file_path):
+            self._create_binary_file()
+
+        self._file = open(self.binary_file_path, "r+b")
+        self._map = None
+        self._remap()
+
+        if HEADER.unpack_from(self._map, 0)[0] != MAGIC:
+            raise ValueError(f"Not a roumu binary file: {self.binary_file_path}")
+
+    def _create_binary_file(self):
+        """Create binary file with an empty header
+
+        The header is written to a temporary file and linked into place, so
+        other processes never see a file without a header.
+        """
+        tmp_file_path = f"{self.binary_file_path}.{os.getpid()}.tmp"
+        with open(tmp_file_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, 0, 0, NO_EPOCH, 0))
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(tmp_file_path, self.binary_file_path)
+            fsync_directory(self.binary_file_path)
+        except FileExistsError:
+            pass  # Another process created it first
+        finally:
+            os.unlink(tmp_file_path)
+
+    def close(self):
+        """Close the memory map and the file"""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self._close_retired_maps()
+            self._file.close()
+
+    @contextmanager
+    def group_commit(self):
+        """Group commit window for a burst of writes
+
+        Writes inside the window are flushed with a single msync when the
+        window closes. Other threads of this process wait for the window.
+        """
+        with self._lock:
+            if self._group_commit_depth:
+                yield
+                return
+
+            self._group_commit_depth = 1
+            try:
+                yield
+            finally:
+                self._group_commit_depth = 0
+                if self._dirty:
+                    self._flush()
+
+    def _flush(self):
+        """Flush written pages to disk"""
+        self._map.flush()
+        self._dirty = False
+
+    def _commit(self):
+        """Flush writes now, or at the end of the group commit window"""
+        if self._group_commit_depth:
+            self._dirty = True
+        else:
+            self._flush()
+
+    @contextmanager
+    def _range_lock(self, start: int, length: int, exclusive: bool = False):
+        """Byte-range lock context manager
+
+        Args:
+            start: First byte of the range
+            length: Length of the range (0 locks to the end of the file)
+            exclusive: Acquire an exclusive lock instead of a shared one
+        """
+        if fcntl is None:
+            yield
+            return
+
+        fileno = self._file.fileno()
+        fcntl.lockf(
+            fileno, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH, length, start
+        )
+        self._locks_held += 1
+        try:
+            yield
+        finally:
+            fcntl.lockf(fileno, fcntl.LOCK_UN, length, start)
+            self._locks_held -= 1
+            if not self._locks_held:
+                self._close_retired_maps()
+
+    def _header_lock(self, exclusive: bool = False):
+        """Lock the header (record count and day epoch)"""
+        return self._range_lock(0, HEADER.size, exclusive)
+
+    def _record_lock(self, record_number: int, exclusive: bool = False):
+        """Lock a single record"""
+        return self._range_lock(
+            self._record_offset(record_number), RECORD.size, exclusive
+        )
+
+    @staticmethod
+    def _record_offset(record_number: int) -> int:
+        """Get the file offset of a record"""
+        return HEADER.size + record_number * RECORD.size
+
+    def _remap(self):
+        """Map the whole file again if another process resized it
+
+        An mmap keeps its own duplicate of the file descriptor, and closing
+        any descriptor of a file drops every POSIX lock the process holds on
+        it. A map replaced while locks are held is therefore kept open until
+        the last lock is released.
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        if self._map is not None and len(self._map) == size:
+            return
+        if self._map is not None:
+            if self._locks_held:
+                self._retired_maps.append(self._map)
+            else:
+                self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), size)
+
+    def _close_retired_maps(self):
+        """Close the maps replaced while locks were held"""
+        while self._retired_maps:
+            self._retired_maps.pop().close()
+
+    def _read_header(self) -> tuple[int, int, int, int]:
+        """Read (generation, record count, epoch, previous epoch)"""
+        return HEADER.unpack_from(self._map, 0)[1:]
+
+    def _write_header(self, generation: int, count: int, epoch: int, previous: int):
+        """Write the header fields"""
+        HEADER.pack_into(self._map, 0, MAGIC, generation, count, epoch, previous)
+
+    def _read_user(self, record_number: int) -> dict[str, str]:
+        """Read a record as a CSV-compatible user dictionary"""
+        user_id, consecutive_count, total_count, last_checkin = RECORD.unpack_from(
+            self._map, self._record_offset(record_number)
+        )
+        return {
+            "user_id": user_id.rstrip(b"\0").decode("utf-8"),
+            "consecutive_count": str(consecutive_count),
+            "total_count": str(total_count),
+            "last_checkin": _from_micros(last_checkin),
+        }
+
+    def _write_user(self, record_number: int, user: dict[str, str]):
+        """Write a user dictionary into a record
+
+        Raises:
+            ValueError: If the user_id does not fit into a record
+        """
+        user_id = user["user_id"].encode("utf-8")
+        if len(user_id) > USER_ID_SIZE:
+            raise ValueError(f"user_id too long for binary storage: {user['user_id']}")
+
+        RECORD.pack_into(
+            self._map,
+            self._record_offset(record_number),
+            user_id,
+            int(user.get("consecutive_count") or 0),
+            int(user.get("total_count") or 0),
+            _to_micros(user.get("last_checkin") or ""),
+        )
+
+    def _sync_locked(self) -> tuple[int, int, int, int]:
+        """Catch up with records appended by other processes
+
+        The caller must hold the header lock.
+
+        Returns:
+            Current header fields
+        """
+        self._remap()
+        header = self._read_header()
+        generation, count = header[0], header[1]
+
+        if generation != self._generation:
+            # Whole file was replaced by import_users, rebuild the index
+            self._index = {}
+            self._indexed_count = 0
+            self._generation = generation
+
+        for record_number in range(self._indexed_count, count):
+            user_id = RECORD.unpack_from(self._map, self._record_offset(record_number))[
+                0
+            ]
+            self._index[user_id.rstrip(b"\0").decode("utf-8")] = record_number
+        self._indexed_count = count
+
+        return header
+
+    def _sync(self) -> tuple[int, int, int, int]:
+        """Catch up with other processes under a shared header lock"""
+        with self._header_lock():
+            return self._sync_locked()
+
+    @staticmethod
+    def _epoch_from_header(epoch: int, previous: int) -> dict[str, str] | None:
+        """Convert header epoch fields to the shared epoch dictionary"""
+        if epoch == NO_EPOCH:
+            return None
+        return {"epoch": _from_micros(epoch), "previous_epoch": _from_micros(previous)}
+
+    def load_epoch(self) -> dict[str, str] | None:
+        """Load the day epoch written by the last reset
+
+        Returns:
+            Dictionary with "epoch" and "previous_epoch", or None if no lazy
+            reset has run yet
+        """
+        with self._lock:
+            _, _, epoch, previous = self._sync()
+            return self._epoch_from_header(epoch, previous)
+
+    def save_epoch(self, epoch: dict[str, str]):
+        """Save the day epoch
+
+        Args:
+            epoch: Dictionary with "epoch" and "previous_epoch"
+        """
+        with self._lock, self._header_lock(exclusive=True):
+            generation, count, _, _ = self._sync_locked()
+            self._write_header(
+                generation,
+                count,
+                _to_micros(epoch["epoch"]),
+                _to_micros(epoch["previous_epoch"]),
+            )
+            self._commit()
+
+    def load_all_users(self) -> list[dict[str, str]]:
+        """Load all user data from the binary file
+
+        Returns:
+            List of user dictionaries
+        """
+        with self._lock:
+            count = self._sync()[1]
+            with self._range_lock(self._record_offset(0), 0):
+                return [self._read_user(n) for n in range(count)]
+
+    def get_user(self, user_id: str) -> dict[str, str] | None:
+        """Get specific user data by user_id
+
+        Args:
+            user_id: Target user ID
+
+        Returns:
+            User dictionary or None if not found
+        """
+        with self._lock:
+            _, _, epoch, previous = self._sync()
+            record_number = self._index.get(user_id)
+            if record_number is None:
+                return None
+
+            with self._record_lock(record_number):
+                user = self._read_user(record_number)
+            return effective_user(user, self._epoch_from_header(epoch, previous))
+
+    def update_checkin(self, user_id: str) -> dict[str, any]:
+        """Update user check-in data in place
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Dictionary with update results
+        """
+        return self.update_checkins([user_id])[user_id]
+
+    def update_checkins(self, user_ids: list[str]) -> dict[str, dict[str, any]]:
+        """Update check-in data for a batch of users
+
+        Known users are updated in place under per-record locks; new users
+        are appended under the header lock.
+
+        Args:
+            user_ids: User IDs to check in
+
+        Returns:
+            Dictionary mapping each unique user ID (in first-seen order) to
+            its update results
+        """
+        current_time = datetime.now().isoformat()
+        results = {}
+
+        with self._lock:
+            _, _, epoch, previous = self._sync()
+            epoch = self._epoch_from_header(epoch, previous)
+
+            new_user_ids = []
+            for user_id in dict.fromkeys(user_ids):
+                if user_id in self._index:
+                    results[user_id] = self._checkin_record(
+                        self._index[user_id], user_id, epoch, current_time
+                    )
+                else:
+                    results[user_id] = None
+                    new_user_ids.append(user_id)
+
+            if new_user_ids:
+                with self._header_lock(exclusive=True):
+                    generation, count, _, _ = self._sync_locked()
+
+                    for user_id in new_user_ids:
+                        if user_id in self._index:
+                            # Appended by another process in the meantime
+                            results[user_id] = self._checkin_record(
+                                self._index[user_id], user_id, epoch, current_time
+                            )
+                            continue
+
+                        updated_user, results[user_id] = apply_checkin(
+                            None, user_id, current_time
+                        )
+                        self._ensure_capacity(count + 1)
+                        self._write_user(count, updated_user)
+                        self._index[user_id] = count
+                        count += 1
+
+                    self._indexed_count = count
+                    self._write_header(generation, count, *self._read_header()[2:])
+
+            self._commit()
+
+        return results
+
+    def _checkin_record(
+        self,
+        record_number: int,
+        user_id: str,
+        epoch: dict[str, str] | None,
+        current_time: str,
+    ) -> dict[str, any]:
+        """Check in an existing user by rewriting its record in place"""
+        with self._record_lock(record_number, exclusive=True):
+            updated_user, result = apply_checkin(
+                effective_user(self._read_user(record_number), epoch),
+                user_id,
+                current_time,
+            )
+            if updated_user is not None:
+                self._write_user(record_number, updated_user)
+        return result
+
+    def _ensure_capacity(self, count: int):
+        """Grow the file so it can hold at least count records
+
+        The caller must hold the header lock. The file grows geometrically
+        so appends stay amortized O(1).
+        """
+        required_size = self._record_offset(count)
+        if len(self._map) >= required_size:
+            return
+
+        capacity = max(count, 2 * (len(self._map) - HEADER.size) // RECORD.size, 1024)
+        os.ftruncate(self._file.fileno(), self._record_offset(capacity))
+        self._remap()
+
+    def reset_count(self, current_time: str = None) -> dict:
+        """Start a new day by advancing the day epoch in the header
+
+        See RoumuData.reset_count for the lazy reset rules and the one-time
+        conversion of older data.
+
+        Args:
+            current_time: ISO format time of the new epoch (default: now)
+
+        Returns:
+            Dictionary with reset results
+        """
+        current_time = current_time or datetime.now().isoformat()
+        migrated_users = 0
+
+        with self._lock, self._header_lock(exclusive=True):
+            generation, count, epoch, _ = self._sync_locked()
+
+            if epoch == NO_EPOCH:
+                with self._range_lock(self._record_offset(0), 0, exclusive=True):
+                    for record_number in range(count):
+                        user = self._read_user(record_number)
+                        if not user["last_checkin"]:
+                            user["consecutive_count"] = "0"
+                            self._write_user(record_number, user)
+                migrated_users = count
+
+            new_epoch = {
+                "epoch": current_time,
+                "previous_epoch": _from_micros(epoch) if epoch != NO_EPOCH else "",
+            }
+            self._write_header(
+                generation,
+                count,
+                _to_micros(new_epoch["epoch"]),
+                _to_micros(new_epoch["previous_epoch"]),
+            )
+            self._commit()
+
+        return {
+            **new_epoch,
+            "migrated_users": migrated_users,
+            "message": f"Advanced day epoch to {current_time}",
+            "success": True,
+        }
+
+    def import_users(self, users: list[dict[str, str]]) -> int:
+        """Replace all user data with the given users (used for migration)
+
+        Args:
+            users: List of user dictionaries to import
+
+        Returns:
+            Number of imported users
+        """
+        with self._lock, self._range_lock(0, 0, exclusive=True):
+            generation, _, epoch, previous = self._sync_locked()
+
+            os.ftruncate(self._file.fileno(), self._record_offset(len(users)))
+            self._remap()
+            for record_number, user in enumerate(users):
+                self._write_user(record_number, user)
+            self._write_header(generation + 1, len(users), epoch, previous)
+            self._commit()
+
+            self._sync_locked()
+
+        return len(users)
+
+    def get_leaderboard(self, limit: int = 10) -> list[dict[str, any]]:
+        """Get leaderboard sorted by consecutive count
+
+        Args:
+            limit: Maximum number of users to return
+
+        Returns:
+            List of users sorted by consecutive count (descending)
+        """
+        epoch = self.load_epoch()
+        top_users = heapq.nlargest(
+            limit,
+            (effective_user(user, epoch) for user in self.load_all_users()),
+            key=consecutive_count_of,
+        )
+
+        for user in top_users:
+            user["consecutive_count_int"] = consecutive_count_of(user)
+
+        return top_users
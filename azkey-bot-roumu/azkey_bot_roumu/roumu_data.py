@@ -1,7 +1,10 @@
 """Roumu data management for CSV persistence"""
 
 import csv
+import heapq
+import json
 import os
+import threading
 from contextlib import contextmanager
 from datetime import datetime
 
@@ -12,8 +15,124 @@ except ImportError:
     fcntl = None
 
 
+def fsync_directory(file_path: str):
+    """Flush a directory entry change (e.g. a rename) to disk
+
+    Args:
+        file_path: Path of a file inside the directory
+    """
+    if not hasattr(os, "O_DIRECTORY"):
+        return  # Not supported on this platform (e.g., Windows)
+
+    dir_fd = os.open(os.path.dirname(file_path) or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def consecutive_count_of(user: dict[str, str]) -> int:
+    """Get a user row's consecutive count as an integer
+
+    Args:
+        user: User dictionary
+
+    Returns:
+        Consecutive count (0 if empty)
+    """
+    return int(user["consecutive_count"]) if user["consecutive_count"] else 0
+
+
+def effective_user(
+    user: dict[str, str] | None, epoch: dict[str, str] | None
+) -> dict[str, str] | None:
+    """Evaluate a stored user row against the current day epoch
+
+    Rows are not rewritten at the day boundary. A last_checkin before the
+    current epoch no longer counts as today's check-in, and a last_checkin
+    before the previous epoch means the streak is broken.
+
+    Args:
+        user: Stored user dictionary, or None
+        epoch: Day epoch from load_epoch(), or None before the first lazy reset
+
+    Returns:
+        Copy of the user dictionary as of the current day (None if user is None)
+    """
+    if user is None:
+        return None
+
+    current_user = dict(user)
+    if epoch is None:
+        return current_user
+
+    last_checkin = user.get("last_checkin") or ""
+    if not last_checkin or last_checkin < epoch["previous_epoch"]:
+        current_user["consecutive_count"] = "0"
+    if last_checkin < epoch["epoch"]:
+        current_user["last_checkin"] = ""
+    return current_user
+
+
+def apply_checkin(
+    user: dict[str, str] | None, user_id: str, current_time: str
+) -> tuple[dict[str, str] | None, dict[str, any]]:
+    """Apply a check-in to a single user row
+
+    Shared by all storage backends so check-in rules stay identical. The
+    user row must already be evaluated with effective_user().
+
+    Args:
+        user: Existing user row, or None for a new user
+        user_id: User ID
+        current_time: Check-in timestamp (ISO format)
+
+    Returns:
+        Tuple of (updated row or None if already checked in, result dictionary)
+    """
+    consecutive_count = (
+        int(user["consecutive_count"]) if user and user["consecutive_count"] else 0
+    )
+    total_count = (
+        int(user.get("total_count", "0")) if user and user.get("total_count") else 0
+    )
+
+    # Check if user already checked in today
+    if user and user["last_checkin"] and user["last_checkin"].strip():
+        # User already checked in, return current status without update
+        return None, {
+            "user_id": user_id,
+            "consecutive_count": consecutive_count,
+            "total_count": total_count,
+            "last_checkin": user["last_checkin"],
+            "was_new_user": False,
+            "already_checked_in": True,
+        }
+
+    updated_user = {
+        "user_id": user_id,
+        "consecutive_count": str(consecutive_count + 1),
+        "total_count": str(total_count + 1),
+        "last_checkin": current_time,
+    }
+    return updated_user, {
+        "user_id": user_id,
+        "consecutive_count": consecutive_count + 1,
+        "total_count": total_count + 1,
+        "last_checkin": current_time,
+        "was_new_user": user is None,
+        "already_checked_in": False,
+    }
+
+
 class RoumuData:
-    """CSV-based data storage for roumu check-in tracking"""
+    """CSV-based data storage for roumu check-in tracking
+
+    Snapshots are written to a temporary file, fsynced and renamed over
+    roumu.csv, so a crash never leaves a half-written file behind. Locking
+    uses a separate roumu.csv.lock file because the rename replaces the
+    data file's inode.
+    """
 
     def __init__(self, csv_file_path: str = "roumu.csv"):
         """Initialize RoumuData with CSV file path
@@ -22,6 +141,8 @@ class RoumuData:
             csv_file_path: Path to the CSV file (default: "roumu.csv")
         """
         self.csv_file_path = csv_file_path
+        self.lock_file_path = f"{csv_file_path}.lock"
+        self.epoch_file_path = f"{csv_file_path}.epoch"
         self.fieldnames = [
             "user_id",
             "consecutive_count",
@@ -29,67 +150,227 @@ class RoumuData:
             "last_checkin",
         ]
 
+        # Parsed rows, valid while the file's (mtime_ns, size, inode) match:
+        # (signature, users, position of each user_id in users).
+        # Replaced as a whole so concurrent readers never see a mixed state.
+        self._cache = (None, [], {})
+
+        # Per-thread lock depth, and rows written inside a group commit
+        # window that are not flushed to disk yet
+        self._local = threading.local()
+        self._group_commit_depth = 0
+        self._pending_users = None
+
         # Create CSV file with headers if it doesn't exist
         if not os.path.exists(self.csv_file_path):
             self._create_csv_file()
 
     @contextmanager
-    def _file_lock(self, mode="r"):
-        """File locking context manager for safe concurrent access
+    def _file_lock(self, exclusive: bool = False):
+        """Lock context manager for safe concurrent access
 
-        This implementation fixes the race condition by acquiring the lock
-        before truncating the file in write mode.
+        The lock is taken on roumu.csv.lock and is reentrant within a thread,
+        so a group commit window can hold it across several operations.
 
         Args:
-            mode: File mode ('r' for read, 'w' for write, 'a' for append)
-
-        Yields:
-            File object with appropriate lock applied
+            exclusive: Acquire an exclusive lock instead of a shared one
         """
-        if fcntl is None:
-            # Fallback for systems without fcntl (e.g., Windows)
-            with open(self.csv_file_path, mode, newline="", encoding="utf-8") as f:
-                yield f
+        if getattr(self._local, "lock_depth", 0):
+            # Already held by this thread
+            self._local.lock_depth += 1
+            try:
+                yield
+            finally:
+                self._local.lock_depth -= 1
             return
 
-        if "w" in mode:
-            # For write mode, we need to avoid the race condition where
-            # open("w") truncates before we can acquire the lock
+        with open(self.lock_file_path, "a", encoding="utf-8") as lockfile:
+            if fcntl is not None:
+                fcntl.flock(
+                    lockfile.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                )
+            self._local.lock_depth = 1
+            try:
+                yield
+            finally:
+                self._local.lock_depth = 0
+
+    def close(self):
+        """Release held resources (files are only open during operations)"""
+
+    @contextmanager
+    def group_commit(self):
+        """Group commit window for a burst of writes
+
+        Writes inside the window only update the in-memory rows. They are
+        flushed together with a single snapshot write and fsync when the
+        window closes. The exclusive lock is held for the whole window.
+        """
+        with self._file_lock(exclusive=True):
+            if self._group_commit_depth:
+                yield
+                return
+
+            self._group_commit_depth = 1
+            try:
+                yield
+            finally:
+                self._group_commit_depth = 0
+                pending_users, self._pending_users = self._pending_users, None
+                if pending_users is not None:
+                    self._write_snapshot(pending_users)
+
+    def _write_snapshot(self, users: list[dict[str, str]]):
+        """Atomically replace the CSV file with the given users
+
+        Args:
+            users: List of user dictionaries to write
+        """
+        tmp_file_path = f"{self.csv_file_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file_path, "w", newline="", encoding="utf-8") as csvfile:
+                self._write_users(csvfile, users)
+                os.fsync(csvfile.fileno())
+            os.replace(tmp_file_path, self.csv_file_path)
+        except BaseException:
+            if os.path.exists(tmp_file_path):
+                os.unlink(tmp_file_path)
+            raise
+        fsync_directory(self.csv_file_path)
+
+    def _load_users(self) -> tuple[list[dict[str, str]], dict[str, int]]:
+        """Get current user rows, including unflushed group commit writes
+
+        The caller must hold the lock.
+
+        Returns:
+            Tuple of (user dictionaries, position of each user_id); the
+            dictionaries must not be modified
 
-            # First, open in read+write mode without truncating
-            with open(self.csv_file_path, "r+", newline="", encoding="utf-8") as f:
-                # Acquire exclusive lock first
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        Raises:
+            FileNotFoundError: If the CSV file does not exist
+        """
+        if self._pending_users is not None:
+            return self._cache[1], self._cache[2]
 
-                # Now safely clear the file contents for writing
-                # (truncate() removes all existing data to prepare for new content)
-                f.seek(0)  # Move to beginning of file
-                f.truncate()  # Clear all file contents (file size becomes 0)
+        with open(self.csv_file_path, newline="", encoding="utf-8") as csvfile:
+            return self._read_users_cached(csvfile)
 
-                yield f
+    def _store_users(self, users: list[dict[str, str]]):
+        """Persist user rows, deferred while a group commit window is open
 
-        elif "a" in mode:
-            # For append mode, no truncation occurs, so we can open normally
-            with open(self.csv_file_path, mode, newline="", encoding="utf-8") as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # Exclusive lock for writing
-                yield f
+        The caller must hold the exclusive lock.
 
+        Args:
+            users: List of user dictionaries to save
+        """
+        if self._group_commit_depth:
+            self._pending_users = users
+            self._set_cache(users, None)
         else:
-            # For read mode, open normally
-            with open(self.csv_file_path, mode, newline="", encoding="utf-8") as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_SH)  # Shared lock for reading
-                yield f
+            self._write_snapshot(users)
 
     def _create_csv_file(self):
         """Create CSV file with headers"""
-        # If file doesn't exist, create it first for r+ mode to work
-        if not os.path.exists(self.csv_file_path):
-            with open(self.csv_file_path, "w", newline="", encoding="utf-8"):
-                pass  # Create empty file
+        with self._file_lock(exclusive=True):
+            if not os.path.exists(self.csv_file_path):
+                self._write_snapshot([])
+
+    def _read_users(self, csvfile) -> list[dict[str, str]]:
+        """Read user rows from an open CSV file
+
+        Args:
+            csvfile: File object positioned at the start of the CSV
+
+        Returns:
+            List of normalized user dictionaries
+        """
+        users = []
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            if row and row.get("user_id"):  # Skip empty rows
+                # Ensure all required fields exist with default values
+                normalized_row = {
+                    "user_id": row.get("user_id", ""),
+                    "consecutive_count": row.get("consecutive_count", "0"),
+                    "total_count": row.get(
+                        "total_count", row.get("consecutive_count", "0")
+                    ),
+                    "last_checkin": row.get("last_checkin", ""),
+                }
+                users.append(normalized_row)
+        return users
+
+    def _write_users(
+        self, csvfile, users: list[dict[str, str]]
+    ) -> list[dict[str, str]]:
+        """Write header and user rows to an open, empty CSV file
+
+        The written rows become the parsed cache for the new file contents.
+
+        Args:
+            csvfile: File object to write to
+            users: List of user dictionaries to write
+
+        Returns:
+            List of normalized user dictionaries that were written
+        """
+        written_users = []
+        writer = csv.DictWriter(csvfile, fieldnames=self.fieldnames)
+        writer.writeheader()
+        for user in users:
+            # Ensure all required fields exist before writing
+            normalized_user = {
+                "user_id": user.get("user_id", ""),
+                "consecutive_count": user.get("consecutive_count", "0"),
+                "total_count": user.get("total_count", "0"),
+                "last_checkin": user.get("last_checkin", ""),
+            }
+            writer.writerow(normalized_user)
+            written_users.append(normalized_user)
+
+        csvfile.flush()
+        self._set_cache(written_users, self._file_signature(csvfile))
+        return written_users
+
+    @staticmethod
+    def _file_signature(csvfile) -> tuple[int, int, int]:
+        """Get (mtime_ns, size, inode) of an open file"""
+        stat = os.fstat(csvfile.fileno())
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _set_cache(self, users: list[dict[str, str]], signature: tuple[int, int, int]):
+        """Replace the parsed cache
+
+        Args:
+            users: Parsed user dictionaries
+            signature: File signature the users were read from or written to
+        """
+        positions = {}
+        for position, user in enumerate(users):
+            positions.setdefault(user["user_id"], position)
+        self._cache = (signature, users, positions)
+
+    def _read_users_cached(
+        self, csvfile
+    ) -> tuple[list[dict[str, str]], dict[str, int]]:
+        """Read user rows, reparsing only if the file changed since last time
 
-        with self._file_lock("w") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=self.fieldnames)
-            writer.writeheader()
+        The file is considered unchanged while its (mtime_ns, size, inode)
+        stay the same, which also catches rewrites by other processes such as
+        the reset job.
+
+        Args:
+            csvfile: Locked file object positioned at the start of the CSV
+
+        Returns:
+            Tuple of (cached user dictionaries, position of each user_id);
+            the cached dictionaries must not be modified
+        """
+        signature = self._file_signature(csvfile)
+        if signature != self._cache[0]:
+            self._set_cache(self._read_users(csvfile), signature)
+        return self._cache[1], self._cache[2]
 
     def load_all_users(self) -> list[dict[str, str]]:
         """Load all user data from CSV
@@ -97,26 +378,13 @@ class RoumuData:
         Returns:
             List of user dictionaries
         """
-        users = []
         try:
-            with self._file_lock("r") as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    if row and row.get("user_id"):  # Skip empty rows
-                        # Ensure all required fields exist with default values
-                        normalized_row = {
-                            "user_id": row.get("user_id", ""),
-                            "consecutive_count": row.get("consecutive_count", "0"),
-                            "total_count": row.get(
-                                "total_count", row.get("consecutive_count", "0")
-                            ),
-                            "last_checkin": row.get("last_checkin", ""),
-                        }
-                        users.append(normalized_row)
+            with self._file_lock():
+                users, _ = self._load_users()
         except FileNotFoundError:
             # File doesn't exist yet, return empty list
-            pass
-        return users
+            return []
+        return [dict(user) for user in users]
 
     def get_user(self, user_id: str) -> dict[str, str] | None:
         """Get specific user data by user_id
@@ -127,11 +395,16 @@ class RoumuData:
         Returns:
             User dictionary or None if not found
         """
-        users = self.load_all_users()
-        for user in users:
-            if user["user_id"] == user_id:
-                return user
-        return None
+        try:
+            with self._file_lock():
+                users, positions = self._load_users()
+        except FileNotFoundError:
+            return None
+
+        position = positions.get(user_id)
+        if position is None:
+            return None
+        return effective_user(users[position], self.load_epoch())
 
     def update_checkin(self, user_id: str) -> dict[str, any]:
         """Update user check-in data
@@ -142,106 +415,121 @@ class RoumuData:
         Returns:
             Dictionary with update results
         """
+        return self.update_checkins([user_id])[user_id]
+
+    def update_checkins(self, user_ids: list[str]) -> dict[str, dict[str, any]]:
+        """Update check-in data for a batch of users
+
+        The CSV is read and written once under a single exclusive lock.
+        Duplicate user IDs in the batch are checked in only once.
+
+        Args:
+            user_ids: User IDs to check in
+
+        Returns:
+            Dictionary mapping each unique user ID (in first-seen order) to
+            its update results
+        """
         # Ensure CSV file exists with proper headers
         if not os.path.exists(self.csv_file_path):
             self._create_csv_file()
 
-        users = self.load_all_users()
         current_time = datetime.now().isoformat()
-
-        # Check if user already checked in today
-        for user in users:
-            if user["user_id"] == user_id:
-                if user["last_checkin"] and user["last_checkin"].strip():
-                    # User already checked in, return current status without update
-                    return {
-                        "user_id": user_id,
-                        "consecutive_count": int(user["consecutive_count"])
-                        if user["consecutive_count"]
-                        else 0,
-                        "total_count": int(user.get("total_count", "0"))
-                        if user.get("total_count")
-                        else 0,
-                        "last_checkin": user["last_checkin"],
-                        "was_new_user": False,
-                        "already_checked_in": True,
-                    }
-                break
-
-        # Find existing user or create new entry
-        user_found = False
-        for user in users:
-            if user["user_id"] == user_id:
-                # Update existing user
-                old_consecutive = (
-                    int(user["consecutive_count"]) if user["consecutive_count"] else 0
-                )
-                old_total = (
-                    int(user.get("total_count", "0")) if user.get("total_count") else 0
+        epoch = self.load_epoch()
+        results = {}
+
+        with self._file_lock(exclusive=True):
+            cached_users, positions = self._load_users()
+            users = list(cached_users)
+            positions = dict(positions)
+
+            for user_id in dict.fromkeys(user_ids):
+                position = positions.get(user_id)
+                user = None if position is None else users[position]
+                updated_user, results[user_id] = apply_checkin(
+                    effective_user(user, epoch), user_id, current_time
                 )
-                user["consecutive_count"] = str(old_consecutive + 1)
-                user["total_count"] = str(old_total + 1)
-                user["last_checkin"] = current_time
-                user_found = True
-                break
-
-        if not user_found:
-            # Add new user
-            users.append(
-                {
-                    "user_id": user_id,
-                    "consecutive_count": "1",
-                    "total_count": "1",
-                    "last_checkin": current_time,
-                }
-            )
+                if updated_user is None:
+                    continue
 
-        # Write back to CSV
+                # Replace rows instead of mutating the cached dictionaries
+                if position is None:
+                    positions[user_id] = len(users)
+                    users.append(updated_user)
+                else:
+                    users[position] = updated_user
 
-        self._save_all_users(users)
+            if any(not result["already_checked_in"] for result in results.values()):
+                # Write back to CSV
+                self._store_users(users)
 
-        # Return result
-        updated_user = self.get_user(user_id)
-        return {
-            "user_id": user_id,
-            "consecutive_count": int(updated_user["consecutive_count"]),
-            "total_count": int(updated_user.get("total_count", "0")),
-            "last_checkin": updated_user["last_checkin"],
-            "was_new_user": not user_found,
-            "already_checked_in": False,
-        }
+        return results
 
-    def reset_count(self) -> dict:
-        """Reset all users' count based on current state
+    def load_epoch(self) -> dict[str, str] | None:
+        """Load the day epoch written by the last reset
 
-        - If last_checkin is empty: set consecutive_count = 0
-        - If last_checkin is not empty: set last_checkin = ""
+        Returns:
+            Dictionary with "epoch" (start of the current day) and
+            "previous_epoch" (start of the previous day), or None if no
+            lazy reset has run yet
+        """
+        try:
+            with open(self.epoch_file_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save_epoch(self, epoch: dict[str, str]):
+        """Save the day epoch
+
+        Args:
+            epoch: Dictionary with "epoch" and "previous_epoch"
+        """
+        tmp_file_path = f"{self.epoch_file_path}.{os.getpid()}.tmp"
+        with open(tmp_file_path, "w", encoding="utf-8") as f:
+            json.dump(epoch, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file_path, self.epoch_file_path)
+        fsync_directory(self.epoch_file_path)
+
+    def reset_count(self, current_time: str = None) -> dict:
+        """Start a new day by advancing the day epoch
+
+        No user rows are rewritten: today's check-ins and broken streaks are
+        worked out from each user's last_checkin when the user is read or
+        updated (see effective_user). The first reset on data written before
+        day epochs existed converts it once, setting consecutive_count = 0
+        for users whose last_checkin is empty.
+
+        Args:
+            current_time: ISO format time of the new epoch (default: now)
 
         Returns:
             Dictionary with reset results
         """
-        users = self.load_all_users()
-        consecutive_count_reset = 0
-        last_checkin_reset = 0
-
-        for user in users:
-            if not user.get("last_checkin") or user["last_checkin"].strip() == "":
-                # last_checkin is empty: reset consecutive_count
-                user["consecutive_count"] = "0"
-                consecutive_count_reset += 1
-            else:
-                # last_checkin is not empty: clear last_checkin
-                user["last_checkin"] = ""
-                last_checkin_reset += 1
+        current_time = current_time or datetime.now().isoformat()
+        epoch = self.load_epoch()
+        migrated_users = 0
 
-        if consecutive_count_reset > 0 or last_checkin_reset > 0:
+        if epoch is None:
+            users = self.load_all_users()
+            for user in users:
+                if not user.get("last_checkin") or user["last_checkin"].strip() == "":
+                    user["consecutive_count"] = "0"
             self._save_all_users(users)
+            migrated_users = len(users)
+
+        new_epoch = {
+            "epoch": current_time,
+            "previous_epoch": epoch["epoch"] if epoch else "",
+        }
+        self.save_epoch(new_epoch)
 
         return {
-            "total_users": len(users),
-            "consecutive_count_reset": consecutive_count_reset,
-            "last_checkin_reset": last_checkin_reset,
-            "message": f"Reset {consecutive_count_reset} consecutive_counts and {last_checkin_reset} last_checkins",
+            **new_epoch,
+            "migrated_users": migrated_users,
+            "message": f"Advanced day epoch to {current_time}",
             "success": True,
         }
 
@@ -306,39 +594,42 @@ class RoumuData:
         Args:
             users: List of user dictionaries to save
         """
-        with self._file_lock("w") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=self.fieldnames)
-            writer.writeheader()
-            for user in users:
-                # Ensure all required fields exist before writing
-                normalized_user = {
-                    "user_id": user.get("user_id", ""),
-                    "consecutive_count": user.get("consecutive_count", "0"),
-                    "total_count": user.get("total_count", "0"),
-                    "last_checkin": user.get("last_checkin", ""),
-                }
-                writer.writerow(normalized_user)
+        with self._file_lock(exclusive=True):
+            self._store_users(users)
+
+    def import_users(self, users: list[dict[str, str]]) -> int:
+        """Replace all user data with the given users (used for migration)
+
+        Args:
+            users: List of user dictionaries to import
+
+        Returns:
+            Number of imported users
+        """
+        self._save_all_users(users)
+        return len(users)
 
     def get_leaderboard(self, limit: int = 10) -> list[dict[str, any]]:
         """Get leaderboard sorted by consecutive count
 
+        Uses heap-based top-K selection (O(N log K)) instead of sorting all
+        users.
+
         Args:
             limit: Maximum number of users to return
 
         Returns:
             List of users sorted by consecutive count (descending)
         """
-        users = self.load_all_users()
-
-        # Convert consecutive_count to int for sorting
-        for user in users:
-            user["consecutive_count_int"] = (
-                int(user["consecutive_count"]) if user["consecutive_count"] else 0
-            )
-
-        # Sort by consecutive count (descending)
-        sorted_users = sorted(
-            users, key=lambda x: x["consecutive_count_int"], reverse=True
+        epoch = self.load_epoch()
+        top_users = heapq.nlargest(
+            limit,
+            (effective_user(user, epoch) for user in self.load_all_users()),
+            key=consecutive_count_of,
         )
 
-        return sorted_users[:limit]
+        # Convert consecutive_count to int for the returned rows only
+        for user in top_users:
+            user["consecutive_count_int"] = consecutive_count_of(user)
+
+        return top_users
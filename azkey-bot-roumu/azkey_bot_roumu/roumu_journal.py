@@ -0,0 +1,367 @@
+"""Journal-based roumu data storage with an in-memory index"""
+
+import csv
+import io
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from .roumu_data import (
+    RoumuData,
+    apply_checkin,
+    consecutive_count_of,
+    effective_user,
+    fcntl,
+)
+
+
+class JournalRoumuData(RoumuData):
+    """Snapshot + append-only journal storage for roumu check-in tracking
+
+    The CSV file is used as a snapshot. Each check-in appends the updated user
+    row to ``<csv_file_path>.journal`` and applies it to an in-memory index, so
+    a check-in costs one small append instead of a full CSV rewrite. The
+    journal is folded into a fresh snapshot once it reaches
+    ``compact_threshold`` records, or whenever all users are saved at once
+    (e.g. by reset_count).
+
+    Journal appends are fsynced before a check-in returns. Inside a
+    group_commit window the fsync is deferred to the end of the window, so
+    a burst of check-ins shares a single fsync.
+
+    The index also keeps users bucketed by consecutive count, updated on
+    every check-in and reset, so leaderboard queries only touch the top
+    buckets instead of sorting every user.
+
+    All processes sharing the data directory must use this storage mode,
+    otherwise journal records would be replayed over their snapshot writes.
+    """
+
+    def __init__(self, csv_file_path: str = "roumu.csv", compact_threshold: int = 1000):
+        """Initialize JournalRoumuData with CSV snapshot path
+
+        Args:
+            csv_file_path: Path to the CSV snapshot file (default: "roumu.csv")
+            compact_threshold: Journal records before compaction (default: 1000)
+        """
+        super().__init__(csv_file_path)
+        self.journal_file_path = f"{csv_file_path}.journal"
+        self.compact_threshold = compact_threshold
+
+        # In-memory index rebuilt from snapshot + journal. Shared journal
+        # locks of different threads do not exclude each other, so threads
+        # take turns on the index
+        self._index_lock = threading.RLock()
+        self._users: dict[str, dict[str, str]] = {}
+        self._count_buckets: dict[int, dict[str, None]] = {}
+        self._snapshot_signature = None
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._journal_dirty = False
+
+        # Create empty journal file if it doesn't exist
+        if not os.path.exists(self.journal_file_path):
+            with open(self.journal_file_path, "ab"):
+                pass
+
+    @contextmanager
+    def _journal_lock(self, exclusive: bool = False):
+        """Lock the journal file, which guards both journal and snapshot
+
+        The lock is reentrant within a thread, so a group commit window can
+        hold it across several operations. The thread also holds the index
+        lock while it holds the journal lock, because even a shared holder
+        refreshes the in-memory index.
+
+        Args:
+            exclusive: Acquire an exclusive lock instead of a shared one
+
+        Yields:
+            Journal file object opened in binary append mode
+        """
+        journal = getattr(self._local, "journal", None)
+        if journal is not None:
+            # Already held by this thread
+            yield journal
+            return
+
+        with self._index_lock, open(self.journal_file_path, "a+b") as journal:
+            if fcntl is not None:
+                fcntl.flock(
+                    journal.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+                )
+            self._local.journal = journal
+            try:
+                yield journal
+            finally:
+                self._local.journal = None
+
+    @contextmanager
+    def group_commit(self):
+        """Group commit window for a burst of check-ins
+
+        Journal appends inside the window are flushed but not fsynced; a
+        single fsync runs when the window closes. The exclusive journal lock
+        is held for the whole window.
+        """
+        with self._journal_lock(exclusive=True) as journal:
+            if self._group_commit_depth:
+                yield
+                return
+
+            self._group_commit_depth = 1
+            try:
+                yield
+            finally:
+                self._group_commit_depth = 0
+                if self._journal_dirty:
+                    os.fsync(journal.fileno())
+                    self._journal_dirty = False
+
+    def _get_snapshot_signature(self) -> tuple[int, int, int]:
+        """Get (mtime_ns, size, inode) of the snapshot file"""
+        stat = os.stat(self.csv_file_path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _index_users(self, users: list[dict[str, str]], replace: bool = False):
+        """Store user rows in the in-memory index and leaderboard buckets
+
+        Args:
+            users: User rows to store
+            replace: Drop all previously indexed users first
+        """
+        if replace:
+            self._users = {}
+            self._count_buckets = {}
+
+        for user in users:
+            user_id = user["user_id"]
+            old_user = self._users.get(user_id)
+            if old_user is not None:
+                old_count = consecutive_count_of(old_user)
+                del self._count_buckets[old_count][user_id]
+                if not self._count_buckets[old_count]:
+                    del self._count_buckets[old_count]
+
+            self._users[user_id] = user
+            bucket = self._count_buckets.setdefault(consecutive_count_of(user), {})
+            bucket[user_id] = None
+
+    def _refresh(self, journal):
+        """Bring the in-memory index up to date with snapshot and journal
+
+        The snapshot is reloaded only if another process compacted it. Journal
+        records appended since the last refresh are replayed on top.
+
+        Args:
+            journal: Locked journal file object
+        """
+        signature = self._get_snapshot_signature()
+        if signature != self._snapshot_signature:
+            self._index_users(super().load_all_users(), replace=True)
+            self._snapshot_signature = signature
+            self._journal_offset = 0
+            self._journal_records = 0
+
+        journal.seek(self._journal_offset)
+        data = journal.read()
+
+        # Ignore a torn trailing record left behind by a crashed writer
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return
+
+        records = [
+            dict(zip(self.fieldnames, row, strict=True))
+            for row in csv.reader(io.StringIO(data[:end].decode("utf-8"), newline=""))
+            if len(row) == len(self.fieldnames) and row[0]
+        ]
+        self._index_users(records)
+        self._journal_records += len(records)
+        self._journal_offset += end
+
+    def _append_records(self, journal, users: list[dict[str, str]]):
+        """Append updated user rows to the journal and the in-memory index
+
+        The caller must have refreshed the index under the same exclusive
+        lock, so anything past the refreshed offset is a torn record of a
+        crashed writer. It is cut off first; otherwise the new records would
+        be joined onto it and dropped as malformed on the next reload.
+
+        Args:
+            journal: Exclusively locked journal file object
+            users: Updated user rows
+        """
+        buffer = io.StringIO(newline="")
+        writer = csv.writer(buffer)
+        for user in users:
+            writer.writerow([user[field] for field in self.fieldnames])
+
+        if journal.seek(0, os.SEEK_END) > self._journal_offset:
+            journal.truncate(self._journal_offset)
+        journal.seek(0, os.SEEK_END)
+        journal.write(buffer.getvalue().encode("utf-8"))
+        journal.flush()
+        if self._group_commit_depth:
+            self._journal_dirty = True
+        else:
+            os.fsync(journal.fileno())
+        self._journal_offset = journal.tell()
+
+        self._index_users(users)
+        self._journal_records += len(users)
+
+    def _compact(self, journal):
+        """Write the in-memory index as a fresh snapshot and clear the journal
+
+        Args:
+            journal: Exclusively locked journal file object
+        """
+        # The snapshot is durable before the journal is cleared, so a crash
+        # in between only replays records the snapshot already contains
+        self._write_snapshot(list(self._users.values()))
+        journal.truncate(0)
+        journal.flush()
+        os.fsync(journal.fileno())
+        self._journal_dirty = False
+
+        self._snapshot_signature = self._get_snapshot_signature()
+        self._journal_offset = 0
+        self._journal_records = 0
+
+    def compact(self):
+        """Fold the journal into a fresh CSV snapshot"""
+        with self._journal_lock(exclusive=True) as journal:
+            self._refresh(journal)
+            self._compact(journal)
+
+    def load_all_users(self) -> list[dict[str, str]]:
+        """Load all user data from snapshot and journal
+
+        Returns:
+            List of user dictionaries
+        """
+        with self._journal_lock() as journal:
+            self._refresh(journal)
+            return [dict(user) for user in self._users.values()]
+
+    def get_user(self, user_id: str) -> dict[str, str] | None:
+        """Get specific user data by user_id
+
+        Args:
+            user_id: Target user ID
+
+        Returns:
+            User dictionary or None if not found
+        """
+        with self._journal_lock() as journal:
+            self._refresh(journal)
+            return effective_user(self._users.get(user_id), self.load_epoch())
+
+    def update_checkin(self, user_id: str) -> dict[str, any]:
+        """Update user check-in data by appending a journal record
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Dictionary with update results
+        """
+        return self.update_checkins([user_id])[user_id]
+
+    def update_checkins(self, user_ids: list[str]) -> dict[str, dict[str, any]]:
+        """Update check-in data for a batch of users with one journal append
+
+        Args:
+            user_ids: User IDs to check in
+
+        Returns:
+            Dictionary mapping each unique user ID (in first-seen order) to
+            its update results
+        """
+        current_time = datetime.now().isoformat()
+        epoch = self.load_epoch()
+        results = {}
+        updated_users = []
+
+        with self._journal_lock(exclusive=True) as journal:
+            self._refresh(journal)
+
+            for user_id in dict.fromkeys(user_ids):
+                updated_user, results[user_id] = apply_checkin(
+                    effective_user(self._users.get(user_id), epoch),
+                    user_id,
+                    current_time,
+                )
+                if updated_user is not None:
+                    updated_users.append(updated_user)
+
+            if updated_users:
+                self._append_records(journal, updated_users)
+
+            if self._journal_records >= self.compact_threshold:
+                self._compact(journal)
+
+        return results
+
+    def _save_all_users(self, users: list[dict[str, str]]):
+        """Replace all user data with a fresh snapshot
+
+        Args:
+            users: List of user dictionaries to save
+        """
+        with self._journal_lock(exclusive=True) as journal:
+            self._index_users([dict(user) for user in users], replace=True)
+            self._compact(journal)
+
+    def get_leaderboard(self, limit: int = 10) -> list[dict[str, any]]:
+        """Get leaderboard sorted by consecutive count
+
+        Walks the consecutive count buckets from the top, so the cost
+        depends on the number of distinct counts and the limit rather than
+        the number of users. Users whose streak turns out to be broken are
+        moved to the zero bucket so later queries do not skip them again.
+
+        Args:
+            limit: Maximum number of users to return
+
+        Returns:
+            List of users sorted by consecutive count (descending)
+        """
+        epoch = self.load_epoch()
+        leaderboard = []
+        broken_user_ids = []
+
+        with self._journal_lock() as journal:
+            self._refresh(journal)
+
+            for count in sorted(self._count_buckets, reverse=True):
+                if count == 0 or len(leaderboard) >= limit:
+                    break
+                for user_id in self._count_buckets[count]:
+                    user = effective_user(self._users[user_id], epoch)
+                    if consecutive_count_of(user) != count:
+                        broken_user_ids.append(user_id)
+                        continue
+                    user["consecutive_count_int"] = count
+                    leaderboard.append(user)
+                    if len(leaderboard) >= limit:
+                        break
+
+            self._index_users(
+                [
+                    {**self._users[user_id], "consecutive_count": "0"}
+                    for user_id in broken_user_ids
+                ]
+            )
+
+            # Fill up with zero-count users like a full sort would
+            for user_id in self._count_buckets.get(0, {}):
+                if len(leaderboard) >= limit:
+                    break
+                user = effective_user(self._users[user_id], epoch)
+                user["consecutive_count_int"] = 0
+                leaderboard.append(user)
+
+        return leaderboard
@@ -0,0 +1,292 @@
+"""Hash-sharded roumu data storage"""
+
+import heapq
+import json
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class ShardedRoumuData:
+    """Roumu storage split across N independent shards by hash of user_id
+
+    Each shard is a complete storage of the chosen backend in its own
+    subdirectory (``shard00``, ``shard01``, ...) with its own files and
+    locks, so check-ins of users in different shards never wait for each
+    other and full-table operations such as reset_count run on all shards
+    concurrently.
+
+    Every shard has a dedicated worker thread and all access to a shard runs
+    on it. The per-shard locks are thread-bound (flock depth, RLock, SQLite
+    connection), so this keeps a group commit window usable from any thread.
+
+    The shard count is recorded in ``shards.json`` and cannot change once
+    data has been written; use export-csv and migrate to reshard.
+    """
+
+    def __init__(self, backend: str, data_dir: str = None, shards: int = 4):
+        """Initialize ShardedRoumuData
+
+        Args:
+            backend: Storage backend of each shard (e.g. "csv" or "sqlite")
+            data_dir: Directory path for shard directories (default: current
+                directory)
+            shards: Number of shards (default: 4)
+
+        Raises:
+            ValueError: If shards is less than 1, or the data directory
+                already holds a different shard layout
+        """
+        from .storage import create_roumu_data
+
+        if shards < 1:
+            raise ValueError(f"Shard count must be at least 1: {shards}")
+
+        self.data_dir = data_dir or ""
+        self.backend = backend
+        self.shard_count = shards
+        self._check_layout()
+
+        self._executors = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"roumu-shard{n:02d}")
+            for n in range(shards)
+        ]
+        self.shards = self._run_all(
+            lambda n: create_roumu_data(backend, self._shard_dir(n), shards=1)
+        )
+
+    def _check_layout(self):
+        """Record the shard layout, or verify it matches an existing one
+
+        Raises:
+            ValueError: If the data directory holds a different shard layout
+        """
+        layout = {"backend": self.backend, "shards": self.shard_count}
+        layout_file_path = os.path.join(self.data_dir, "shards.json")
+
+        if os.path.exists(layout_file_path):
+            with open(layout_file_path, encoding="utf-8") as f:
+                existing_layout = json.load(f)
+            if existing_layout != layout:
+                raise ValueError(
+                    f"Shard layout mismatch in {layout_file_path}: "
+                    f"existing {existing_layout}, requested {layout}"
+                )
+            return
+
+        for n in range(self.shard_count):
+            os.makedirs(self._shard_dir(n), exist_ok=True)
+
+        tmp_file_path = f"{layout_file_path}.{os.getpid()}.tmp"
+        with open(tmp_file_path, "w", encoding="utf-8") as f:
+            json.dump(layout, f)
+        os.replace(tmp_file_path, layout_file_path)
+
+    def _shard_dir(self, shard_number: int) -> str:
+        """Get the directory of a shard"""
+        return os.path.join(self.data_dir, f"shard{shard_number:02d}")
+
+    def shard_of(self, user_id: str) -> int:
+        """Get the shard number holding a user
+
+        Args:
+            user_id: Target user ID
+
+        Returns:
+            Shard number in range(shard_count)
+        """
+        return zlib.crc32(user_id.encode("utf-8")) % self.shard_count
+
+    def _run(self, shard_number: int, fn, *args):
+        """Run fn(shard, *args) on the shard's worker thread and wait"""
+        return (
+            self._executors[shard_number]
+            .submit(fn, self.shards[shard_number], *args)
+            .result()
+        )
+
+    def _run_all(self, fn, shard_numbers=None) -> list:
+        """Run fn(shard_number) on each shard's worker thread concurrently
+
+        Args:
+            fn: Function called with the shard number
+            shard_numbers: Shards to run on (default: all shards)
+
+        Returns:
+            Results in the order of shard_numbers
+
+        Raises:
+            Exception: The first error raised by a shard, after all shards
+                have finished
+        """
+        if shard_numbers is None:
+            shard_numbers = range(self.shard_count)
+        futures = [self._executors[n].submit(fn, n) for n in shard_numbers]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Close all shards and stop their worker threads"""
+        for n, shard in enumerate(self.shards):
+            self._executors[n].submit(shard.close).result()
+        for executor in self._executors:
+            executor.shutdown()
+
+    @contextmanager
+    def group_commit(self):
+        """Group commit window on every shard
+
+        Each shard opens its window on its worker thread; all of them are
+        flushed when the window closes.
+        """
+        windows = [shard.group_commit() for shard in self.shards]
+        futures = [
+            self._executors[n].submit(windows[n].__enter__)
+            for n in range(self.shard_count)
+        ]
+        entered = []
+        error = None
+        for n, future in enumerate(futures):
+            try:
+                future.result()
+                entered.append(n)
+            except Exception as e:
+                error = error or e
+
+        try:
+            if error is not None:
+                raise error
+            yield
+        finally:
+            self._run_all(lambda n: windows[n].__exit__(None, None, None), entered)
+
+    def load_epoch(self) -> dict[str, str] | None:
+        """Load the day epoch written by the last reset
+
+        Returns:
+            Dictionary with "epoch" and "previous_epoch" of the first shard,
+            or None if no lazy reset has run yet
+        """
+        return self._run(0, lambda shard: shard.load_epoch())
+
+    def save_epoch(self, epoch: dict[str, str]):
+        """Save the day epoch to every shard
+
+        Args:
+            epoch: Dictionary with "epoch" and "previous_epoch"
+        """
+        self._run_all(lambda n: self.shards[n].save_epoch(epoch))
+
+    def load_all_users(self) -> list[dict[str, str]]:
+        """Load all user data from every shard
+
+        Returns:
+            List of user dictionaries, grouped by shard
+        """
+        users = []
+        for shard_users in self._run_all(lambda n: self.shards[n].load_all_users()):
+            users.extend(shard_users)
+        return users
+
+    def get_user(self, user_id: str) -> dict[str, str] | None:
+        """Get specific user data by user_id
+
+        Args:
+            user_id: Target user ID
+
+        Returns:
+            User dictionary or None if not found
+        """
+        return self._run(self.shard_of(user_id), lambda shard: shard.get_user(user_id))
+
+    def update_checkin(self, user_id: str) -> dict[str, any]:
+        """Update user check-in data
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Dictionary with update results
+        """
+        return self.update_checkins([user_id])[user_id]
+
+    def update_checkins(self, user_ids: list[str]) -> dict[str, dict[str, any]]:
+        """Update check-in data for a batch of users, shards in parallel
+
+        Args:
+            user_ids: User IDs to check in
+
+        Returns:
+            Dictionary mapping each unique user ID (in first-seen order) to
+            its update results
+        """
+        unique_user_ids = list(dict.fromkeys(user_ids))
+        shard_user_ids: dict[int, list[str]] = {}
+        for user_id in unique_user_ids:
+            shard_user_ids.setdefault(self.shard_of(user_id), []).append(user_id)
+
+        shard_numbers = list(shard_user_ids)
+        shard_results = {}
+        for results in self._run_all(
+            lambda n: self.shards[n].update_checkins(shard_user_ids[n]),
+            shard_numbers,
+        ):
+            shard_results.update(results)
+
+        return {user_id: shard_results[user_id] for user_id in unique_user_ids}
+
+    def reset_count(self, current_time: str = None) -> dict:
+        """Start a new day on every shard concurrently
+
+        All shards get the same epoch, so they agree on the day boundary.
+
+        Args:
+            current_time: ISO format time of the new epoch (default: now)
+
+        Returns:
+            Dictionary with reset results; previous_epoch is that of the
+            first shard and migrated_users is the total over all shards
+        """
+        current_time = current_time or datetime.now().isoformat()
+        results = self._run_all(lambda n: self.shards[n].reset_count(current_time))
+        return {
+            **results[0],
+            "migrated_users": sum(result["migrated_users"] for result in results),
+            "shards": len(results),
+        }
+
+    def import_users(self, users: list[dict[str, str]]) -> int:
+        """Replace all user data with the given users (used for migration)
+
+        Args:
+            users: List of user dictionaries to import
+
+        Returns:
+            Number of imported users
+        """
+        shard_users = [[] for _ in range(self.shard_count)]
+        for user in users:
+            shard_users[self.shard_of(user["user_id"])].append(user)
+
+        return sum(self._run_all(lambda n: self.shards[n].import_users(shard_users[n])))
+
+    def get_leaderboard(self, limit: int = 10) -> list[dict[str, any]]:
+        """Get leaderboard sorted by consecutive count
+
+        Takes the top ``limit`` users of every shard and merges them.
+
+        Args:
+            limit: Maximum number of users to return
+
+        Returns:
+            List of users sorted by consecutive count (descending)
+        """
+        candidates = []
+        for shard_leaderboard in self._run_all(
+            lambda n: self.shards[n].get_leaderboard(limit)
+        ):
+            candidates.extend(shard_leaderboard)
+        return heapq.nlargest(
+            limit, candidates, key=lambda user: user["consecutive_count_int"]
+        )
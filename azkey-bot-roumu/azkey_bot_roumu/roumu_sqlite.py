@@ -0,0 +1,361 @@
+"""Roumu data management for SQLite persistence"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from .roumu_data import apply_checkin, effective_user
+
+
+class SqliteRoumuData:
+    """SQLite-based data storage for roumu check-in tracking
+
+    Uses WAL mode so readers never block the writer, a primary key on user_id
+    for point lookups and an index on consecutive_count for the leaderboard.
+    Returned user dictionaries use the same string values as the CSV storage.
+    The day epoch used for lazy resets is kept in a small meta table.
+
+    Commits run with synchronous=FULL, so a committed check-in survives a
+    power loss. A group_commit window wraps several operations in one
+    transaction to share the cost of that sync.
+    """
+
+    def __init__(self, db_file_path: str = "roumu.db"):
+        """Initialize SqliteRoumuData with database file path
+
+        Args:
+            db_file_path: Path to the SQLite database file (default: "roumu.db")
+        """
+        self.db_file_path = db_file_path
+        self.fieldnames = [
+            "user_id",
+            "consecutive_count",
+            "total_count",
+            "last_checkin",
+        ]
+
+        # sqlite3 connections must not be shared between threads
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS roumu ("
+            "user_id TEXT PRIMARY KEY, "
+            "consecutive_count INTEGER NOT NULL DEFAULT 0, "
+            "total_count INTEGER NOT NULL DEFAULT 0, "
+            "last_checkin TEXT NOT NULL DEFAULT '')"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_roumu_consecutive_count "
+            "ON roumu (consecutive_count DESC)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get the database connection for the current thread
+
+        Returns:
+            SQLite connection in autocommit mode
+        """
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.connection = conn
+        return conn
+
+    def close(self):
+        """Close the database connection of the current thread"""
+        conn = getattr(self._local, "connection", None)
+        if conn is not None:
+            conn.close()
+            self._local.connection = None
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction context manager
+
+        BEGIN IMMEDIATE takes the write lock up front, so a read-then-write
+        sequence cannot be interleaved with another writer. Inside an open
+        transaction (e.g. a group commit window) a savepoint is used instead.
+
+        Yields:
+            SQLite connection inside the transaction
+        """
+        conn = self._connection()
+        if conn.in_transaction:
+            conn.execute("SAVEPOINT roumu_write")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK TO roumu_write")
+                conn.execute("RELEASE roumu_write")
+                raise
+            conn.execute("RELEASE roumu_write")
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @contextmanager
+    def group_commit(self):
+        """Group commit window for a burst of writes
+
+        All writes inside the window are committed together, with a single
+        sync, when the window closes.
+        """
+        with self._transaction():
+            yield
+
+    @staticmethod
+    def _row_to_user(row: sqlite3.Row) -> dict[str, str]:
+        """Convert a database row to a CSV-compatible user dictionary"""
+        return {
+            "user_id": row["user_id"],
+            "consecutive_count": str(row["consecutive_count"]),
+            "total_count": str(row["total_count"]),
+            "last_checkin": row["last_checkin"],
+        }
+
+    @staticmethod
+    def _load_epoch(conn: sqlite3.Connection) -> dict[str, str] | None:
+        """Load the day epoch using the given connection"""
+        epoch = dict(
+            conn.execute(
+                "SELECT key, value FROM meta WHERE key IN ('epoch', 'previous_epoch')"
+            ).fetchall()
+        )
+        return epoch if "epoch" in epoch else None
+
+    @staticmethod
+    def _save_epoch(conn: sqlite3.Connection, epoch: dict[str, str]):
+        """Save the day epoch using the given connection"""
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(key, epoch[key]) for key in ("epoch", "previous_epoch")],
+        )
+
+    def load_epoch(self) -> dict[str, str] | None:
+        """Load the day epoch written by the last reset
+
+        Returns:
+            Dictionary with "epoch" and "previous_epoch", or None if no lazy
+            reset has run yet
+        """
+        return self._load_epoch(self._connection())
+
+    def save_epoch(self, epoch: dict[str, str]):
+        """Save the day epoch
+
+        Args:
+            epoch: Dictionary with "epoch" and "previous_epoch"
+        """
+        with self._transaction() as conn:
+            self._save_epoch(conn, epoch)
+
+    def load_all_users(self) -> list[dict[str, str]]:
+        """Load all user data from the database
+
+        Returns:
+            List of user dictionaries
+        """
+        rows = self._connection().execute("SELECT * FROM roumu ORDER BY rowid")
+        return [self._row_to_user(row) for row in rows]
+
+    def get_user(self, user_id: str) -> dict[str, str] | None:
+        """Get specific user data by user_id
+
+        Args:
+            user_id: Target user ID
+
+        Returns:
+            User dictionary or None if not found
+        """
+        row = (
+            self._connection()
+            .execute("SELECT * FROM roumu WHERE user_id = ?", (user_id,))
+            .fetchone()
+        )
+        return effective_user(
+            self._row_to_user(row) if row else None, self.load_epoch()
+        )
+
+    def update_checkin(self, user_id: str) -> dict[str, any]:
+        """Update user check-in data
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Dictionary with update results
+        """
+        return self.update_checkins([user_id])[user_id]
+
+    def update_checkins(self, user_ids: list[str]) -> dict[str, dict[str, any]]:
+        """Update check-in data for a batch of users in one transaction
+
+        Args:
+            user_ids: User IDs to check in
+
+        Returns:
+            Dictionary mapping each unique user ID (in first-seen order) to
+            its update results
+        """
+        unique_user_ids = list(dict.fromkeys(user_ids))
+        current_time = datetime.now().isoformat()
+        results = {}
+        updated_users = []
+
+        with self._transaction() as conn:
+            epoch = self._load_epoch(conn)
+            users = {}
+            # Stay below SQLite's bound parameter limit
+            for start in range(0, len(unique_user_ids), 500):
+                chunk = unique_user_ids[start : start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                for row in conn.execute(
+                    f"SELECT * FROM roumu WHERE user_id IN ({placeholders})", chunk
+                ):
+                    users[row["user_id"]] = effective_user(
+                        self._row_to_user(row), epoch
+                    )
+
+            for user_id in unique_user_ids:
+                updated_user, results[user_id] = apply_checkin(
+                    users.get(user_id), user_id, current_time
+                )
+                if updated_user is not None:
+                    updated_users.append(updated_user)
+
+            conn.executemany(
+                "INSERT INTO roumu (user_id, consecutive_count, total_count, "
+                "last_checkin) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id) DO UPDATE SET "
+                "consecutive_count = excluded.consecutive_count, "
+                "total_count = excluded.total_count, "
+                "last_checkin = excluded.last_checkin",
+                [
+                    (
+                        user["user_id"],
+                        int(user["consecutive_count"]),
+                        int(user["total_count"]),
+                        user["last_checkin"],
+                    )
+                    for user in updated_users
+                ],
+            )
+
+        return results
+
+    def reset_count(self, current_time: str = None) -> dict:
+        """Start a new day by advancing the day epoch
+
+        Only the meta table is updated; see RoumuData.reset_count for the
+        lazy reset rules and the one-time conversion of older data.
+
+        Args:
+            current_time: ISO format time of the new epoch (default: now)
+
+        Returns:
+            Dictionary with reset results
+        """
+        current_time = current_time or datetime.now().isoformat()
+        migrated_users = 0
+
+        with self._transaction() as conn:
+            epoch = self._load_epoch(conn)
+            if epoch is None:
+                conn.execute(
+                    "UPDATE roumu SET consecutive_count = 0 WHERE last_checkin = ''"
+                )
+                (migrated_users,) = conn.execute(
+                    "SELECT COUNT(*) FROM roumu"
+                ).fetchone()
+
+            new_epoch = {
+                "epoch": current_time,
+                "previous_epoch": epoch["epoch"] if epoch else "",
+            }
+            self._save_epoch(conn, new_epoch)
+
+        return {
+            **new_epoch,
+            "migrated_users": migrated_users,
+            "message": f"Advanced day epoch to {current_time}",
+            "success": True,
+        }
+
+    def import_users(self, users: list[dict[str, str]]) -> int:
+        """Replace all user data with the given users (used for migration)
+
+        Args:
+            users: List of user dictionaries to import
+
+        Returns:
+            Number of imported users
+        """
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM roumu")
+            conn.executemany(
+                "INSERT OR REPLACE INTO roumu (user_id, consecutive_count, "
+                "total_count, last_checkin) VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        user["user_id"],
+                        int(user.get("consecutive_count") or 0),
+                        int(user.get("total_count") or 0),
+                        user.get("last_checkin") or "",
+                    )
+                    for user in users
+                ],
+            )
+        return len(users)
+
+    def get_leaderboard(self, limit: int = 10) -> list[dict[str, any]]:
+        """Get leaderboard sorted by consecutive count
+
+        Args:
+            limit: Maximum number of users to return
+
+        Returns:
+            List of users sorted by consecutive count (descending)
+        """
+        conn = self._connection()
+        epoch = self.load_epoch()
+
+        if epoch is None:
+            rows = conn.execute(
+                "SELECT * FROM roumu ORDER BY consecutive_count DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        else:
+            # Only users who checked in since the previous epoch keep a streak
+            rows = conn.execute(
+                "SELECT * FROM roumu WHERE last_checkin >= ? AND last_checkin != '' "
+                "ORDER BY consecutive_count DESC LIMIT ?",
+                (epoch["previous_epoch"], limit),
+            ).fetchall()
+            if len(rows) < limit:
+                # Fill up with broken streaks (count 0) like a full sort would
+                rows += conn.execute(
+                    "SELECT * FROM roumu WHERE last_checkin < ? OR last_checkin = '' "
+                    "LIMIT ?",
+                    (epoch["previous_epoch"], limit - len(rows)),
+                ).fetchall()
+
+        leaderboard = []
+        for row in rows:
+            user = effective_user(self._row_to_user(row), epoch)
+            user["consecutive_count_int"] = int(user["consecutive_count"])
+            leaderboard.append(user)
+        return leaderboard
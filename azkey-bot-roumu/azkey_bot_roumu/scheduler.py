@@ -0,0 +1,237 @@
+"""Concurrent stage scheduler for serve mode"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class Stage:
+    """A serve stage run periodically by the StageScheduler
+
+    With min_interval < max_interval the interval adapts to the activity the
+    stage function reports by returning a dictionary with "fetched" (items
+    the poll returned), "matched" (items that needed work) and "full_page"
+    (the poll hit its page limit):
+
+    - full page: there is a backlog, so the interval is halved
+    - nothing fetched: the interval doubles (exponential backoff)
+    - otherwise: the interval is set so that about target_matches matched
+      items arrive per run at the recently observed rate (moving average);
+      it shortens as matches speed up and lengthens as they slow down, so a
+      timeline that is never empty but has no check-ins still backs off.
+      A rate of zero doubles the interval as for an empty poll, and the
+      first run (no rate yet) keeps it
+
+    The interval always stays within min_interval and max_interval. A
+    function returning None (or raising) leaves the interval unchanged.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func,
+        interval: float,
+        timeout: float = None,
+        min_interval: float = None,
+        max_interval: float = None,
+        target_matches: float = 5.0,
+        backoff: float = 2.0,
+        smoothing: float = 0.5,
+    ):
+        """Initialize Stage
+
+        Args:
+            name: Stage name used in logs (e.g. "follow")
+            func: Function called with the run number (1, 2, ...)
+            interval: Initial seconds between the end of a run and the next
+                start (fixed unless the bounds differ)
+            timeout: Seconds after which a run is reported as overdue
+                (default: None = never)
+            min_interval: Shortest adaptive interval (default: interval)
+            max_interval: Longest adaptive interval (default: interval)
+            target_matches: Matched items aimed for per run (default: 5.0)
+            backoff: Factor the interval grows by after an empty poll
+                (default: 2.0)
+            smoothing: Weight of the newest run in the matched-item rate
+                (default: 0.5)
+
+        Raises:
+            ValueError: If an interval is not positive
+        """
+        min_interval = min(min_interval or interval, interval)
+        max_interval = max(max_interval or interval, interval)
+        if min_interval <= 0:
+            raise ValueError("interval must be positive")
+
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+        self.target_matches = target_matches
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.match_rate = None
+        self.runs = 0
+        self.next_run = 0.0
+        self._future = None
+        self._started_at = 0.0
+        self._last_started_at = None
+        self._timed_out = False
+
+    @property
+    def adaptive(self) -> bool:
+        """Whether the interval adapts to activity"""
+        return self.min_interval < self.max_interval
+
+    def adapt(self, activity: dict | None, started_at: float):
+        """Adjust the interval after a run
+
+        Args:
+            activity: Dictionary returned by the stage function, or None
+            started_at: time.monotonic() when the run started
+        """
+        previous_start, self._last_started_at = self._last_started_at, started_at
+        if not self.adaptive or not isinstance(activity, dict):
+            return
+
+        # 前回の実行開始からの間に届いた件数で、対象の到着レートを移動平均する
+        matched = activity.get("matched", 0)
+        if previous_start is not None and started_at > previous_start:
+            rate = matched / (started_at - previous_start)
+            if self.match_rate is None:
+                self.match_rate = rate
+            else:
+                self.match_rate = (
+                    self.smoothing * rate + (1 - self.smoothing) * self.match_rate
+                )
+
+        if activity.get("full_page"):
+            interval = self.interval / 2
+        elif not activity.get("fetched"):
+            interval = self.interval * self.backoff
+        elif self.match_rate is None:
+            # 初回はレートが分からないので間隔を変えない
+            interval = self.interval
+        elif self.match_rate > 0:
+            interval = self.target_matches / self.match_rate
+        else:
+            interval = self.interval * self.backoff
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+
+
+class StageScheduler:
+    """Runs independent stages concurrently, each on its own cadence
+
+    Every stage runs in a worker thread as soon as it is due, so a slow stage
+    never delays the others. A stage never overlaps itself: its next run is
+    scheduled interval seconds after the previous run finished. Python
+    threads cannot be killed, so a run exceeding its timeout is logged as
+    overdue and the stage is simply not started again until it returns (the
+    HTTP timeouts of the Misskey client bound how long that can take).
+    """
+
+    def __init__(self, stages: list[Stage], logger, tick: float = 1.0):
+        """Initialize StageScheduler
+
+        Args:
+            stages: Stages to run
+            logger: Logger for stage lifecycle logs
+            tick: Longest time between shutdown checks in seconds
+                (default: 1.0)
+
+        Raises:
+            ValueError: If no stage is given
+        """
+        if not stages:
+            raise ValueError("At least one stage is required")
+
+        self.stages = stages
+        self.logger = logger
+        self.tick = tick
+
+    def run(self, is_shutdown_requested) -> dict[str, int]:
+        """Run the stages until shutdown is requested
+
+        Stages still running when shutdown is requested are allowed to
+        finish; no new runs are started.
+
+        Args:
+            is_shutdown_requested: Function returning True once the
+                scheduler should stop
+
+        Returns:
+            Dictionary mapping stage name to the number of runs started
+        """
+        executor = ThreadPoolExecutor(
+            max_workers=len(self.stages), thread_name_prefix="stage"
+        )
+        try:
+            while not is_shutdown_requested():
+                now = time.monotonic()
+                for stage in self.stages:
+                    if stage._future is not None:
+                        self._check_running(stage, now)
+                    if stage._future is None and now >= stage.next_run:
+                        self._start(stage, executor)
+
+                # 次の実行予定か、実行中のステージの終了まで待つ
+                running = [s._future for s in self.stages if s._future is not None]
+                idle_next_runs = [s.next_run for s in self.stages if s._future is None]
+                timeout = min([self.tick, *(t - now for t in idle_next_runs)])
+                if running:
+                    wait(running, timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+                elif timeout > 0:
+                    time.sleep(timeout)
+
+            running = [s for s in self.stages if s._future is not None]
+            if running:
+                self.logger.info(
+                    f"action=scheduler_drain "
+                    f"stages={','.join(s.name for s in running)} "
+                    f'message="Waiting for running stages to finish"'
+                )
+                wait([s._future for s in running])
+                for stage in running:
+                    self._check_running(stage, time.monotonic())
+        finally:
+            executor.shutdown(wait=True)
+
+        return {stage.name: stage.runs for stage in self.stages}
+
+    def _start(self, stage: Stage, executor: ThreadPoolExecutor):
+        """Start a run of a stage in a worker thread"""
+        stage.runs += 1
+        stage._started_at = time.monotonic()
+        stage._timed_out = False
+        self.logger.info(f"action=stage_start stage={stage.name} run={stage.runs}")
+        stage._future = executor.submit(stage.func, stage.runs)
+
+    def _check_running(self, stage: Stage, now: float):
+        """Collect a finished run, or report an overdue one"""
+        future = stage._future
+        elapsed = now - stage._started_at
+        if not future.done():
+            if stage.timeout is not None and elapsed > stage.timeout:
+                if not stage._timed_out:
+                    stage._timed_out = True
+                    self.logger.warning(
+                        f"action=stage_timeout stage={stage.name} run={stage.runs} "
+                        f"timeout={stage.timeout} "
+                        f'message="Stage is still running after its timeout"'
+                    )
+            return
+
+        stage._future = None
+        error = future.exception()
+        if error is not None:
+            self.logger.error(
+                f"action=stage_error stage={stage.name} run={stage.runs} "
+                f'error="{error}"'
+            )
+        stage.adapt(None if error is not None else future.result(), stage._started_at)
+        stage.next_run = now + stage.interval
+        self.logger.info(
+            f"action=stage_complete stage={stage.name} run={stage.runs} "
+            f"duration={elapsed:.2f} next_in={round(stage.interval, 1):g}"
+        )
@@ -0,0 +1,159 @@
+"""Persistent bot state (cursors and schedules) for azkey-bot-roumu"""
+
+import json
+import os
+import threading
+from collections import deque
+
+from .roumu_data import fsync_directory
+
+
+class BotState:
+    """Small JSON key-value store for state that must survive restarts
+
+    Holds things like API pagination cursors and the time of the last full
+    reconciliation. Every change is written to a temporary file, fsynced and
+    renamed over the state file, so a crash leaves either the old or the new
+    state. The state is owned by one bot process; concurrent writers from
+    other processes are not merged.
+    """
+
+    def __init__(self, state_file_path: str = "bot_state.json"):
+        """Initialize BotState and load the state file if it exists
+
+        Args:
+            state_file_path: Path to the JSON state file
+                (default: "bot_state.json")
+        """
+        self.state_file_path = state_file_path
+        self._lock = threading.Lock()
+        self._data = {}
+
+        try:
+            with open(self.state_file_path, encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._data = data
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            # 壊れた状態ファイルは初期状態として扱う（カーソルは次回のフル同期で戻る）
+            self._data = {}
+
+    def get(self, key: str, default=None):
+        """Get a state value
+
+        Args:
+            key: State key
+            default: Value returned if the key is not set
+
+        Returns:
+            Stored value or default
+        """
+        with self._lock:
+            return self._data.get(key, default)
+
+    def update(self, values: dict):
+        """Set several state values and save them at once
+
+        Args:
+            values: Keys and JSON-serializable values to set
+        """
+        with self._lock:
+            self._data.update(values)
+            self._save()
+
+    def set(self, key: str, value):
+        """Set a state value and save it
+
+        Args:
+            key: State key
+            value: JSON-serializable value
+        """
+        self.update({key: value})
+
+    def _save(self):
+        """Atomically write the state file (the caller must hold the lock)"""
+        tmp_file_path = f"{self.state_file_path}.{os.getpid()}.tmp"
+        with open(tmp_file_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file_path, self.state_file_path)
+        fsync_directory(self.state_file_path)
+
+
+class SeenNotes:
+    """Bounded set of recently processed note IDs persisted in a BotState
+
+    Keeps the last maxlen IDs in insertion order (a ring buffer) next to a
+    set for O(1) lookups, so memory stays constant however long the bot
+    runs. Used to skip notes that show up again when pages overlap, during
+    backfills or after a restart.
+    """
+
+    def __init__(self, state: BotState, key: str, maxlen: int = 2000):
+        """Initialize SeenNotes from the state
+
+        Args:
+            state: BotState the IDs are saved in
+            key: State key of the ID list
+            maxlen: Maximum number of remembered IDs (default: 2000)
+        """
+        self.state = state
+        self.key = key
+        self._lock = threading.Lock()
+        self._order = deque((state.get(key) or [])[-maxlen:], maxlen=maxlen)
+        self._ids = set(self._order)
+
+    def __contains__(self, note_id: str) -> bool:
+        with self._lock:
+            return note_id in self._ids
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._order)
+
+    def filter_new(self, notes: list) -> list:
+        """Drop notes that were processed already (or repeat in the list)
+
+        Args:
+            notes: Notes to filter
+
+        Returns:
+            Notes not seen before, in the original order
+        """
+        new_notes = []
+        batch_ids = set()
+        with self._lock:
+            for note in notes:
+                note_id = note.get("id")
+                if note_id in self._ids or note_id in batch_ids:
+                    continue
+                if note_id:
+                    batch_ids.add(note_id)
+                new_notes.append(note)
+        return new_notes
+
+    def add(self, note_ids: list[str]):
+        """Remember processed note IDs and save them
+
+        When full, the oldest IDs are forgotten first.
+
+        Args:
+            note_ids: IDs of processed notes
+        """
+        with self._lock:
+            added = False
+            for note_id in note_ids:
+                if not note_id or note_id in self._ids:
+                    continue
+                if len(self._order) == self._order.maxlen:
+                    self._ids.discard(self._order[0])
+                self._order.append(note_id)
+                self._ids.add(note_id)
+                added = True
+            if not added:
+                return
+            ids = list(self._order)
+        self.state.set(self.key, ids)
@@ -0,0 +1,109 @@
+"""Storage backend selection for roumu data"""
+
+import os
+from contextlib import AbstractContextManager
+from typing import Protocol
+
+STORAGE_BACKENDS = ("csv", "journal", "sqlite", "binary")
+
+
+class RoumuStorage(Protocol):
+    """Interface shared by all roumu data storage backends"""
+
+    def load_all_users(self) -> list[dict[str, str]]:
+        """Load all user data"""
+        ...
+
+    def get_user(self, user_id: str) -> dict[str, str] | None:
+        """Get specific user data by user_id"""
+        ...
+
+    def update_checkin(self, user_id: str) -> dict[str, any]:
+        """Update user check-in data"""
+        ...
+
+    def update_checkins(self, user_ids: list[str]) -> dict[str, dict[str, any]]:
+        """Update check-in data for a batch of users"""
+        ...
+
+    def reset_count(self, current_time: str = None) -> dict:
+        """Reset all users' count based on current state"""
+        ...
+
+    def load_epoch(self) -> dict[str, str] | None:
+        """Load the day epoch written by the last reset"""
+        ...
+
+    def save_epoch(self, epoch: dict[str, str]):
+        """Save the day epoch"""
+        ...
+
+    def import_users(self, users: list[dict[str, str]]) -> int:
+        """Replace all user data with the given users"""
+        ...
+
+    def get_leaderboard(self, limit: int = 10) -> list[dict[str, any]]:
+        """Get leaderboard sorted by consecutive count"""
+        ...
+
+    def close(self):
+        """Release open files, maps, connections and worker threads"""
+        ...
+
+    def group_commit(self) -> AbstractContextManager[None]:
+        """Group commit window sharing one durable flush across writes"""
+        ...
+
+
+def create_roumu_data(
+    backend: str = None, data_dir: str = None, shards: int = None
+) -> RoumuStorage:
+    """Create roumu data storage for the given backend
+
+    Args:
+        backend: Storage backend name, one of STORAGE_BACKENDS
+            (default: ROUMU_STORAGE environment variable or "csv")
+        data_dir: Directory path for data files (default: current directory)
+        shards: Number of hash shards; more than 1 splits users across that
+            many storages of the backend (default: ROUMU_SHARDS environment
+            variable or 1)
+
+    Returns:
+        Storage instance implementing RoumuStorage
+
+    Raises:
+        ValueError: If the backend is unknown or the shard count is invalid
+    """
+    backend = backend or os.getenv("ROUMU_STORAGE", "csv")
+    data_dir = data_dir or ""
+    shards = shards or int(os.getenv("ROUMU_SHARDS", "1"))
+
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}")
+
+    if shards != 1:
+        from .roumu_sharded import ShardedRoumuData
+
+        return ShardedRoumuData(backend, data_dir, shards)
+
+    if backend == "csv":
+        from .roumu_data import RoumuData
+
+        return RoumuData(os.path.join(data_dir, "roumu.csv"))
+
+    if backend == "journal":
+        from .roumu_journal import JournalRoumuData
+
+        return JournalRoumuData(os.path.join(data_dir, "roumu.csv"))
+
+    if backend == "sqlite":
+        from .roumu_sqlite import SqliteRoumuData
+
+        return SqliteRoumuData(os.path.join(data_dir, "roumu.db"))
+
+    if backend == "binary":
+        from .roumu_binary import BinaryRoumuData
+
+        return BinaryRoumuData(os.path.join(data_dir, "roumu.bin"))
+
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,169 @@
+"""Misskey streaming API (WebSocket) client for azkey-bot-roumu"""
+
+import json
+import queue
+import random
+import threading
+import uuid
+from urllib.parse import urlencode, urlsplit
+
+from websockets.exceptions import WebSocketException
+from websockets.sync.client import connect
+
+# 購読するチャンネル（ホームタイムラインの投稿と、メンション・フォローなどの通知）
+STREAM_CHANNELS = ("homeTimeline", "main")
+
+
+def streaming_url(misskey_url: str, i: str) -> str:
+    """Build the streaming API URL of a Misskey server
+
+    Args:
+        misskey_url: Misskey server endpoint (e.g., "https://azkey.azuki.blue")
+        i: Access token for authentication
+
+    Returns:
+        WebSocket URL (wss:// for https servers, ws:// for http servers)
+    """
+    parts = urlsplit(misskey_url.rstrip("/"))
+    scheme = "ws" if parts.scheme == "http" else "wss"
+    return f"{scheme}://{parts.netloc}{parts.path}/streaming?{urlencode({'i': i})}"
+
+
+class MisskeyStream:
+    """Background WebSocket subscription to Misskey's streaming API
+
+    A daemon thread connects to /streaming, connects the homeTimeline and
+    main channels and puts events on the events queue as (kind, body)
+    tuples:
+
+    - ("connected", {"reconnect": bool}): the channels are subscribed; events
+      sent while the bot was disconnected have to be fetched with REST
+    - ("note", note): a note on the home timeline
+    - ("mention", note): a note mentioning the bot
+    - ("followed", user): a user followed the bot
+    - ("disconnected", {"error": str}): the connection was lost; the thread
+      reconnects after a jittered exponential backoff
+
+    Events are consumed on the caller's thread, so all API calls and data
+    writes stay where they were in polling mode.
+    """
+
+    def __init__(
+        self,
+        misskey_url: str,
+        i: str,
+        channels: tuple = STREAM_CHANNELS,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        open_timeout: float = 10.0,
+    ):
+        """Initialize MisskeyStream
+
+        Args:
+            misskey_url: Misskey server endpoint (e.g., "https://azkey.azuki.blue")
+            i: Access token for authentication
+            channels: Channels to connect (default: homeTimeline and main)
+            backoff_base: Reconnect backoff ceiling after the first failure in
+                seconds; it doubles per failure (default: 1.0)
+            backoff_max: Maximum reconnect backoff ceiling in seconds
+                (default: 60.0)
+            open_timeout: Timeout of the WebSocket handshake in seconds
+                (default: 10.0)
+
+        Raises:
+            ValueError: If required parameters are not provided
+        """
+        if not misskey_url:
+            raise ValueError("misskey_url is required")
+        if not i:
+            raise ValueError("Access token 'i' is required")
+
+        self.url = streaming_url(misskey_url, i)
+        self.channels = channels
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.open_timeout = open_timeout
+        self.events: queue.Queue = queue.Queue()
+        self._channel_ids = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._connection = None
+
+    def start(self):
+        """Start the background thread"""
+        self._thread = threading.Thread(
+            target=self._run, name="misskey-stream", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Close the connection and wait for the background thread
+
+        Args:
+            timeout: Seconds to wait for the thread (default: 10.0)
+        """
+        self._stop.set()
+        connection = self._connection
+        if connection is not None:
+            connection.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        """Connect, read events and reconnect until stopped"""
+        failures = 0
+        connected_before = False
+        while not self._stop.is_set():
+            error = "connection closed"
+            try:
+                with connect(self.url, open_timeout=self.open_timeout) as connection:
+                    self._connection = connection
+                    self._subscribe(connection)
+                    self.events.put(("connected", {"reconnect": connected_before}))
+                    connected_before = True
+                    failures = 0
+                    for message in connection:
+                        self._dispatch(message)
+            except (OSError, TimeoutError, WebSocketException) as e:
+                error = str(e) or type(e).__name__
+            finally:
+                self._connection = None
+
+            if self._stop.is_set():
+                break
+            self.events.put(("disconnected", {"error": error}))
+
+            # ランダムな揺らぎ付きの指数バックオフで再接続する
+            ceiling = min(self.backoff_max, self.backoff_base * 2**failures)
+            failures += 1
+            self._stop.wait(random.uniform(0, ceiling))
+
+    def _subscribe(self, connection):
+        """Connect the channels on a new connection"""
+        self._channel_ids = {}
+        for channel in self.channels:
+            channel_id = uuid.uuid4().hex
+            self._channel_ids[channel_id] = channel
+            connection.send(
+                json.dumps(
+                    {"type": "connect", "body": {"channel": channel, "id": channel_id}}
+                )
+            )
+
+    def _dispatch(self, message):
+        """Turn a streaming message into an event"""
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return
+        if not isinstance(data, dict) or data.get("type") != "channel":
+            return
+
+        body = data.get("body") or {}
+        channel = self._channel_ids.get(body.get("id"))
+        event_type = body.get("type")
+        event_body = body.get("body")
+        if channel == "homeTimeline" and event_type == "note":
+            self.events.put(("note", event_body))
+        elif channel == "main" and event_type in ("mention", "followed"):
+            self.events.put((event_type, event_body))
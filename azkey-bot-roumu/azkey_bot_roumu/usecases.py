@@ -1,32 +1,78 @@
 """Usecases class for azkey-bot-roumu"""
 
+import asyncio
 import os
+import threading
+import time
 
+from .cache import MISSING, TTLCache
+from .keywords import KeywordMatcher, load_keywords
 from .roumu_data import RoumuData
+from .state import BotState, SeenNotes
+from .storage import create_roumu_data
 
 
 class Usecases:
     """Main usecases class for handling configuration and API endpoints"""
 
-    def __init__(self, csv_dir: str = None):
+    def __init__(self, csv_dir: str = None, storage: str = None, shards: int = None):
         """Initialize Usecases class
 
         Args:
-            csv_dir: Directory path for CSV file storage (default: current directory)
+            csv_dir: Directory path for data file storage (default: current directory)
+            storage: Storage backend, "csv", "journal", "sqlite" or "binary"
+                (default: ROUMU_STORAGE environment variable or "csv")
+            shards: Number of hash shards for the storage
+                (default: ROUMU_SHARDS environment variable or 1)
         """
         self.i = None
         self.openrouter_api_key = None
         self.misskey_endpoint = os.getenv(
             "MISSKEY_ENDPOINT", "https://azkey.azuki.blue"
         )
-
-        # Configure CSV file path
-        if csv_dir:
-            csv_file_path = os.path.join(csv_dir, "roumu.csv")
-        else:
-            csv_file_path = "roumu.csv"
-
-        self.roumu_data = RoumuData(csv_file_path)
+        self.misskey_pool_size = int(os.getenv("MISSKEY_POOL_SIZE", "10"))
+        self.misskey_gzip = os.getenv("MISSKEY_GZIP", "true").lower() not in (
+            "0",
+            "false",
+            "no",
+        )
+        self.misskey_rate_limit_retries = int(
+            os.getenv("MISSKEY_RATE_LIMIT_RETRIES", "5")
+        )
+        self.misskey_connect_timeout = float(os.getenv("MISSKEY_CONNECT_TIMEOUT", "5"))
+        self.misskey_read_timeout = float(os.getenv("MISSKEY_READ_TIMEOUT", "30"))
+        self.misskey_max_retries = int(os.getenv("MISSKEY_MAX_RETRIES", "3"))
+        self.misskey_circuit_failures = int(os.getenv("MISSKEY_CIRCUIT_FAILURES", "5"))
+        self.misskey_circuit_reset = float(os.getenv("MISSKEY_CIRCUIT_RESET", "30"))
+        self.misskey_max_concurrency = int(
+            os.getenv("MISSKEY_MAX_CONCURRENCY", str(self.misskey_pool_size))
+        )
+        self._misskey_client = None
+        self._async_misskey_client = None
+        self._event_loop = None
+        # serve のステージは並行に動くため、クライアントの生成は1スレッドずつ行う
+        self._client_lock = threading.RLock()
+
+        self.roumu_data = create_roumu_data(storage, csv_dir, shards)
+        self.state = BotState(os.path.join(csv_dir or "", "bot_state.json"))
+        # 直前の get_new_timeline_notes() が max_pages で打ち切られたか
+        self.timeline_backlog = False
+        self.keyword_matcher = KeywordMatcher(load_keywords())
+        seen_notes_size = int(os.getenv("ROUMU_SEEN_NOTES", "2000"))
+        self.seen_checkin_notes = SeenNotes(
+            self.state, "seen_checkin_notes", seen_notes_size
+        )
+        self.seen_mention_notes = SeenNotes(
+            self.state, "seen_mention_notes", seen_notes_size
+        )
+        self.follow_reconcile_interval = float(
+            os.getenv("ROUMU_FOLLOW_RECONCILE_INTERVAL", "3600")
+        )
+        self.user_cache = TTLCache(
+            maxsize=int(os.getenv("ROUMU_USER_CACHE_SIZE", "1000")),
+            ttl=float(os.getenv("ROUMU_USER_CACHE_TTL", "600")),
+            negative_ttl=float(os.getenv("ROUMU_USER_CACHE_NEGATIVE_TTL", "60")),
+        )
 
     def load_environment_variables(self):
         """Load environment variables i and OPENROUTER_API_KEY
@@ -54,12 +100,17 @@ class Usecases:
     def get_misskey_client(self):
         """Get configured Misskey client instance
 
+        The client is created once and reused, so all API calls share its
+        pooled keep-alive connections. It is recreated if the access token
+        has changed.
+
         Returns:
             Misskey: Configured Misskey client
 
         Raises:
             ValueError: If configuration is not loaded
         """
+        from .circuit_breaker import CircuitBreakers
         from .misskey import Misskey
 
         if not self.is_configured():
@@ -67,7 +118,114 @@ class Usecases:
                 "Configuration not loaded. Call load_environment_variables() first."
             )
 
-        return Misskey(self.misskey_endpoint, self.i)
+        with self._client_lock:
+            if self._misskey_client is None or self._misskey_client.i != self.i:
+                if self._misskey_client is not None:
+                    self._misskey_client.close()
+                self._misskey_client = Misskey(
+                    self.misskey_endpoint,
+                    self.i,
+                    pool_size=self.misskey_pool_size,
+                    gzip=self.misskey_gzip,
+                    rate_limit_retries=self.misskey_rate_limit_retries,
+                    connect_timeout=self.misskey_connect_timeout,
+                    read_timeout=self.misskey_read_timeout,
+                    max_retries=self.misskey_max_retries,
+                    circuit_breakers=CircuitBreakers(
+                        self.misskey_circuit_failures, self.misskey_circuit_reset
+                    ),
+                )
+
+            return self._misskey_client
+
+    def create_stream(self):
+        """Create a streaming API client for the configured account
+
+        Returns:
+            MisskeyStream: Not yet started client subscribed to the
+                homeTimeline and main channels
+
+        Raises:
+            ValueError: If configuration is not loaded
+        """
+        from .streaming import MisskeyStream
+
+        if not self.is_configured():
+            raise ValueError(
+                "Configuration not loaded. Call load_environment_variables() first."
+            )
+        return MisskeyStream(self.misskey_endpoint, self.i)
+
+    def get_connection_stats(self) -> dict:
+        """Get connection reuse statistics of the Misskey client
+
+        Returns:
+            Dictionary with request and connection counts (all zero if no
+            client has been created yet)
+        """
+        if self._misskey_client is None:
+            return {
+                "requests": 0,
+                "connections_opened": 0,
+                "connections_reused": 0,
+                "pool_size": self.misskey_pool_size,
+            }
+        return self._misskey_client.connection_stats()
+
+    def get_async_misskey_client(self):
+        """Get the asyncio Misskey client sharing the pooled client
+
+        Returns:
+            AsyncMisskey: Client whose coroutines must run on run_async()'s loop
+
+        Raises:
+            ValueError: If configuration is not loaded
+        """
+        from .async_misskey import AsyncMisskey
+
+        with self._client_lock:
+            misskey = self.get_misskey_client()
+            if (
+                self._async_misskey_client is None
+                or self._async_misskey_client.misskey is not misskey
+            ):
+                if self._async_misskey_client is not None:
+                    self._async_misskey_client.close()
+                self._async_misskey_client = AsyncMisskey(
+                    misskey, max_concurrency=self.misskey_max_concurrency
+                )
+
+            return self._async_misskey_client
+
+    def run_async(self, coro):
+        """Run a coroutine on the shared background event loop
+
+        Args:
+            coro: Coroutine to run
+
+        Returns:
+            Result of the coroutine
+        """
+        from .async_misskey import EventLoopThread
+
+        with self._client_lock:
+            if self._event_loop is None:
+                self._event_loop = EventLoopThread()
+            event_loop = self._event_loop
+        return event_loop.run(coro)
+
+    def close(self):
+        """Close the Misskey clients, their event loop and the roumu storage"""
+        if self._async_misskey_client is not None:
+            self._async_misskey_client.close()
+            self._async_misskey_client = None
+        if self._event_loop is not None:
+            self._event_loop.close()
+            self._event_loop = None
+        if self._misskey_client is not None:
+            self._misskey_client.close()
+            self._misskey_client = None
+        self.roumu_data.close()
 
     def get_followers(self, user_id: str, limit: int = 100) -> dict:
         """Get user's followers list
@@ -101,9 +259,16 @@ class Usecases:
         misskey = self.get_misskey_client()
         return misskey.get_following(user_id=user_id, limit=limit)
 
-    def get_my_user_id(self) -> str:
+    def get_my_user_id(self, refresh: bool = False) -> str:
         """Get current user's ID
 
+        The identity is cached on the Misskey client, so only the first call
+        (and the first after an auth error or refresh=True) hits /api/i.
+
+        Args:
+            refresh: Ask the server again instead of using the cache
+                (default: False)
+
         Returns:
             Current user's ID
 
@@ -111,7 +276,7 @@ class Usecases:
             ValueError: If configuration is not loaded
         """
         misskey = self.get_misskey_client()
-        my_info = misskey.get_my_info()
+        my_info = misskey.get_my_info(refresh=refresh)
         return my_info.get("id")
 
     def get_my_followers(self, limit: int = 100) -> dict:
@@ -144,62 +309,221 @@ class Usecases:
         my_user_id = self.get_my_user_id()
         return self.get_following(user_id=my_user_id, limit=limit)
 
-    def follow_back(self, limit: int = 100) -> dict:
+    def follow_back(self, limit: int = 100, full: bool = None) -> dict:
         """Follow back users who are following me but I'm not following them
 
+        Normally only follower relations newer than the persisted cursor are
+        fetched (one small request when nothing changed). A full
+        reconciliation of both relation lists runs when there is no cursor
+        yet, or once every follow_reconcile_interval seconds, to catch
+        anything the incremental runs missed (e.g. failed follows).
+
         Args:
-            limit: Maximum number of users to check (default: 100)
+            limit: Number of relations fetched per request (default: 100)
+            full: Force (True) or skip (False) the full reconciliation
+                (default: None = decide by schedule)
 
         Returns:
-            Dictionary containing follow back results
+            Dictionary containing follow back results; mode is "full" or
+            "incremental", and in incremental mode total_followers counts
+            only the new followers and total_following is None
 
         Raises:
             ValueError: If configuration is not loaded
         """
-        misskey = self.get_misskey_client()
+        cursor = self.state.get("follower_cursor")
+        if full is None:
+            last_full = self.state.get("follower_reconciled_at", 0)
+            full = (
+                cursor is None
+                or time.time() - last_full >= self.follow_reconcile_interval
+            )
 
-        # フォロワーリストを取得
-        followers_response = self.get_my_followers(limit=limit)
+        if full:
+            return self._follow_back_full(limit)
+        return self._follow_back_incremental(limit, cursor)
 
-        # フォローリストを取得
-        following_response = self.get_my_following(limit=limit)
+    def _follow_back_full(self, limit: int) -> dict:
+        """Reconcile both relation lists completely
 
-        # フォローされているけど、フォローしていないユーザを抽出
-        # Misskeyのレスポンス構造: {"follower": {"id": "..."}} と {"followee": {"id": "..."}}
-        followers_ids = set()
-        for item in followers_response:
-            if isinstance(item, dict) and "follower" in item and item["follower"]:
-                followers_ids.add(item["follower"].get("id"))
+        Only the IDs of followed users are kept in memory; followers are
+        streamed page by page and each page's follow-backs are sent
+        concurrently.
+
+        Args:
+            limit: Number of relations fetched per request
 
+        Returns:
+            Dictionary containing follow back results
+        """
+        misskey = self.get_misskey_client()
+        my_user_id = self.get_my_user_id()
+        started_at = time.time()
+
+        # フォロー中のユーザーIDだけを集める
+        # Misskeyのレスポンス構造: {"follower": {"id": "..."}} と {"followee": {"id": "..."}}
         following_ids = set()
-        for item in following_response:
-            if isinstance(item, dict) and "followee" in item and item["followee"]:
+        for item in misskey.iter_following(my_user_id, page_size=limit):
+            if isinstance(item, dict) and item.get("followee"):
                 following_ids.add(item["followee"].get("id"))
 
-        # フォローバックすべきユーザーID
-        users_to_follow_back = followers_ids - following_ids
+        # フォロワーを順に読み、フォローしていないユーザーをページ単位でフォローバック
+        total_followers = 0
+        users_to_follow_back = 0
+        newest_relation_id = None
+        successful_follows = []
+        failed_follows = []
+        pending_ids = []
+
+        for item in misskey.iter_followers(my_user_id, page_size=limit):
+            if not isinstance(item, dict) or not item.get("follower"):
+                continue
+            total_followers += 1
+            if item.get("id") and (
+                newest_relation_id is None or item["id"] > newest_relation_id
+            ):
+                newest_relation_id = item["id"]
+
+            follower_id = item["follower"].get("id")
+            if follower_id in following_ids:
+                continue
+
+            # フォローバックすべきユーザー
+            following_ids.add(follower_id)
+            users_to_follow_back += 1
+            pending_ids.append(follower_id)
+            if len(pending_ids) >= limit:
+                self._collect_follows(pending_ids, successful_follows, failed_follows)
+                pending_ids = []
+
+        if pending_ids:
+            self._collect_follows(pending_ids, successful_follows, failed_follows)
+
+        self.state.update(
+            {
+                "follower_cursor": newest_relation_id
+                or self.state.get("follower_cursor"),
+                "follower_reconciled_at": started_at,
+            }
+        )
 
-        # フォローバック実行
+        return {
+            "mode": "full",
+            "total_followers": total_followers,
+            "total_following": len(following_ids) - users_to_follow_back,
+            "users_to_follow_back": users_to_follow_back,
+            "successful_follows": successful_follows,
+            "failed_follows": failed_follows,
+            "success_count": len(successful_follows),
+            "failure_count": len(failed_follows),
+        }
+
+    def _follow_back_incremental(self, limit: int, cursor: str) -> dict:
+        """Follow back only followers newer than the cursor
+
+        Args:
+            limit: Number of relations fetched per request
+            cursor: Newest follower relation ID already processed
+
+        Returns:
+            Dictionary containing follow back results
+        """
+        misskey = self.get_misskey_client()
+        my_user_id = self.get_my_user_id()
+
+        new_followers = 0
+        newest_relation_id = cursor
         successful_follows = []
         failed_follows = []
+        pending_ids = []
+
+        for item in misskey.iter_followers(
+            my_user_id, page_size=limit, since_id=cursor
+        ):
+            if not isinstance(item, dict) or not item.get("follower"):
+                continue
+            new_followers += 1
+            if item.get("id") and item["id"] > newest_relation_id:
+                newest_relation_id = item["id"]
+
+            # リレーションに含まれるユーザー情報でフォロー済みなら飛ばす
+            follower = item["follower"]
+            if follower.get("isFollowing"):
+                continue
+            pending_ids.append(follower.get("id"))
+
+        users_to_follow_back = len(pending_ids)
+        for start in range(0, len(pending_ids), limit):
+            self._collect_follows(
+                pending_ids[start : start + limit], successful_follows, failed_follows
+            )
 
-        for follow_id in users_to_follow_back:
-            try:
-                misskey.follow_user(follow_id)
-                successful_follows.append(follow_id)
-            except Exception as e:
-                failed_follows.append({"follow_id": follow_id, "error": str(e)})
+        if newest_relation_id != cursor:
+            self.state.set("follower_cursor", newest_relation_id)
 
         return {
-            "total_followers": len(followers_ids),
-            "total_following": len(following_ids),
-            "users_to_follow_back": len(users_to_follow_back),
+            "mode": "incremental",
+            "total_followers": new_followers,
+            "total_following": None,
+            "users_to_follow_back": users_to_follow_back,
             "successful_follows": successful_follows,
             "failed_follows": failed_follows,
             "success_count": len(successful_follows),
             "failure_count": len(failed_follows),
         }
 
+    def _collect_follows(
+        self, user_ids: list[str], successful_follows: list, failed_follows: list
+    ):
+        """Follow users concurrently and record the results
+
+        Users that turn out to be followed already are counted as successful.
+
+        Args:
+            user_ids: User IDs to follow
+            successful_follows: List to append followed user IDs to
+            failed_follows: List to append {"follow_id", "error"} to
+        """
+        for follow_id, error in self._follow_users(user_ids).items():
+            if error is None or "ALREADY_FOLLOWING" in str(error):
+                successful_follows.append(follow_id)
+            else:
+                failed_follows.append({"follow_id": follow_id, "error": str(error)})
+
+    def _follow_users(self, user_ids: list[str]) -> dict:
+        """Follow several users concurrently
+
+        At most half of the client's concurrency is used, so a large
+        follow-back leaves room for the other serve stages' requests.
+
+        Args:
+            user_ids: User IDs to follow
+
+        Returns:
+            Dictionary mapping each user ID to None on success or the raised
+            exception on failure
+        """
+        misskey = self.get_async_misskey_client()
+
+        async def follow_all():
+            limiter = asyncio.Semaphore(max(1, misskey.max_concurrency // 2))
+
+            async def follow(user_id):
+                async with limiter:
+                    return await misskey.follow_user(user_id)
+
+            return await asyncio.gather(
+                *(follow(user_id) for user_id in user_ids),
+                return_exceptions=True,
+            )
+
+        return {
+            user_id: result if isinstance(result, Exception) else None
+            for user_id, result in zip(
+                user_ids, self.run_async(follow_all()), strict=True
+            )
+        }
+
     def checkin_roumu(self, user_id: str) -> dict:
         """Record roumu check-in for a user
 
@@ -212,6 +536,28 @@ class Usecases:
 
         return self.roumu_data.update_checkin(user_id)
 
+    def checkin_roumu_batch(self, user_ids: list[str]) -> dict:
+        """Record roumu check-ins for a batch of users in one storage write
+
+        Args:
+            user_ids: User IDs to check in (duplicates are checked in once)
+
+        Returns:
+            Dictionary mapping each unique user ID to its check-in results
+        """
+        return self.roumu_data.update_checkins(user_ids)
+
+    def roumu_group_commit(self):
+        """Open a group commit window on the roumu storage
+
+        Check-ins recorded inside the window are flushed to disk together
+        when it closes, with a single fsync.
+
+        Returns:
+            Context manager for the group commit window
+        """
+        return self.roumu_data.group_commit()
+
     def get_roumu_leaderboard(self, limit: int = 10) -> list:
         """Get roumu leaderboard
 
@@ -223,6 +569,51 @@ class Usecases:
         """
         return self.roumu_data.get_leaderboard(limit)
 
+    def build_roumu_leaderboard_text(self, limit: int = 10) -> str:
+        """Build leaderboard note text with usernames
+
+        Args:
+            limit: Maximum number of users to include (default: 10)
+
+        Returns:
+            Leaderboard text for posting
+
+        Raises:
+            ValueError: If configuration is not loaded
+        """
+        leaderboard = [
+            user
+            for user in self.get_roumu_leaderboard(limit)
+            if user["consecutive_count_int"] > 0
+        ]
+        if not leaderboard:
+            return "🏆 連続出勤ランキング\nまだ出勤データがありません"
+
+        usernames = self.get_usernames_from_userids(
+            [user["user_id"] for user in leaderboard]
+        )
+        lines = ["🏆 連続出勤ランキング"]
+        for rank, user in enumerate(leaderboard, 1):
+            username = usernames[user["user_id"]]
+            lines.append(f"{rank}. {username} 🔥 {user['consecutive_count_int']}日")
+        return "\n".join(lines)
+
+    def post_roumu_leaderboard(self, limit: int = 10) -> dict:
+        """Post roumu leaderboard as a note
+
+        Args:
+            limit: Maximum number of users to include (default: 10)
+
+        Returns:
+            API response containing created note information
+
+        Raises:
+            ValueError: If configuration is not loaded
+        """
+        text = self.build_roumu_leaderboard_text(limit)
+        misskey = self.get_misskey_client()
+        return misskey.create_note(text=text)
+
     def get_roumu_user_status(self, user_id: str) -> dict:
         """Get specific user's roumu status
 
@@ -235,16 +626,131 @@ class Usecases:
         return self.roumu_data.get_user(user_id)
 
     def reset_count(self) -> dict:
-        """Reset all users' count based on current state
+        """Start a new day for all users
 
-        - If last_checkin is empty: set consecutive_count = 0
-        - If last_checkin is not empty: set last_checkin = ""
+        Advances the stored day epoch; today's check-ins and broken streaks
+        are then evaluated lazily from each user's last_checkin.
 
         Returns:
             Dictionary with reset results
         """
         return self.roumu_data.reset_count()
 
+    def import_roumu_csv(self, csv_file_path: str) -> dict:
+        """Import an existing roumu.csv into the configured storage backend
+
+        Args:
+            csv_file_path: Path to the source CSV file
+
+        Returns:
+            Dictionary with import results
+
+        Raises:
+            FileNotFoundError: If the CSV file does not exist
+        """
+        if not os.path.exists(csv_file_path):
+            raise FileNotFoundError(f"CSV file not found: {csv_file_path}")
+
+        source = RoumuData(csv_file_path)
+        imported_users = self.roumu_data.import_users(source.load_all_users())
+
+        # Carry over the day epoch so lazy resets continue seamlessly
+        epoch = source.load_epoch()
+        if epoch is not None:
+            self.roumu_data.save_epoch(epoch)
+
+        return {
+            "source": csv_file_path,
+            "imported_users": imported_users,
+        }
+
+    def export_roumu_csv(self, csv_file_path: str) -> dict:
+        """Export the configured storage backend to a roumu.csv file
+
+        Args:
+            csv_file_path: Path to the destination CSV file
+
+        Returns:
+            Dictionary with export results
+        """
+        target = RoumuData(csv_file_path)
+        exported_users = target.import_users(self.roumu_data.load_all_users())
+
+        epoch = self.roumu_data.load_epoch()
+        if epoch is not None:
+            target.save_epoch(epoch)
+
+        return {
+            "destination": csv_file_path,
+            "exported_users": exported_users,
+        }
+
+    def get_users_info(self, user_ids: list[str]) -> dict:
+        """Get user information by user IDs, using the user cache
+
+        Users missing from the cache are fetched with one bulk users/show
+        request. User IDs the server does not know are cached as missing
+        for a shorter time.
+
+        Args:
+            user_ids: Target user IDs
+
+        Returns:
+            Dictionary mapping user ID to user information (None for
+            unknown users)
+
+        Raises:
+            ValueError: If configuration is not loaded
+        """
+        users = {}
+        missing_ids = []
+        for user_id in dict.fromkeys(user_ids):
+            user_info = self.user_cache.lookup(user_id)
+            if user_info is MISSING:
+                missing_ids.append(user_id)
+            else:
+                users[user_id] = user_info
+
+        if missing_ids:
+            misskey = self.get_misskey_client()
+            fetched = {
+                user_info.get("id"): user_info
+                for user_info in misskey.get_users_info(missing_ids)
+                if isinstance(user_info, dict)
+            }
+            for user_id in missing_ids:
+                user_info = fetched.get(user_id)
+                self.user_cache.set(user_id, user_info)
+                users[user_id] = user_info
+
+        return users
+
+    def get_usernames_from_userids(self, user_ids: list[str]) -> dict:
+        """Get usernames for several user IDs
+
+        Args:
+            user_ids: Target user IDs
+
+        Returns:
+            Dictionary mapping user ID to "username@host", "username" for
+            local users, or "unknown"
+
+        Raises:
+            ValueError: If configuration is not loaded
+        """
+        usernames = {}
+        for user_id, user_info in self.get_users_info(user_ids).items():
+            user_info = user_info or {}
+            username = user_info.get("username", "unknown")
+            host = user_info.get("host")
+
+            # Return format: username@host or just username for local users
+            if host and host != "local":
+                usernames[user_id] = f"{username}@{host}"
+            else:
+                usernames[user_id] = username
+        return usernames
+
     def get_username_from_userid(self, user_id: str) -> str:
         """Get username from user ID using Misskey API
 
@@ -257,24 +763,17 @@ class Usecases:
         Raises:
             ValueError: If configuration is not loaded
         """
-        misskey = self.get_misskey_client()
-        user_info = misskey.get_user_info(user_id)
-
-        username = user_info.get("username", "unknown")
-        host = user_info.get("host")
-
-        # Return format: username@host or just username for local users
-        if host and host != "local":
-            return f"{username}@{host}"
-        else:
-            return username
+        return self.get_usernames_from_userids([user_id])[user_id]
 
-    def get_timeline(self, limit: int = 100, until_id: str = None) -> dict:
+    def get_timeline(
+        self, limit: int = 100, until_id: str = None, since_id: str = None
+    ) -> dict:
         """Get timeline posts
 
         Args:
             limit: Number of posts to fetch (default: 100)
             until_id: Get posts before this ID for pagination
+            since_id: Get posts after this ID for pagination
 
         Returns:
             API response containing timeline posts
@@ -283,7 +782,66 @@ class Usecases:
             ValueError: If configuration is not loaded
         """
         misskey = self.get_misskey_client()
-        return misskey.get_timeline(limit=limit, until_id=until_id)
+        return misskey.get_timeline(limit=limit, until_id=until_id, since_id=since_id)
+
+    def get_new_timeline_notes(self, limit: int = 100, max_pages: int = 10) -> list:
+        """Get timeline notes newer than the persisted high-water mark
+
+        Pages are fetched with sinceId, oldest first, until a short page.
+        Without a mark (first run) only the latest page is fetched. Call
+        mark_timeline_processed() once the notes have been handled.
+
+        timeline_backlog is set to True when max_pages ran out before a
+        short page, i.e. newer notes are still waiting on the server. Until
+        a later call catches up, the mark must not move past the returned
+        notes (e.g. to notes received from the streaming API), or the
+        notes in between would never be fetched.
+
+        Args:
+            limit: Number of notes fetched per request (default: 100)
+            max_pages: Maximum number of requests; notes beyond them are
+                fetched by the next call (default: 10)
+
+        Returns:
+            List of new notes
+
+        Raises:
+            ValueError: If configuration is not loaded
+        """
+        since_id = self.state.get("timeline_cursor")
+        if since_id is None:
+            self.timeline_backlog = False
+            notes = self.get_timeline(limit=limit)
+            return notes if isinstance(notes, list) else []
+
+        notes = []
+        backlog = False
+        for page_number in range(max_pages):
+            page = self.get_timeline(limit=limit, since_id=since_id)
+            if not isinstance(page, list):
+                break
+            page = [note for note in page if note.get("id", "") > since_id]
+            if not page:
+                break
+            notes.extend(page)
+            since_id = max(note["id"] for note in page)
+            if len(page) < limit:
+                break
+            backlog = page_number == max_pages - 1
+        self.timeline_backlog = backlog
+        return notes
+
+    def mark_timeline_processed(self, notes: list):
+        """Advance the timeline high-water mark past the given notes
+
+        Args:
+            notes: Notes that have been handled
+        """
+        cursor = self.state.get("timeline_cursor")
+        note_ids = [note.get("id") for note in notes if note.get("id")]
+        newest = max(note_ids, default=None)
+        if newest is not None and (cursor is None or newest > cursor):
+            self.state.set("timeline_cursor", newest)
 
     def add_reaction_to_note(self, note_id: str, reaction: str) -> dict:
         """Add reaction to a note
@@ -301,6 +859,35 @@ class Usecases:
         misskey = self.get_misskey_client()
         return misskey.add_reaction(note_id=note_id, reaction=reaction)
 
+    def add_reactions_to_notes(self, note_ids: list[str], reaction: str) -> dict:
+        """Add the same reaction to several notes concurrently
+
+        Args:
+            note_ids: Target note IDs
+            reaction: Reaction emoji (e.g., "👍", "❤️", "😀")
+
+        Returns:
+            Dictionary mapping each note ID to None on success or the raised
+            exception on failure
+
+        Raises:
+            ValueError: If configuration is not loaded
+        """
+        misskey = self.get_async_misskey_client()
+
+        async def react_all():
+            return await asyncio.gather(
+                *(misskey.add_reaction(note_id, reaction) for note_id in note_ids),
+                return_exceptions=True,
+            )
+
+        return {
+            note_id: result if isinstance(result, Exception) else None
+            for note_id, result in zip(
+                note_ids, self.run_async(react_all()), strict=True
+            )
+        }
+
     def get_mentions_without_reaction(
         self, limit: int = 20, following: bool = True
     ) -> list:
@@ -319,8 +906,7 @@ class Usecases:
         misskey = self.get_misskey_client()
 
         # Get current user's info to identify our own reactions
-        my_info = misskey.get_my_info()
-        my_user_id = my_info.get("id")
+        my_user_id = self.get_my_user_id()
 
         if not my_user_id:
             raise ValueError("Could not get current user ID")
@@ -358,6 +944,88 @@ class Usecases:
         Raises:
             ValueError: If configuration is not loaded or required data is missing
         """
+        note_id, reply_text = self.build_user_info_reply(note)
+
+        # Send reply using Misskey API
+        misskey = self.get_misskey_client()
+        return misskey.create_note(text=reply_text, reply_id=note_id)
+
+    def respond_to_mentions(self, mentions: list[dict], reaction: str = "👍") -> list:
+        """Reply with roumu information and react to each mention concurrently
+
+        Each mention gets its reply and then its reaction (the processed
+        mark); different mentions are handled concurrently.
+
+        Args:
+            mentions: Mention notes to respond to
+            reaction: Reaction added after a successful reply (default: 👍)
+
+        Returns:
+            List (in the order of mentions) of dictionaries with mention,
+            reply (API response or None), reply_error and reaction_error
+            (exception or None)
+
+        Raises:
+            ValueError: If configuration is not loaded
+        """
+        misskey = self.get_async_misskey_client()
+
+        # Build the replies here; the roumu storage is used from this thread
+        replies = []
+        for mention in mentions:
+            try:
+                replies.append(self.build_user_info_reply(mention))
+            except Exception as e:
+                replies.append(e)
+
+        async def respond(mention, reply):
+            response = {
+                "mention": mention,
+                "reply": None,
+                "reply_error": None,
+                "reaction_error": None,
+            }
+            if isinstance(reply, Exception):
+                response["reply_error"] = reply
+                return response
+
+            note_id, reply_text = reply
+            try:
+                response["reply"] = await misskey.create_note(
+                    text=reply_text, reply_id=note_id
+                )
+            except Exception as e:
+                response["reply_error"] = e
+                return response
+
+            try:
+                await misskey.add_reaction(note_id, reaction)
+            except Exception as e:
+                response["reaction_error"] = e
+            return response
+
+        async def respond_all():
+            return await asyncio.gather(
+                *(
+                    respond(mention, reply)
+                    for mention, reply in zip(mentions, replies, strict=True)
+                )
+            )
+
+        return self.run_async(respond_all())
+
+    def build_user_info_reply(self, note: dict) -> tuple[str, str]:
+        """Build the roumu information reply for a note
+
+        Args:
+            note: Note object containing user information and note ID
+
+        Returns:
+            Tuple of (note ID to reply to, reply text)
+
+        Raises:
+            ValueError: If required data is missing
+        """
         # Extract user ID from note
         user_id = note.get("userId") or note.get("user", {}).get("id")
         if not user_id:
@@ -396,6 +1064,4 @@ class Usecases:
             reply_text = f"""@{username} さんはまだ出勤データがありません
 """
 
-        # Send reply using Misskey API
-        misskey = self.get_misskey_client()
-        return misskey.create_note(text=reply_text, reply_id=note_id)
+        return note_id, reply_text
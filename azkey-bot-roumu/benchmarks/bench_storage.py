@@ -0,0 +1,438 @@
+"""Storage benchmark for roumu data backends
+
+Generates synthetic roumu.csv datasets and measures the latency and peak
+memory of update_checkin, get_user, get_leaderboard and reset_count, plus
+check-in throughput with several concurrent writer processes, for every
+storage backend. Results are printed (or written) as JSON.
+
+Usage (from the azkey-bot-roumu directory):
+
+    uv run python -m benchmarks.bench_storage --sizes 10000,100000
+    uv run python -m benchmarks.bench_storage --backends sqlite,binary \\
+        --output bench.json --baseline previous.json
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import click
+
+from azkey_bot_roumu.roumu_data import RoumuData
+from azkey_bot_roumu.storage import STORAGE_BACKENDS, create_roumu_data
+
+USER_ID_CHARS = "0123456789abcdefghijklmnopqrstuvwxyz"
+FIELDNAMES = ["user_id", "consecutive_count", "total_count", "last_checkin"]
+
+
+def generate_dataset(csv_file_path: str, users: int, seed: int = 0) -> list[str]:
+    """Write a synthetic roumu.csv
+
+    User IDs look like Misskey IDs (10 base36 characters). About a third of
+    the users checked in during the last day, a third earlier and the rest
+    never, with streaks of up to a year.
+
+    Args:
+        csv_file_path: Path of the CSV file to write
+        users: Number of users
+        seed: Random seed
+
+    Returns:
+        List of generated user IDs
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    user_ids = set()
+    while len(user_ids) < users:
+        user_ids.add("".join(rng.choices(USER_ID_CHARS, k=10)))
+    user_ids = sorted(user_ids)
+    rng.shuffle(user_ids)
+
+    with open(csv_file_path, "w", newline="", encoding="utf-8") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(FIELDNAMES)
+        for user_id in user_ids:
+            kind = rng.random()
+            if kind < 1 / 3:
+                last_checkin = now - timedelta(hours=rng.uniform(1, 23))
+            elif kind < 2 / 3:
+                last_checkin = now - timedelta(days=rng.uniform(2, 30))
+            else:
+                last_checkin = None
+
+            consecutive_count = rng.randint(1, 365) if last_checkin else 0
+            writer.writerow(
+                [
+                    user_id,
+                    consecutive_count,
+                    consecutive_count + rng.randint(0, 100),
+                    last_checkin.isoformat() if last_checkin else "",
+                ]
+            )
+
+    return user_ids
+
+
+def summarize(latencies: list[float]) -> dict:
+    """Summarize latencies in seconds as milliseconds"""
+    ordered = sorted(latencies)
+    return {
+        "iterations": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def measure(operation, args_list: list[tuple], memory_iterations: int) -> dict:
+    """Measure latency and peak memory of an operation
+
+    The first call is reported separately as first_ms, since it often pays
+    for loading an index or a cache.
+
+    Args:
+        operation: Callable to measure
+        args_list: Arguments of each call; the first one is the warm-up and
+            the last memory_iterations ones are only used for peak memory
+        memory_iterations: Calls to run under tracemalloc for peak memory
+
+    Returns:
+        Dictionary with latency statistics and peak_memory_bytes
+    """
+    start = time.perf_counter()
+    operation(*args_list[0])
+    first = time.perf_counter() - start
+
+    # Calls that change state (e.g. a first check-in) need unused arguments
+    # for the memory pass too, so the last memory_iterations are kept apart
+    memory_start = max(1, len(args_list) - memory_iterations)
+    latencies = []
+    for args in args_list[1:memory_start]:
+        start = time.perf_counter()
+        operation(*args)
+        latencies.append(time.perf_counter() - start)
+
+    # tracemalloc slows allocations down, so memory is measured separately
+    tracemalloc.start()
+    for args in args_list[memory_start:]:
+        operation(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "first_ms": first * 1000,
+        **summarize(latencies),
+        "peak_memory_bytes": peak,
+    }
+
+
+def writer_process(backend, data_dir, shards, user_ids, barrier, result_queue):
+    """Check in the given users one by one once all writers are ready"""
+    storage = create_roumu_data(backend, data_dir, shards)
+    barrier.wait()
+    start = time.perf_counter()
+    for user_id in user_ids:
+        storage.update_checkin(user_id)
+    result_queue.put(time.perf_counter() - start)
+    storage.close()
+
+
+def measure_concurrent_writers(
+    backend: str, data_dir: str, shards: int, user_ids: list[str], writers: int
+) -> dict:
+    """Measure check-in throughput of concurrent writer processes
+
+    Args:
+        backend: Storage backend name
+        data_dir: Data directory shared by all writers
+        shards: Number of shards
+        user_ids: Users to check in, split evenly between writers
+        writers: Number of writer processes
+
+    Returns:
+        Dictionary with throughput results
+    """
+    barrier = multiprocessing.Barrier(writers + 1)
+    result_queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=writer_process,
+            args=(
+                backend,
+                data_dir,
+                shards,
+                user_ids[n::writers],
+                barrier,
+                result_queue,
+            ),
+        )
+        for n in range(writers)
+    ]
+    for process in processes:
+        process.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+    writer_seconds = [result_queue.get() for _ in processes]
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+
+    return {
+        "writers": writers,
+        "operations": len(user_ids),
+        "seconds": elapsed,
+        "ops_per_second": len(user_ids) / elapsed if elapsed else None,
+        "slowest_writer_seconds": max(writer_seconds),
+    }
+
+
+def bench_backend(
+    backend: str,
+    shards: int,
+    dataset_path: str,
+    user_ids: list[str],
+    work_dir: str,
+    iterations: int,
+    memory_iterations: int,
+    writers: int,
+    writer_ops: int,
+    seed: int,
+) -> dict:
+    """Run all measurements for one backend and dataset"""
+    data_dir = tempfile.mkdtemp(prefix=f"{backend}-", dir=work_dir)
+    rng = random.Random(seed)
+
+    storage = create_roumu_data(backend, data_dir, shards)
+    start = time.perf_counter()
+    storage.import_users(RoumuData(dataset_path).load_all_users())
+    import_seconds = time.perf_counter() - start
+    # The first reset converts pre-epoch data; later resets are O(1)
+    storage.reset_count()
+    storage.close()
+
+    # Start from a fresh instance so first_ms includes loading indexes
+    storage = create_roumu_data(backend, data_dir, shards)
+    sample_size = min(len(user_ids), iterations + memory_iterations + 1)
+    operations = {
+        "get_user": measure(
+            storage.get_user,
+            [(user_id,) for user_id in rng.sample(user_ids, sample_size)],
+            memory_iterations,
+        ),
+        "get_leaderboard": measure(
+            storage.get_leaderboard,
+            [(10,)] * (iterations + memory_iterations + 1),
+            memory_iterations,
+        ),
+        # Distinct users, so every call records a real check-in
+        "update_checkin": measure(
+            storage.update_checkin,
+            [(user_id,) for user_id in rng.sample(user_ids, sample_size)],
+            memory_iterations,
+        ),
+        "reset_count": measure(
+            storage.reset_count,
+            [()] * (iterations + memory_iterations + 1),
+            memory_iterations,
+        ),
+    }
+    storage.close()
+
+    concurrent_writers = None
+    if writers > 0 and writer_ops > 0:
+        # Half existing users, half new users (appends)
+        writer_user_ids = rng.sample(user_ids, min(len(user_ids), writer_ops // 2))
+        writer_user_ids += [
+            f"new{n:07d}" for n in range(writer_ops - len(writer_user_ids))
+        ]
+        rng.shuffle(writer_user_ids)
+        concurrent_writers = measure_concurrent_writers(
+            backend, data_dir, shards, writer_user_ids, writers
+        )
+
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        "backend": backend,
+        "shards": shards,
+        "users": len(user_ids),
+        "import_seconds": import_seconds,
+        "operations": operations,
+        "concurrent_writers": concurrent_writers,
+    }
+
+
+def find_regressions(results: list[dict], baseline: dict, threshold: float) -> list:
+    """Compare p50 latencies with a baseline report
+
+    Args:
+        results: Benchmark results of this run
+        baseline: Previous JSON report
+        threshold: Allowed slowdown ratio (0.2 = 20% slower)
+
+    Returns:
+        List of regression descriptions
+    """
+    baseline_results = {
+        (result["backend"], result["shards"], result["users"]): result
+        for result in baseline.get("results", [])
+    }
+
+    regressions = []
+    for result in results:
+        previous = baseline_results.get(
+            (result["backend"], result["shards"], result["users"])
+        )
+        if previous is None:
+            continue
+        for name, stats in result["operations"].items():
+            previous_stats = previous["operations"].get(name)
+            if not previous_stats or not previous_stats["p50_ms"]:
+                continue
+            ratio = stats["p50_ms"] / previous_stats["p50_ms"]
+            if ratio > 1 + threshold:
+                regressions.append(
+                    {
+                        "backend": result["backend"],
+                        "shards": result["shards"],
+                        "users": result["users"],
+                        "operation": name,
+                        "baseline_p50_ms": previous_stats["p50_ms"],
+                        "p50_ms": stats["p50_ms"],
+                        "ratio": ratio,
+                    }
+                )
+    return regressions
+
+
+@click.command()
+@click.option(
+    "--sizes",
+    default="10000,100000,1000000",
+    help="Comma-separated dataset sizes (default: 10000,100000,1000000)",
+)
+@click.option(
+    "--backends",
+    default=",".join(STORAGE_BACKENDS),
+    help="Comma-separated storage backends (default: all)",
+)
+@click.option("--shards", default=1, help="Number of shards (default: 1)")
+@click.option(
+    "--iterations", default=20, help="Measured calls per operation (default: 20)"
+)
+@click.option(
+    "--memory-iterations",
+    default=3,
+    help="Calls per operation measured under tracemalloc (default: 3)",
+)
+@click.option("--writers", default=4, help="Concurrent writer processes (default: 4)")
+@click.option(
+    "--writer-ops",
+    default=200,
+    help="Total check-ins of the concurrent writers (default: 200)",
+)
+@click.option("--seed", default=0, help="Random seed (default: 0)")
+@click.option("--work-dir", default=None, help="Directory for datasets and data")
+@click.option("--output", default=None, help="Write the JSON report to this file")
+@click.option("--baseline", default=None, help="Previous JSON report to compare with")
+@click.option(
+    "--max-regression",
+    default=0.2,
+    help="Allowed p50 slowdown against the baseline (default: 0.2 = 20%)",
+)
+def main(
+    sizes,
+    backends,
+    shards,
+    iterations,
+    memory_iterations,
+    writers,
+    writer_ops,
+    seed,
+    work_dir,
+    output,
+    baseline,
+    max_regression,
+):
+    """Benchmark roumu storage backends and report results as JSON"""
+    sizes = [int(size) for size in sizes.split(",")]
+    backends = backends.split(",")
+    for backend in backends:
+        if backend not in STORAGE_BACKENDS:
+            raise click.BadParameter(f"Unknown storage backend: {backend}")
+
+    work_dir = tempfile.mkdtemp(prefix="roumu-bench-", dir=work_dir)
+    results = []
+    try:
+        for size in sizes:
+            dataset_path = os.path.join(work_dir, f"roumu-{size}.csv")
+            user_ids = generate_dataset(dataset_path, size, seed)
+            for backend in backends:
+                click.echo(f"benchmarking backend={backend} users={size}", err=True)
+                results.append(
+                    bench_backend(
+                        backend,
+                        shards,
+                        dataset_path,
+                        user_ids,
+                        work_dir,
+                        iterations,
+                        memory_iterations,
+                        writers,
+                        writer_ops,
+                        seed,
+                    )
+                )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "iterations": iterations,
+            "writers": writers,
+            "writer_ops": writer_ops,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            report["regressions"] = find_regressions(
+                results, json.load(f), max_regression
+            )
+
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        click.echo(text)
+
+    if report.get("regressions"):
+        click.echo(
+            f"{len(report['regressions'])} regression(s) over "
+            f"{max_regression:.0%} against {baseline}",
+            err=True,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+"""Local fake Misskey server for load and latency testing
+
+Serves the API endpoints used by azkey-bot and azkey-bot-roumu from
+synthetic in-memory data, with configurable latency, 5xx error rate and 429
+rate limiting, so serve cycles and analyze pagination can be load-tested
+offline. Point the bots at it with MISSKEY_ENDPOINT.
+
+Usage (from the azkey-bot-roumu directory):
+
+    uv run python -m benchmarks.fake_misskey --port 8080 --latency 50 \\
+        --followers 5000 --following 2500 --timeline-notes 1000
+    MISSKEY_ENDPOINT=http://127.0.0.1:8080 i=fake OPENROUTER_API_KEY=fake \\
+        uv run azkey-bot-roumu serve --interval 10
+
+The server also works as a library: FakeMisskeyServer(...).start() runs it
+on a background thread and .url gives the endpoint to use.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+
+ID_CHARS = "0123456789abcdefghijklmnopqrstuvwxyz"
+CHECKIN_TEXTS = ["ログボ", "出勤しました", "今日も打刻", "ログインボーナスください"]
+OTHER_TEXTS = ["おはよう", "眠い", "お昼ごはん", "いい天気", "帰りたい"]
+MAX_LIMIT = 100
+
+
+def make_id(n: int) -> str:
+    """Make a 10 character base36 ID that sorts like a Misskey aid
+
+    Args:
+        n: Sequence number; larger numbers give larger IDs
+
+    Returns:
+        Zero-padded base36 ID
+    """
+    chars = []
+    for _ in range(10):
+        n, rest = divmod(n, 36)
+        chars.append(ID_CHARS[rest])
+    return "".join(reversed(chars))
+
+
+def api_error(code: str, message: str) -> dict:
+    """Build a Misskey style error body"""
+    return {"error": {"code": code, "message": message, "id": code.lower()}}
+
+
+class FakeMisskeyData:
+    """Synthetic Misskey data and endpoint handlers
+
+    Relations, timeline notes, mentions and user notes are kept newest first
+    like Misskey returns them. The state changes when the bot follows users,
+    reacts or posts, so repeated serve cycles behave like against a real
+    server (e.g. a follow back is not needed twice).
+    """
+
+    def __init__(
+        self,
+        followers: int = 1000,
+        following: int = 500,
+        timeline_notes: int = 200,
+        mentions: int = 20,
+        user_notes: int = 1000,
+        checkin_ratio: float = 0.3,
+        seed: int = 0,
+    ):
+        """Generate the synthetic data
+
+        Args:
+            followers: Number of users following the bot
+            following: Number of those followers the bot follows already
+            timeline_notes: Number of notes on the home timeline
+            mentions: Number of notes mentioning the bot
+            user_notes: Number of notes returned by users/notes per user
+            checkin_ratio: Share of timeline notes containing a check-in
+                keyword
+            seed: Random seed
+        """
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next_id = 10**9
+        self.me = self._make_user("roumu_bot")
+        self.users = {}
+        self.following_ids = set()
+        self.followers = []
+        self.following = []
+        self.timeline = []
+        self.mentions = []
+        self.user_notes = []
+        self.reactions = {}
+
+        users = [self._make_user(f"user{n}") for n in range(max(followers, 1))]
+        for user in users:
+            self.users[user["id"]] = user
+        for user in users[:followers]:
+            self.followers.insert(0, self._relation("follower", user))
+        for user in users[:following]:
+            self._follow(user["id"])
+
+        for _ in range(timeline_notes):
+            text_choices = (
+                CHECKIN_TEXTS if self._rng.random() < checkin_ratio else OTHER_TEXTS
+            )
+            self.timeline.insert(
+                0, self._make_note(self._rng.choice(users), text_choices)
+            )
+        for _ in range(mentions):
+            note = self._make_note(self._rng.choice(users), ["@roumu_bot 勤怠"])
+            self.mentions.insert(0, note)
+        for _ in range(user_notes):
+            self.user_notes.insert(0, self._make_note(self.me, OTHER_TEXTS))
+
+    def _new_id(self) -> str:
+        """Make the next (largest so far) ID"""
+        self._next_id += self._rng.randint(1, 1000)
+        return make_id(self._next_id)
+
+    def _make_user(self, username: str) -> dict:
+        """Make a local user"""
+        return {"id": self._new_id(), "username": username, "host": None}
+
+    def _make_note(self, user: dict, texts: list[str]) -> dict:
+        """Make a note by a user"""
+        return {
+            "id": self._new_id(),
+            "text": self._rng.choice(texts),
+            "userId": user["id"],
+            "user": dict(user),
+            "reactions": {},
+            "myReaction": None,
+        }
+
+    def _relation(self, key: str, user: dict) -> dict:
+        """Make a followers/following relation"""
+        return {"id": self._new_id(), key: dict(user)}
+
+    def _follow(self, user_id: str):
+        """Record that the bot follows a user"""
+        self.following_ids.add(user_id)
+        self.following.insert(0, self._relation("followee", self.users[user_id]))
+        for relation in self.followers:
+            if relation["follower"]["id"] == user_id:
+                relation["follower"]["isFollowing"] = True
+
+    @staticmethod
+    def paginate(items: list, body: dict) -> list:
+        """Page a newest-first list with limit, sinceId and untilId
+
+        sinceId alone returns the oldest items after it first (ascending),
+        like Misskey; every other query returns newest first.
+        """
+        limit = max(1, min(int(body.get("limit", 10)), MAX_LIMIT))
+        since_id = body.get("sinceId")
+        until_id = body.get("untilId")
+        if until_id:
+            items = [item for item in items if item["id"] < until_id]
+        if since_id:
+            items = [item for item in items if item["id"] > since_id]
+            if not until_id:
+                return list(reversed(items))[:limit]
+        return items[:limit]
+
+    def add_follower(self) -> dict:
+        """Add a new user following the bot (e.g. during a load test)
+
+        Returns:
+            The new user
+        """
+        with self._lock:
+            user = self._make_user(f"user{len(self.users)}")
+            self.users[user["id"]] = user
+            self.followers.insert(0, self._relation("follower", user))
+            return user
+
+    def handle(self, path: str, body: dict) -> tuple[int, object]:
+        """Handle an API request
+
+        Args:
+            path: Request path (e.g. "/api/i")
+            body: JSON request body
+
+        Returns:
+            Tuple of (HTTP status code, JSON response body or None)
+        """
+        with self._lock:
+            if path == "/api/i":
+                return 200, self.me
+            if path in ("/api/users/followers", "/api/users/following"):
+                if body.get("userId") != self.me["id"]:
+                    return 200, []
+                items = self.followers if path.endswith("followers") else self.following
+                return 200, self.paginate(items, body)
+            if path == "/api/following/create":
+                user_id = body.get("userId")
+                if user_id not in self.users:
+                    return 400, api_error("NO_SUCH_USER", "No such user.")
+                if user_id in self.following_ids:
+                    return 400, api_error(
+                        "ALREADY_FOLLOWING", "You are already following that user."
+                    )
+                self._follow(user_id)
+                return 200, self.users[user_id]
+            if path == "/api/users/show":
+                if "userIds" in body:
+                    return 200, [
+                        self.users[user_id]
+                        for user_id in body["userIds"]
+                        if user_id in self.users
+                    ]
+                user = self.users.get(body.get("userId"))
+                if user is None:
+                    return 400, api_error("NO_SUCH_USER", "No such user.")
+                return 200, user
+            if path == "/api/notes/timeline":
+                return 200, self.paginate(self.timeline, body)
+            if path == "/api/notes/mentions":
+                return 200, self.paginate(self.mentions, body)
+            if path == "/api/users/notes":
+                return 200, self.paginate(self.user_notes, body)
+            if path == "/api/notes/reactions/create":
+                note_id = body.get("noteId")
+                if note_id in self.reactions:
+                    return 400, api_error(
+                        "ALREADY_REACTED", "You are already reacting to that note."
+                    )
+                self.reactions[note_id] = body.get("reaction")
+                for note in self.timeline + self.mentions:
+                    if note["id"] == note_id:
+                        note["reactions"] = {body.get("reaction"): 1}
+                        note["myReaction"] = body.get("reaction")
+                return 204, None
+            if path == "/api/notes/create":
+                note = self._make_note(self.me, [body.get("text") or ""])
+                note["replyId"] = body.get("replyId")
+                self.timeline.insert(0, note)
+                return 200, {"createdNote": note}
+            return 404, api_error("NO_SUCH_ENDPOINT", "No such endpoint.")
+
+
+class FakeMisskeyServer(ThreadingHTTPServer):
+    """HTTP server serving FakeMisskeyData with injected latency and errors
+
+    Every request waits latency ± jitter milliseconds. Then it fails with 500
+    at error_rate, is answered with 429 at rate_limit_ratio or when the
+    endpoint exceeds rate_limit requests per second (with Retry-After and
+    X-RateLimit-* headers), and otherwise reaches the data.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        data: FakeMisskeyData = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        token: str = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_ratio: float = 0.0,
+        rate_limit: float = None,
+        retry_after: float = 1.0,
+        seed: int = 0,
+    ):
+        """Initialize FakeMisskeyServer
+
+        Args:
+            data: Data to serve (default: FakeMisskeyData())
+            host: Address to listen on (default: "127.0.0.1")
+            port: Port to listen on (default: 0 = any free port)
+            token: Access token to require (default: None = accept any)
+            latency: Mean response latency in milliseconds
+            jitter: Maximum deviation from the latency in milliseconds
+            error_rate: Share of requests answered with 500
+            rate_limit_ratio: Share of requests answered with 429
+            rate_limit: Requests per second allowed per endpoint
+                (default: None = unlimited)
+            retry_after: Retry-After of 429 responses in seconds
+            seed: Random seed of the injected latency and errors
+        """
+        super().__init__((host, port), FakeMisskeyHandler)
+        self.data = data or FakeMisskeyData()
+        self.token = token
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_ratio = rate_limit_ratio
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.request_counts = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._windows = {}
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Endpoint to use as MISSKEY_ENDPOINT"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve on a background daemon thread"""
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="fake-misskey", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self.shutdown()
+        self.server_close()
+
+    def stats(self) -> dict:
+        """Get the number of requests and responses per endpoint and status
+
+        Returns:
+            Dictionary mapping "path status" to a count
+        """
+        with self._lock:
+            return dict(sorted(self.request_counts.items()))
+
+    def fault(self, path: str) -> tuple[int, dict] | None:
+        """Decide whether to inject a failure into a request
+
+        Returns:
+            Tuple of (status code, extra headers), or None to serve normally
+        """
+        with self._lock:
+            if self._rng.random() < self.error_rate:
+                return 500, {}
+            if self._rng.random() < self.rate_limit_ratio:
+                return 429, {"Retry-After": f"{self.retry_after:g}"}
+            if self.rate_limit is None:
+                return None
+
+            # 1秒ごとの固定ウィンドウでエンドポイントごとの回数を数える
+            window = int(time.monotonic())
+            start, count = self._windows.get(path, (window, 0))
+            if start != window:
+                count = 0
+            self._windows[path] = (window, count + 1)
+            limit = max(int(self.rate_limit), 1)
+            headers = {
+                "X-RateLimit-Limit": str(limit),
+                "X-RateLimit-Remaining": str(max(limit - count - 1, 0)),
+                "X-RateLimit-Clear": "1",
+            }
+            if count >= limit:
+                headers["Retry-After"] = "1"
+                return 429, headers
+            return None
+
+    def delay(self) -> float:
+        """Pick the latency of a request in seconds"""
+        with self._lock:
+            offset = self._rng.uniform(-self.jitter, self.jitter)
+        return max(self.latency + offset, 0.0) / 1000
+
+
+class FakeMisskeyHandler(BaseHTTPRequestHandler):
+    """Request handler of FakeMisskeyServer"""
+
+    protocol_version = "HTTP/1.1"
+    server: FakeMisskeyServer
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            body = None
+
+        delay = self.server.delay()
+        if delay:
+            time.sleep(delay)
+
+        headers = {}
+        if not isinstance(body, dict):
+            status, response = 400, api_error("INVALID_PARAM", "Invalid param.")
+        elif self.server.token is not None and body.get("i") != self.server.token:
+            status, response = (
+                401,
+                api_error("CREDENTIAL_REQUIRED", "Credential required."),
+            )
+        else:
+            fault = self.server.fault(self.path)
+            if fault is not None:
+                status, headers = fault
+                response = api_error(
+                    "RATE_LIMIT_EXCEEDED" if status == 429 else "INTERNAL_ERROR",
+                    "Injected failure.",
+                )
+            else:
+                status, response = self.server.data.handle(self.path, body)
+
+        with self.server._lock:
+            key = f"{self.path} {status}"
+            self.server.request_counts[key] = self.server.request_counts.get(key, 0) + 1
+
+        payload = b"" if response is None else json.dumps(response).encode("utf-8")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if payload:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        """Keep the load test output quiet"""
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", help="Listen address")
+@click.option("--port", default=8080, help="Listen port (default: 8080)")
+@click.option("--token", default=None, help="Required access token (default: any)")
+@click.option("--latency", default=0.0, help="Mean latency in ms (default: 0)")
+@click.option("--jitter", default=0.0, help="Latency jitter in ms (default: 0)")
+@click.option("--error-rate", default=0.0, help="Share of 500 responses")
+@click.option("--rate-limit-ratio", default=0.0, help="Share of injected 429s")
+@click.option(
+    "--rate-limit",
+    default=None,
+    type=float,
+    help="Requests per second per endpoint before 429 (default: unlimited)",
+)
+@click.option("--retry-after", default=1.0, help="Retry-After of injected 429s")
+@click.option("--followers", default=1000, help="Number of followers")
+@click.option("--following", default=500, help="Followers already followed back")
+@click.option("--timeline-notes", default=200, help="Notes on the home timeline")
+@click.option("--mentions", default=20, help="Notes mentioning the bot")
+@click.option("--user-notes", default=1000, help="Notes returned by users/notes")
+@click.option("--checkin-ratio", default=0.3, help="Share of check-in notes")
+@click.option(
+    "--new-followers-per-minute",
+    default=0.0,
+    help="Followers added while running (default: 0)",
+)
+@click.option("--seed", default=0, help="Random seed (default: 0)")
+def main(
+    host,
+    port,
+    token,
+    latency,
+    jitter,
+    error_rate,
+    rate_limit_ratio,
+    rate_limit,
+    retry_after,
+    followers,
+    following,
+    timeline_notes,
+    mentions,
+    user_notes,
+    checkin_ratio,
+    new_followers_per_minute,
+    seed,
+):
+    """Run a fake Misskey server until interrupted, then print request counts"""
+    data = FakeMisskeyData(
+        followers=followers,
+        following=following,
+        timeline_notes=timeline_notes,
+        mentions=mentions,
+        user_notes=user_notes,
+        checkin_ratio=checkin_ratio,
+        seed=seed,
+    )
+    server = FakeMisskeyServer(
+        data,
+        host=host,
+        port=port,
+        token=token,
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        rate_limit_ratio=rate_limit_ratio,
+        rate_limit=rate_limit,
+        retry_after=retry_after,
+        seed=seed,
+    )
+    server.start()
+    click.echo(f"Fake Misskey listening on {server.url} (user id {data.me['id']})")
+
+    try:
+        while True:
+            if new_followers_per_minute > 0:
+                time.sleep(60 / new_followers_per_minute)
+                data.add_follower()
+            else:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        click.echo(json.dumps(server.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
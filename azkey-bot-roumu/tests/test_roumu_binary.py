@@ -0,0 +1,64 @@
+"""Tests for the binary roumu storage"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from azkey_bot_roumu.roumu_binary import HEADER, BinaryRoumuData
+
+# 子プロセスからヘッダーのロックを待たずに取ろうとし、取れたら 0 で終了する
+PROBE_HEADER_LOCK = f"""
+import fcntl, sys
+with open(sys.argv[1], "r+b") as f:
+    try:
+        fcntl.lockf(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB, {HEADER.size}, 0)
+    except OSError:
+        sys.exit(1)
+sys.exit(0)
+"""
+
+
+def header_lock_available(path: str) -> bool:
+    """Check from another process whether the header lock can be taken"""
+    probe = subprocess.run([sys.executable, "-c", PROBE_HEADER_LOCK, path])
+    return probe.returncode == 0
+
+
+@unittest.skipIf(os.name != "posix", "byte-range locks need fcntl")
+class BinaryRoumuDataLockTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "roumu.bin")
+        self.data = BinaryRoumuData(self.path)
+
+    def tearDown(self):
+        self.data.close()
+        self.tmp_dir.cleanup()
+
+    def test_header_lock_survives_growing_the_file(self):
+        original = self.data._ensure_capacity
+        probes = []
+
+        def ensure_capacity(count):
+            size = len(self.data._map)
+            original(count)
+            if len(self.data._map) != size:
+                # 拡張・再マップの直後もヘッダーのロックは保持されている
+                probes.append(header_lock_available(self.path))
+
+        self.data._ensure_capacity = ensure_capacity
+        user_ids = [f"user{n}" for n in range(1100)]
+        self.data.update_checkins(user_ids)
+
+        self.assertEqual(probes, [False, False])
+        self.assertTrue(header_lock_available(self.path))
+        self.assertEqual(self.data._retired_maps, [])
+        reopened = BinaryRoumuData(self.path)
+        self.assertEqual(len(reopened.load_all_users()), 1100)
+        reopened.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
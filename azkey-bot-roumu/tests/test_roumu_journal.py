@@ -0,0 +1,65 @@
+"""Tests for the journal roumu storage"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from azkey_bot_roumu.roumu_journal import JournalRoumuData
+
+
+class JournalRoumuDataTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "roumu.csv")
+        self.data = JournalRoumuData(self.path)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_append_after_torn_record_survives_reload(self):
+        self.data.update_checkins(["u5"])
+        # 書き込み途中で落ちたプロセスが残した、改行のない不完全な行
+        with open(self.data.journal_file_path, "ab") as journal:
+            journal.write(b"u5,1")
+
+        self.data.update_checkins(["u6"])
+
+        reloaded = JournalRoumuData(self.path)
+        self.assertIsNotNone(reloaded.get_user("u5"))
+        self.assertEqual(reloaded.get_user("u6")["total_count"], "1")
+        with open(self.data.journal_file_path, "rb") as journal:
+            self.assertTrue(journal.read().endswith(b"\n"))
+
+    def test_readers_refresh_the_index_one_at_a_time(self):
+        self.data.update_checkins([f"user{n}" for n in range(50)])
+        original = self.data._refresh
+        active = []
+        overlaps = []
+
+        def refresh(journal):
+            active.append(None)
+            overlaps.append(len(active))
+            time.sleep(0.01)
+            try:
+                original(journal)
+            finally:
+                active.pop()
+
+        self.data._refresh = refresh
+        threads = [
+            threading.Thread(target=self.data.get_leaderboard, args=(10,))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(overlaps), 4)
+        self.assertEqual(max(overlaps), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
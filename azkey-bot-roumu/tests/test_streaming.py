@@ -0,0 +1,221 @@
+"""Tests for the streaming API client against a local WebSocket stand-in"""
+
+import json
+import logging
+import queue
+import threading
+import time
+import unittest
+from unittest import mock
+
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.server import serve
+
+from azkey_bot_roumu.commands import _serve_stream
+from azkey_bot_roumu.streaming import MisskeyStream
+
+TIMEOUT = 5.0
+
+
+class StreamingStandIn:
+    """Minimal Misskey /streaming endpoint on a free local port
+
+    Each connection reads the channel connect messages and then sends the
+    messages put on the outgoing queue; close_connections() drops every
+    open connection, like a server restart.
+    """
+
+    def __init__(self):
+        self.connect_messages = queue.Queue()
+        self.outgoing = queue.Queue()
+        self.connections = []
+        self._server = serve(self._handler, "127.0.0.1", 0)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.socket.getsockname()
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._thread.join(TIMEOUT)
+
+    def close_connections(self):
+        for connection in list(self.connections):
+            connection.close()
+
+    def channel_ids(self) -> dict:
+        """Wait for both connect messages and map channel name to ID"""
+        ids = {}
+        for _ in range(2):
+            body = self.connect_messages.get(timeout=TIMEOUT)["body"]
+            ids[body["channel"]] = body["id"]
+        return ids
+
+    def send(self, channel_id: str, event_type: str, body):
+        self.outgoing.put(
+            json.dumps(
+                {
+                    "type": "channel",
+                    "body": {"id": channel_id, "type": event_type, "body": body},
+                }
+            )
+        )
+
+    def _handler(self, connection):
+        self.connections.append(connection)
+        try:
+            for _ in range(2):
+                self.connect_messages.put(json.loads(connection.recv()))
+            while True:
+                try:
+                    connection.send(self.outgoing.get(timeout=0.05))
+                except queue.Empty:
+                    connection.ping()
+        except ConnectionClosed:
+            pass
+        finally:
+            self.connections.remove(connection)
+
+
+class MisskeyStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StreamingStandIn()
+        self.server.start()
+        self.stream = MisskeyStream(
+            self.server.url, "token", backoff_base=0.05, backoff_max=0.1
+        )
+        self.stream.start()
+
+    def tearDown(self):
+        self.stream.stop()
+        self.server.stop()
+
+    def next_event(self):
+        return self.stream.events.get(timeout=TIMEOUT)
+
+    def test_connects_home_timeline_and_main(self):
+        ids = self.server.channel_ids()
+
+        self.assertEqual(set(ids), {"homeTimeline", "main"})
+        self.assertNotEqual(ids["homeTimeline"], ids["main"])
+        self.assertEqual(self.next_event(), ("connected", {"reconnect": False}))
+
+    def test_dispatches_channel_events(self):
+        ids = self.server.channel_ids()
+        self.assertEqual(self.next_event()[0], "connected")
+
+        self.server.send("unknown", "note", {"id": "n0"})
+        self.server.send(ids["main"], "note", {"id": "n1"})
+        self.server.send(ids["homeTimeline"], "note", {"id": "n2"})
+        self.server.send(ids["main"], "mention", {"id": "n3"})
+        self.server.send(ids["main"], "followed", {"id": "u1"})
+
+        self.assertEqual(self.next_event(), ("note", {"id": "n2"}))
+        self.assertEqual(self.next_event(), ("mention", {"id": "n3"}))
+        self.assertEqual(self.next_event(), ("followed", {"id": "u1"}))
+        self.assertTrue(self.stream.events.empty())
+
+    def test_reconnects_after_server_closes(self):
+        self.server.channel_ids()
+        self.assertEqual(self.next_event(), ("connected", {"reconnect": False}))
+
+        self.server.close_connections()
+
+        self.assertEqual(self.next_event()[0], "disconnected")
+        self.assertEqual(self.server.channel_ids().keys(), {"homeTimeline", "main"})
+        self.assertEqual(self.next_event(), ("connected", {"reconnect": True}))
+
+
+class ServeStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StreamingStandIn()
+        self.server.start()
+        self.stream = MisskeyStream(
+            self.server.url, "token", backoff_base=0.05, backoff_max=0.1
+        )
+
+    def tearDown(self):
+        self.server.stop()
+
+    def make_usecases(self, get_new_timeline_notes):
+        usecases = mock.MagicMock()
+        usecases.create_stream.return_value = self.stream
+        usecases.get_new_timeline_notes.side_effect = get_new_timeline_notes
+        usecases.timeline_backlog = False
+        usecases.keyword_matcher.find.return_value = None
+        usecases.seen_checkin_notes.filter_new.side_effect = lambda notes: notes
+        usecases.get_mentions_without_reaction.return_value = []
+        usecases.seen_mention_notes.filter_new.side_effect = lambda notes: notes
+        usecases.follow_back.return_value = {"mode": "incremental"}
+        return usecases
+
+    def test_backfills_on_every_connect(self):
+        backfills = []
+
+        def get_new_timeline_notes(limit):
+            backfills.append(time.monotonic())
+            # 初回のバックフィル後にサーバー側から切断して再接続させる
+            if len(backfills) == 1:
+                threading.Thread(target=self.server.close_connections).start()
+            return []
+
+        usecases = self.make_usecases(get_new_timeline_notes)
+        deadline = time.monotonic() + TIMEOUT
+
+        def is_shutdown_requested():
+            return len(backfills) >= 2 or time.monotonic() > deadline
+
+        _serve_stream(
+            usecases, logging.getLogger(__name__), 3600, is_shutdown_requested
+        )
+
+        self.assertEqual(len(backfills), 2)
+        self.assertEqual(usecases.get_mentions_without_reaction.call_count, 2)
+        self.assertFalse(self.stream._thread.is_alive())
+
+    def test_live_notes_do_not_pass_a_backlog(self):
+        backfills = []
+
+        def get_new_timeline_notes(limit):
+            backfills.append(f"b{len(backfills) + 1}")
+            # 3回目で取り残しがなくなる
+            usecases.timeline_backlog = len(backfills) < 3
+            if len(backfills) == 1:
+                # 取り残しの間に、より新しいライブの投稿が届く
+                ids = self.server.channel_ids()
+                self.server.send(ids["homeTimeline"], "note", {"id": "z9"})
+                deadline = time.monotonic() + TIMEOUT
+                while self.stream.events.empty() and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            return [{"id": backfills[-1]}]
+
+        usecases = self.make_usecases(get_new_timeline_notes)
+        deadline = time.monotonic() + TIMEOUT
+
+        def is_shutdown_requested():
+            return len(backfills) >= 3 or time.monotonic() > deadline
+
+        _serve_stream(
+            usecases, logging.getLogger(__name__), 3600, is_shutdown_requested
+        )
+
+        marked = [
+            sorted(note["id"] for note in call.args[0])
+            for call in usecases.mark_timeline_processed.call_args_list
+        ]
+        self.assertEqual(marked, [["b1"], ["b2"], ["b3"]])
+        checked = [
+            note["id"]
+            for call in usecases.seen_checkin_notes.filter_new.call_args_list
+            for note in call.args[0]
+        ]
+        self.assertIn("z9", checked)
+
+
+if __name__ == "__main__":
+    unittest.main()
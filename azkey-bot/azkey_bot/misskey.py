@@ -4,9 +4,22 @@ import requests
 import os
 
 
+def get_api_url(endpoint_path):
+    """Build the API URL for the Misskey server in MISSKEY_ENDPOINT
+
+    Args:
+        endpoint_path: API endpoint path (e.g., "/api/users/notes")
+
+    Returns:
+        Full API URL (default server: https://azkey.azuki.blue)
+    """
+    misskey_endpoint = os.getenv("MISSKEY_ENDPOINT", "https://azkey.azuki.blue")
+    return misskey_endpoint.rstrip("/") + endpoint_path
+
+
 def get_user_notes(user_id="acfu9psygqdo02op", limit=10, with_replies=True, 
                    until_id=None, since_id=None, until_date=None):
-    """Get user notes from azkey.azuki.blue API with pagination support
+    """Get user notes from the Misskey API with pagination support
 
     Args:
         user_id: User ID for the request
@@ -27,7 +40,7 @@ def get_user_notes(user_id="acfu9psygqdo02op", limit=10, with_replies=True,
     if not access_token:
         raise ValueError("Environment variable 'i' is not set")
 
-    url = "https://azkey.azuki.blue/api/users/notes"
+    url = get_api_url("/api/users/notes")
 
     payload = {
         "userId": user_id,
@@ -133,7 +146,7 @@ def create_note(text: str, cw: str = None) -> dict:
     if not access_token:
         raise ValueError("Environment variable 'i' is not set")
 
-    url = "https://azkey.azuki.blue/api/notes/create"
+    url = get_api_url("/api/notes/create")
 
     payload = {
         "text": text,